@@ -1,9 +1,11 @@
+from startup_timing import checkpoint, report
 import webview
 import threading
 import sys
 import os
 import pystray
 from PIL import Image
+checkpoint("import desktop shell")
 
 from config import get_translation as _
 from main import demo as main 
@@ -41,8 +43,15 @@ def setup_tray():
     icon.run()
 
 from ui import custom_css
+from pipeline_metrics import start_metrics_server
+from job_queue import job_queue
 
+start_metrics_server()
+# Resume the jobs queued before the last shutdown
+job_queue.start()
 main.launch(css=custom_css, **get_gradio_launch_kwargs(prevent_thread_lock=True))
+checkpoint("launch server")
+report()
 tray_thread = threading.Thread(target=setup_tray, daemon=True)
 tray_thread.start()
 
@@ -1,39 +1,136 @@
 import os
+import json
 import subprocess
 import logging
+import threading
+from collections import OrderedDict
 from config import load_default_values
 from security_utils import get_ffmpeg_timeout_seconds
 
 DEFAULT_VALUES = load_default_values()
 
+# faster-whisper expects 16 kHz mono input
+SAMPLE_RATE = 16000
 
-def _run_ffmpeg(command, action):
+# ffprobe only reads container headers, so it should answer in milliseconds
+PROBE_TIMEOUT_SECONDS = 30
+PROBE_MEMO_SIZE = 1024
+
+# Audio codecs faster-whisper (PyAV) decodes itself, so files holding them
+# need no conversion, and the container each one can be stream-copied into
+DIRECT_DECODE_CODECS = {"aac", "alac", "mp3", "opus", "vorbis", "flac", "pcm_s16le", "pcm_s24le", "pcm_s32le", "pcm_f32le", "pcm_u8"}
+STREAM_COPY_CONTAINERS = {"aac": ".m4a", "alac": ".m4a", "mp3": ".mp3", "opus": ".ogg", "vorbis": ".ogg", "flac": ".flac"}
+
+_probe_memo = OrderedDict()
+_probe_lock = threading.Lock()
+_ffprobe_missing = False
+
+
+def _run_ffmpeg(command, action, text=True, timeout=None):
     kwargs = {
         "stdout": subprocess.PIPE,
         "stderr": subprocess.PIPE,
-        "text": True,
+        "text": text,
         "check": True,
-        "timeout": get_ffmpeg_timeout_seconds(),
+        "timeout": timeout or get_ffmpeg_timeout_seconds(),
     }
     import sys
     if sys.platform == "win32":
         kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW
 
     try:
-        subprocess.run(command, **kwargs)
+        return subprocess.run(command, **kwargs)
     except FileNotFoundError:
-        logging.error("ffmpeg is not installed or not available on PATH.")
+        logging.error("%s is not installed or not available on PATH.", command[0])
         raise
     except subprocess.TimeoutExpired:
         logging.error("%s timed out.", action)
         raise
     except subprocess.CalledProcessError as e:
-        stderr = (e.stderr or "").strip()
+        stderr = e.stderr or ""
+        if isinstance(stderr, bytes):
+            stderr = stderr.decode("utf-8", errors="replace")
+        stderr = stderr.strip()
         if len(stderr) > 500:
             stderr = stderr[-500:]
         logging.error("%s failed: %s", action, stderr)
         raise
 
+def _parse_seconds(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def probe_media(file_path):
+    """Read the duration, container, streams and codecs of a media file with ffprobe.
+
+    Returns a dict with ``duration`` (seconds, or None when the container
+    does not declare it), ``format_name``, ``bit_rate`` and the ``audio`` and
+    ``video`` stream lists (``index``, ``codec`` and, for audio,
+    ``channels``, ``sample_rate`` and ``duration``). Results are memoized on
+    (path, size, mtime), so probing the same file again is free. Returns
+    None when ffprobe is not installed.
+    """
+    global _ffprobe_missing
+    stat = os.stat(file_path)
+    memo_key = (str(file_path), stat.st_size, stat.st_mtime_ns)
+    with _probe_lock:
+        if memo_key in _probe_memo:
+            _probe_memo.move_to_end(memo_key)
+            return _probe_memo[memo_key]
+    if _ffprobe_missing:
+        return None
+
+    command = [
+        "ffprobe",
+        "-hide_banner",
+        "-v",
+        "error",
+        "-show_entries",
+        "format=duration,format_name,bit_rate:stream=index,codec_type,codec_name,channels,sample_rate,duration",
+        "-of",
+        "json",
+        str(file_path),
+    ]
+    try:
+        result = _run_ffmpeg(command, "Media probe", timeout=PROBE_TIMEOUT_SECONDS)
+    except FileNotFoundError:
+        _ffprobe_missing = True
+        logging.warning("ffprobe not found; media duration and streams are not checked before conversion.")
+        return None
+    info = json.loads(result.stdout or "{}")
+    container = info.get("format", {})
+    probe = {
+        "duration": _parse_seconds(container.get("duration")),
+        "format_name": container.get("format_name"),
+        "bit_rate": int(_parse_seconds(container.get("bit_rate")) or 0) or None,
+        "audio": [],
+        "video": [],
+    }
+    for stream in info.get("streams", []):
+        kind = stream.get("codec_type")
+        if kind == "audio":
+            probe["audio"].append({
+                "index": stream.get("index"),
+                "codec": stream.get("codec_name"),
+                "channels": stream.get("channels"),
+                "sample_rate": int(_parse_seconds(stream.get("sample_rate")) or 0) or None,
+                "duration": _parse_seconds(stream.get("duration")),
+            })
+        elif kind == "video":
+            probe["video"].append({"index": stream.get("index"), "codec": stream.get("codec_name")})
+    if probe["duration"] is None:
+        # Some containers (e.g. browser-recorded WebM) only declare stream durations
+        durations = [stream["duration"] for stream in probe["audio"] if stream["duration"]]
+        probe["duration"] = max(durations) if durations else None
+
+    with _probe_lock:
+        _probe_memo[memo_key] = probe
+        while len(_probe_memo) > PROBE_MEMO_SIZE:
+            _probe_memo.popitem(last=False)
+    return probe
+
 def is_whatsapp_audio_file(file_path):
     """Checks if the audio file is in WhatsApp format (e.g., .opus)."""
     whatsapp_audio_extensions = ['.opus']
@@ -108,6 +205,32 @@ def extract_audio_from_video(video_file, output_audio_file):
         logging.error(f"Error extracting audio from video: {e}")
         raise
 
+def copy_audio_stream(file_path, output_audio_file):
+    """Copy the first audio stream into ``output_audio_file`` without re-encoding it.
+
+    The output extension must suit the codec (see ``STREAM_COPY_CONTAINERS``).
+    This only remuxes packets, so it runs at disk speed.
+    """
+    logging.info(f"Copying audio stream without re-encoding: {file_path}...")
+    command = [
+        "ffmpeg",
+        "-hide_banner",
+        "-nostdin",
+        "-y",
+        "-i",
+        file_path,
+        "-vn",
+        "-map",
+        "0:a:0",
+        "-c:a",
+        "copy",
+        output_audio_file,
+    ]
+    _run_ffmpeg(command, "Audio stream copy")
+    if not os.path.exists(output_audio_file) or os.path.getsize(output_audio_file) == 0:
+        raise RuntimeError(f"Audio stream copy produced no output: {file_path}")
+    logging.info(f"Audio stream copied to: {output_audio_file}")
+
 def is_audio_file(file_path):
     """Checks if the file is an audio based on its extension."""
     try:
@@ -141,3 +264,155 @@ def convert_audio_to_mp3(audio_file, output_audio_file):
     except Exception as e:
         logging.error(f"Error converting audio to MP3: {e}")
         raise
+
+def is_pcm_decoding_enabled():
+    """Whether media should be decoded straight to PCM instead of re-encoded to MP3."""
+    return bool(DEFAULT_VALUES.get('default_values', {}).get('pcm_decoding', True))
+
+def decode_audio_to_pcm(file_path, sampling_rate=SAMPLE_RATE):
+    """Decodes the first audio stream of a media file to mono float32 PCM.
+
+    ffmpeg writes raw little-endian float32 samples to stdout, which are
+    wrapped in a NumPy array that faster-whisper accepts directly. This
+    skips the intermediate MP3 encode, the temporary file on disk and the
+    second decode faster-whisper would otherwise perform.
+    """
+    import numpy as np
+
+    logging.info(f"Decoding audio to {sampling_rate} Hz PCM: {file_path}...")
+    command = [
+        "ffmpeg",
+        "-hide_banner",
+        "-nostdin",
+        "-i",
+        file_path,
+        "-vn",
+        "-map",
+        "0:a:0",
+        "-ac",
+        "1",
+        "-ar",
+        str(sampling_rate),
+        "-f",
+        "f32le",
+        "-",
+    ]
+    result = _run_ffmpeg(command, "PCM decoding", text=False)
+    audio = np.frombuffer(result.stdout, dtype=np.float32)
+    if audio.size == 0:
+        raise RuntimeError(f"No audio samples decoded from: {file_path}")
+    logging.info(f"Decoded {audio.size / sampling_rate:.1f}s of audio from: {file_path}")
+    return audio
+
+
+def open_pcm_stream(source, sampling_rate=SAMPLE_RATE, start_seconds=0.0, input_options=(), stdin=None):
+    """Start ffmpeg decoding a source to mono float32 PCM on its stdout.
+
+    ``source`` is a local file, a stream URL, or ``"-"`` to read the media
+    from ``stdin`` (this process's stdin by default). ``input_options`` are
+    passed to ffmpeg before ``-i``. A positive ``start_seconds`` seeks the
+    input before decoding. Unlike ``decode_audio_to_pcm`` there is no timeout:
+    the caller reads ``process.stdout`` incrementally and terminates the
+    process when done.
+    """
+    import sys
+
+    from_stdin = source == "-"
+    command = ["ffmpeg", "-hide_banner", "-loglevel", "error"]
+    if not from_stdin:
+        command.append("-nostdin")
+    if start_seconds:
+        command += ["-ss", f"{start_seconds:.3f}"]
+    command += list(input_options)
+    command += [
+        "-i",
+        "pipe:0" if from_stdin else source,
+        "-vn",
+        "-map",
+        "0:a:0",
+        "-ac",
+        "1",
+        "-ar",
+        str(sampling_rate),
+        "-f",
+        "f32le",
+        "-",
+    ]
+    kwargs = {
+        "stdin": (stdin or sys.stdin.buffer) if from_stdin else subprocess.DEVNULL,
+        "stdout": subprocess.PIPE,
+        "stderr": subprocess.DEVNULL,
+    }
+    if sys.platform == "win32":
+        kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW
+    logging.info(f"Opening PCM stream: {'stdin' if from_stdin else source}")
+    try:
+        return subprocess.Popen(command, **kwargs)
+    except FileNotFoundError:
+        logging.error("ffmpeg is not installed or not available on PATH.")
+        raise
+
+
+class PcmStreamReader:
+    """Read a media file as consecutive blocks of 16 kHz float32 PCM.
+
+    ffmpeg decodes into a pipe and only the block being read is held in
+    memory, however long the media is. ``start_seconds`` skips the
+    beginning of the media (used to resume from a checkpoint). Each ``read`` must complete within
+    the ffmpeg timeout, otherwise ffmpeg is killed and ``TimeoutError`` is
+    raised.
+    """
+
+    def __init__(self, file_path, sampling_rate=SAMPLE_RATE, start_seconds=0.0):
+        self.file_path = str(file_path)
+        self.sampling_rate = sampling_rate
+        self.start_seconds = start_seconds
+        self.samples_read = 0
+        self.exhausted = False
+        self._process = open_pcm_stream(self.file_path, sampling_rate, start_seconds)
+
+    def read(self, samples):
+        """Return up to ``samples`` samples; fewer means the end of the media was reached."""
+        import numpy as np
+
+        wanted = samples * 4
+        data = bytearray()
+        timed_out = threading.Event()
+
+        def _kill():
+            timed_out.set()
+            self._process.kill()
+
+        watchdog = threading.Timer(get_ffmpeg_timeout_seconds(), _kill)
+        watchdog.daemon = True
+        watchdog.start()
+        try:
+            while len(data) < wanted and not self.exhausted:
+                block = self._process.stdout.read(wanted - len(data))
+                if not block:
+                    self.exhausted = True
+                else:
+                    data += block
+        finally:
+            watchdog.cancel()
+        if timed_out.is_set():
+            raise TimeoutError(f"PCM decoding timed out: {self.file_path}")
+
+        # Keep whole float32 samples; a trailing partial sample is dropped
+        audio = np.frombuffer(bytes(data[:len(data) - len(data) % 4]), dtype=np.float32)
+        self.samples_read += audio.size
+        if self.exhausted:
+            returncode = self._process.wait()
+            if returncode != 0:
+                raise RuntimeError(f"PCM decoding failed (ffmpeg exit code {returncode}): {self.file_path}")
+            if self.samples_read == 0 and not self.start_seconds:
+                raise RuntimeError(f"No audio samples decoded from: {self.file_path}")
+        return audio
+
+    def close(self):
+        """Stop ffmpeg; safe to call more than once."""
+        if self._process.poll() is None:
+            self._process.kill()
+        self._process.wait()
+        if self._process.stdout is not None:
+            self._process.stdout.close()
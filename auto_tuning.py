@@ -0,0 +1,335 @@
+"""Hardware-aware tuning of cpu_threads, num_workers, batch_size and compute_type.
+
+With the ``auto`` performance profile those four settings are replaced by
+the values stored for the selected model and device in
+``settings/auto_tuning.yaml``. The values come from a short calibration
+run that times every candidate combination on a sample clip. Until a
+calibration exists, a heuristic based on the detected cores, available
+memory, CPU instruction sets and the compute types CTranslate2 supports
+on this machine is used instead. Stored results are ignored once the
+hardware changes.
+
+Usage:
+    python auto_tuning.py --model small --device cpu
+    python auto_tuning.py --model large-v3 --device cuda --clip samples/meeting.wav
+    python auto_tuning.py --show
+"""
+import argparse
+import gc
+import logging
+import os
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import yaml
+
+from audio_processing import SAMPLE_RATE
+
+PROFILES = ("manual", "auto")
+TUNED_KEYS = ("cpu_threads", "num_workers", "batch_size", "compute_type")
+TUNING_FILE = "settings/auto_tuning.yaml"
+TUNING_FORMAT_VERSION = 1
+CALIBRATION_SECONDS = 60
+# Fastest first; the first one CTranslate2 supports on this machine wins the heuristic
+COMPUTE_PREFERENCE = {
+    "cpu": ("int8", "int8_float32", "float32"),
+    "cuda": ("float16", "int8_float16", "bfloat16", "float32"),
+}
+CPU_FLAGS_OF_INTEREST = ("avx", "avx2", "fma", "avx512f", "avx512_vnni", "avx512_bf16", "amx_tile", "neon", "asimd")
+# Rough resident size per model family (GB at int8/float16), for batch sizing
+MODEL_MEMORY_GB = {"tiny": 0.3, "base": 0.4, "small": 0.8, "medium": 1.8, "large": 3.5, "turbo": 2.0}
+
+
+def _read_cpuinfo():
+    try:
+        with open("/proc/cpuinfo", "r", encoding="utf-8") as cpuinfo:
+            return cpuinfo.read()
+    except OSError:
+        return ""
+
+
+def _physical_cores(cpuinfo, logical):
+    cores = set()
+    physical_id = core_id = None
+    for line in cpuinfo.splitlines():
+        key, _sep, value = line.partition(":")
+        key = key.strip()
+        if key == "physical id":
+            physical_id = value.strip()
+        elif key == "core id":
+            core_id = value.strip()
+        elif not key and physical_id is not None and core_id is not None:
+            cores.add((physical_id, core_id))
+            physical_id = core_id = None
+    if physical_id is not None and core_id is not None:
+        cores.add((physical_id, core_id))
+    return len(cores) or logical
+
+
+def available_memory_bytes():
+    try:
+        with open("/proc/meminfo", "r", encoding="utf-8") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if sys.platform == "win32":
+        import ctypes
+
+        class _MemoryStatus(ctypes.Structure):
+            _fields_ = [
+                ("dwLength", ctypes.c_ulong),
+                ("dwMemoryLoad", ctypes.c_ulong),
+                ("ullTotalPhys", ctypes.c_ulonglong),
+                ("ullAvailPhys", ctypes.c_ulonglong),
+                ("ullTotalPageFile", ctypes.c_ulonglong),
+                ("ullAvailPageFile", ctypes.c_ulonglong),
+                ("ullTotalVirtual", ctypes.c_ulonglong),
+                ("ullAvailVirtual", ctypes.c_ulonglong),
+                ("ullAvailExtendedVirtual", ctypes.c_ulonglong),
+            ]
+
+        status = _MemoryStatus()
+        status.dwLength = ctypes.sizeof(_MemoryStatus)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return int(status.ullAvailPhys)
+    try:
+        # Total rather than available memory (macOS), still a usable upper bound
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def _supported_compute_types(device):
+    try:
+        import ctranslate2
+        return sorted(ctranslate2.get_supported_compute_types(device))
+    except Exception as e:
+        logging.debug(f"Could not query CTranslate2 compute types for {device}: {e}")
+        return None
+
+
+def detect_hardware(device="cpu"):
+    """Describe the cores, memory, instruction sets and compute types available for ``device``."""
+    cpuinfo = _read_cpuinfo()
+    logical = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    flags = set()
+    cpu_model = platform.processor() or platform.machine()
+    for line in cpuinfo.splitlines():
+        key, _sep, value = line.partition(":")
+        key = key.strip()
+        if key in ("flags", "Features") and not flags:
+            flags = set(value.split())
+        elif key == "model name" and value.strip():
+            cpu_model = value.strip()
+    return {
+        "cpu_model": cpu_model,
+        "logical_cores": logical,
+        "physical_cores": min(_physical_cores(cpuinfo, logical), logical),
+        "memory_available_bytes": available_memory_bytes(),
+        "cpu_flags": sorted(flag for flag in CPU_FLAGS_OF_INTEREST if flag in flags),
+        "compute_types": _supported_compute_types(device),
+    }
+
+
+def hardware_fingerprint(hardware):
+    """The parts of ``detect_hardware`` that invalidate a calibration when they change."""
+    return f"{hardware['cpu_model']}|{hardware['logical_cores']}|{hardware['physical_cores']}|{','.join(hardware['compute_types'] or [])}"
+
+
+def model_memory_gb(model):
+    for family in ("turbo", "large", "medium", "small", "base", "tiny"):
+        if family in model:
+            # distil-* models keep the large encoder but only two decoder layers
+            return MODEL_MEMORY_GB[family] * (0.6 if model.startswith("distil") else 1.0)
+    return MODEL_MEMORY_GB["large"]
+
+
+def heuristic_settings(model, device, hardware):
+    """Settings that are usually close to the best for this hardware, without calibration."""
+    supported = hardware["compute_types"]
+    preference = COMPUTE_PREFERENCE.get(device, COMPUTE_PREFERENCE["cpu"])
+    compute_type = next((kind for kind in preference if supported is None or kind in supported), "default")
+    if device == "cuda":
+        # Device memory is unknown without CUDA bindings; stay conservative for large models
+        batch_size = 16 if model_memory_gb(model) < 1.5 else 8
+        cpu_threads = min(4, hardware["physical_cores"])
+    else:
+        # Hyper-threads rarely help the int8/float32 GEMMs
+        cpu_threads = hardware["physical_cores"]
+        free_gb = (hardware["memory_available_bytes"] or 0) / 1024 ** 3 - model_memory_gb(model)
+        batch_size = 8 if free_gb >= 6 else 4 if free_gb >= 3 else 2 if free_gb >= 1.5 else 1
+    return {"cpu_threads": cpu_threads, "num_workers": 1, "batch_size": batch_size, "compute_type": compute_type}
+
+
+def _profile_key(model, device):
+    return f"{model}|{device}"
+
+
+def load_tuning():
+    try:
+        with open(TUNING_FILE, "r", encoding="utf-8") as tuning_file:
+            tuning = yaml.safe_load(tuning_file) or {}
+    except FileNotFoundError:
+        return {"version": TUNING_FORMAT_VERSION, "profiles": {}}
+    except (OSError, yaml.YAMLError) as e:
+        logging.warning(f"Ignoring unreadable {TUNING_FILE}: {e}")
+        return {"version": TUNING_FORMAT_VERSION, "profiles": {}}
+    if tuning.get("version") != TUNING_FORMAT_VERSION:
+        return {"version": TUNING_FORMAT_VERSION, "profiles": {}}
+    tuning.setdefault("profiles", {})
+    return tuning
+
+
+def save_tuning(tuning):
+    with open(TUNING_FILE, "w", encoding="utf-8") as tuning_file:
+        yaml.safe_dump(tuning, tuning_file, sort_keys=True)
+
+
+def get_tuned_settings(model, device):
+    """Return the auto-profile settings for ``model`` on ``device``.
+
+    The calibrated values are used when they were measured on this hardware,
+    otherwise the heuristic ones. The result carries ``source`` set to
+    ``calibrated`` or ``heuristic``.
+    """
+    hardware = detect_hardware(device)
+    stored = load_tuning()["profiles"].get(_profile_key(model, device))
+    if stored and stored.get("hardware") == hardware_fingerprint(hardware):
+        return {**{key: stored[key] for key in TUNED_KEYS}, "source": "calibrated"}
+    if stored:
+        logging.info(f"Calibration for {model} on {device} was made on other hardware; using heuristic settings.")
+    return {**heuristic_settings(model, device, hardware), "source": "heuristic"}
+
+
+def resolve_profile(profile, model, device, cpu_threads, num_workers, batch_size, compute_type):
+    """Return ``(cpu_threads, num_workers, batch_size, compute_type)`` for the selected profile."""
+    if profile != "auto":
+        return cpu_threads, num_workers, batch_size, compute_type
+    tuned = get_tuned_settings(model, device)
+    logging.info(
+        f"Auto profile ({tuned['source']}) for {model} on {device}: cpu_threads={tuned['cpu_threads']} "
+        f"num_workers={tuned['num_workers']} batch_size={tuned['batch_size']} compute_type={tuned['compute_type']}"
+    )
+    if tuned["source"] == "heuristic":
+        logging.info(f"Run 'python auto_tuning.py --model {model} --device {device}' to calibrate these settings.")
+    return tuned["cpu_threads"], tuned["num_workers"], tuned["batch_size"], tuned["compute_type"]
+
+
+def synthetic_clip(seconds=CALIBRATION_SECONDS, seed=0):
+    """A speech-like test signal: voiced harmonics at syllable rate with short pauses.
+
+    Used when no clip is given; the repository does not ship audio. Real
+    speech makes the decoder work harder, so pass ``--clip`` for the most
+    representative numbers.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    pitch = 120 + 60 * np.sin(2 * np.pi * 0.3 * t) + 20 * np.sin(2 * np.pi * 2.1 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    voiced = sum(np.sin(harmonic * phase) / harmonic for harmonic in range(1, 12))
+    syllables = np.clip(np.sin(2 * np.pi * 4 * t), 0, None) ** 2
+    pauses = np.repeat(rng.random(int(seconds) + 1) > 0.2, SAMPLE_RATE)[:t.size]
+    audio = voiced * syllables * pauses + 0.01 * rng.standard_normal(t.size)
+    return (0.3 * audio / np.abs(audio).max()).astype(np.float32)
+
+
+def _candidates(device, hardware, heuristic):
+    supported = hardware["compute_types"]
+    compute_types = [kind for kind in COMPUTE_PREFERENCE.get(device, ()) if supported is None or kind in supported][:2]
+    if device == "cuda":
+        threads = [heuristic["cpu_threads"]]
+        batch_sizes = [8, 16, 32]
+    else:
+        threads = sorted({hardware["physical_cores"], hardware["logical_cores"]})
+        batch_sizes = sorted({max(1, heuristic["batch_size"] // 2), heuristic["batch_size"], heuristic["batch_size"] * 2})
+    return compute_types or [heuristic["compute_type"]], threads, batch_sizes
+
+
+def calibrate(model, device, clip_path=None, language="en"):
+    """Time every candidate on a sample clip, store the fastest and return all results."""
+    from transcription import _import_whisper, load_model
+
+    hardware = detect_hardware(device)
+    heuristic = heuristic_settings(model, device, hardware)
+    if clip_path:
+        from audio_processing import decode_audio_to_pcm
+        audio = decode_audio_to_pcm(clip_path)[:CALIBRATION_SECONDS * SAMPLE_RATE]
+    else:
+        audio = synthetic_clip()
+    clip_seconds = audio.size / SAMPLE_RATE
+    # Fixed 30 s clips, so every candidate decodes exactly the same audio regardless of VAD
+    clips = [{"start": start, "end": min(start + 30, clip_seconds)} for start in range(0, int(clip_seconds), 30)]
+    _model_class, BatchedInferencePipeline = _import_whisper()
+
+    compute_types, thread_options, batch_sizes = _candidates(device, hardware, heuristic)
+    results = []
+    for compute_type in compute_types:
+        for cpu_threads in thread_options:
+            whisper_model = load_model(model, compute_type, device, cpu_threads, 1)
+            if whisper_model is None:
+                continue
+            pipeline = BatchedInferencePipeline(model=whisper_model)
+            # Warm-up: first call pays for allocator and kernel initialization
+            list(pipeline.transcribe(audio[:5 * SAMPLE_RATE], language=language, clip_timestamps=[{"start": 0, "end": 5}])[0])
+            for batch_size in batch_sizes:
+                started = time.perf_counter()
+                segments, _info = pipeline.transcribe(audio, language=language, batch_size=batch_size, clip_timestamps=clips)
+                list(segments)
+                seconds = max(time.perf_counter() - started, 1e-3)
+                result = {"cpu_threads": cpu_threads, "num_workers": 1, "batch_size": batch_size, "compute_type": compute_type, "seconds": round(seconds, 3)}
+                logging.info(f"Calibration {result}: {clip_seconds / seconds:.1f}x realtime")
+                results.append(result)
+            del pipeline, whisper_model
+            gc.collect()
+    if not results:
+        raise RuntimeError(f"No candidate configuration could load {model} on {device}")
+
+    best = min(results, key=lambda result: result["seconds"])
+    tuning = load_tuning()
+    tuning["profiles"][_profile_key(model, device)] = {
+        **{key: best[key] for key in TUNED_KEYS},
+        "realtime_factor": round(clip_seconds / best["seconds"], 2),
+        "clip": os.path.basename(clip_path) if clip_path else "synthetic",
+        "hardware": hardware_fingerprint(hardware),
+        "calibrated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+    save_tuning(tuning)
+    logging.info(f"Stored auto profile for {model} on {device} in {TUNING_FILE}: {best}")
+    return best, results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calibrate the auto performance profile for a Whisper model.")
+    parser.add_argument("--model", help="Whisper model to calibrate (default: whisper_model from settings/default.yaml).")
+    parser.add_argument("--device", choices=("cpu", "cuda"), help="Device to calibrate (default: device from settings/default.yaml).")
+    parser.add_argument("--clip", help="Audio/video file to time (first 60 s); a synthetic clip is used otherwise.")
+    parser.add_argument("--show", action="store_true", help="Print detected hardware and stored profiles, without calibrating.")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', stream=sys.stderr)
+
+    clip_path = os.path.abspath(args.clip) if args.clip else None
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    from config import load_default_config
+
+    defaults = load_default_config()
+    model = args.model or defaults["whisper_model"]
+    device = args.device or defaults["device"]
+    if args.show:
+        print(yaml.safe_dump({
+            "hardware": detect_hardware(device),
+            "auto_profile": {model: get_tuned_settings(model, device)},
+            "stored": load_tuning()["profiles"],
+        }, sort_keys=False))
+        return 0
+    best, _results = calibrate(model, device, clip_path)
+    print(yaml.safe_dump({"model": model, "device": device, **best}, sort_keys=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,386 @@
+"""Reproducible throughput benchmark of the transcription pipeline.
+
+Test media is generated locally with ffmpeg from a fixed pattern of
+speech-like voiced tones, pure tones, pink noise and silence gaps, encoded
+into several containers and durations with bit-exact flags, so the same
+ffmpeg build always produces byte-identical files. Every cell of the
+model x compute type x batch size x threads matrix then transcribes the
+whole media set through ``iter_transcription_events`` (the pipeline
+behind ``transcribe_file``) in a fresh subprocess, so model-load time and
+peak RSS are measured per cell and not inherited from the previous one.
+
+Reported per cell: real-time factor (wall seconds per second of media,
+lower is better), per-stage wall time (import, model load, prepare,
+inference), peak RSS of the process and of its ffmpeg children, and the
+per-file timings. Results are written as JSON; ``--baseline`` compares
+them against an earlier results file and exits with 1 when a cell got
+slower than ``--tolerance`` allows.
+
+Usage:
+    python benchmark.py --models tiny small --compute-types int8 float32 --batch-sizes 4 8 --threads 4 8
+    python benchmark.py --output results.json --baseline benchmarks/baseline.json
+    python benchmark.py --durations 30 900 --containers wav mp4 --device cuda
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+BENCHMARK_FORMAT_VERSION = 1
+APP_DIR = Path(__file__).resolve().parent
+DEFAULT_MEDIA_DIR = APP_DIR / "benchmarks" / "media"
+DEFAULT_DURATIONS = (30, 120)
+DEFAULT_TOLERANCE = 0.10
+# Container -> ffmpeg audio encoder; mp4 also gets a small video stream
+CONTAINERS = {
+    "wav": ["-c:a", "pcm_s16le"],
+    "mp3": ["-c:a", "libmp3lame", "-b:a", "64k"],
+    "m4a": ["-c:a", "aac", "-b:a", "64k"],
+    "ogg": ["-c:a", "libopus", "-b:a", "32k"],
+    "opus": ["-c:a", "libopus", "-b:a", "24k"],
+    "flac": ["-c:a", "flac"],
+    "mp4": ["-c:a", "aac", "-b:a", "64k", "-c:v", "libx264", "-preset", "ultrafast", "-tune", "stillimage", "-pix_fmt", "yuv420p"],
+}
+DEFAULT_CONTAINERS = ("wav", "mp3", "m4a", "ogg", "mp4")
+# One 30 s cycle of the generated signal: (kind, seconds)
+PATTERN = (
+    ("voice", 7), ("silence", 2), ("voice", 5), ("noise", 3),
+    ("voice", 6), ("tone", 2), ("silence", 1), ("voice", 4),
+)
+SOURCES = {
+    # Voiced harmonics with a gliding pitch, gated at a syllable rate of 4 Hz
+    "voice": "aevalsrc='0.25*(sin(2*PI*(140+30*sin(2*PI*0.4*t))*t)+0.5*sin(4*PI*(140+30*sin(2*PI*0.4*t))*t)+0.25*sin(6*PI*(140+30*sin(2*PI*0.4*t))*t))*pow(max(0,sin(2*PI*4*t)),2)':s=16000:d={seconds}",
+    "tone": "sine=frequency=440:sample_rate=16000:duration={seconds}",
+    "noise": "anoisesrc=color=pink:seed={seed}:amplitude=0.05:sample_rate=16000:duration={seconds}",
+    "silence": "anullsrc=channel_layout=mono:sample_rate=16000:d={seconds}",
+}
+
+
+def _pattern_pieces(duration):
+    """Cycle ``PATTERN`` until ``duration`` seconds are covered, trimming the last piece."""
+    pieces = []
+    covered = 0
+    for kind, seconds in itertools.cycle(PATTERN):
+        if covered >= duration:
+            return pieces
+        seconds = min(seconds, duration - covered)
+        pieces.append((kind, seconds))
+        covered += seconds
+
+
+def media_name(duration, container):
+    # The container is part of the stem so transcripts of the same duration do not collide
+    return f"bench_{duration}s_{container}.{container}"
+
+
+def generate_media(output_path, duration, container):
+    """Render the benchmark signal of ``duration`` seconds into ``output_path`` with ffmpeg."""
+    from audio_processing import _run_ffmpeg
+
+    pieces = _pattern_pieces(duration)
+    command = ["ffmpeg", "-hide_banner", "-nostdin", "-y"]
+    for seed, (kind, seconds) in enumerate(pieces, 1):
+        command += ["-f", "lavfi", "-i", SOURCES[kind].format(seconds=seconds, seed=seed)]
+    graph = "".join(f"[{index}:a]" for index in range(len(pieces))) + f"concat=n={len(pieces)}:v=0:a=1[a]"
+    if container == "mp4":
+        command += ["-f", "lavfi", "-i", f"color=c=gray:s=320x240:r=5:d={duration}"]
+        command += ["-map", f"{len(pieces)}:v"]
+    command += [
+        "-filter_complex", graph, "-map", "[a]", "-ac", "1", "-ar", "16000",
+        *CONTAINERS[container],
+        "-fflags", "+bitexact", "-flags", "+bitexact", "-map_metadata", "-1",
+        str(output_path),
+    ]
+    _run_ffmpeg(command, f"Benchmark media generation ({output_path.name})")
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as media_file:
+        for block in iter(lambda: media_file.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def prepare_media(media_dir, durations, containers, regenerate=False):
+    """Generate missing benchmark files and return their descriptions (path, duration, sha256)."""
+    media_dir.mkdir(parents=True, exist_ok=True)
+    media = []
+    for duration in durations:
+        for container in containers:
+            path = media_dir / media_name(duration, container)
+            if regenerate or not path.exists():
+                logging.info(f"Generating {path.name}...")
+                generate_media(path, duration, container)
+            media.append({"name": path.name, "path": str(path), "duration": duration, "container": container, "sha256": _sha256(path)})
+    return media
+
+
+def _peak_rss_bytes(who="self"):
+    """Peak resident set size of this process (or of its waited-for children)."""
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    if resource is not None:
+        usage = resource.getrusage(resource.RUSAGE_SELF if who == "self" else resource.RUSAGE_CHILDREN)
+        # Linux reports kilobytes, macOS bytes
+        return usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+    if sys.platform == "win32" and who == "self":
+        import ctypes
+        from ctypes import wintypes
+
+        class _ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = _ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(_ProcessMemoryCounters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return int(counters.PeakWorkingSetSize)
+    return None
+
+
+def _megabytes(value):
+    return round(value / 1024 ** 2, 1) if value is not None else None
+
+
+def cell_key(cell):
+    return f"{cell['model']}|{cell['device']}|{cell['compute_type']}|b{cell['batch_size']}|t{cell['threads']}"
+
+
+def run_cell(cell, media, settings):
+    """Transcribe ``media`` with one matrix cell; meant to run in its own process."""
+    started = time.perf_counter()
+    from transcription import _import_whisper, get_model_cache_stats, iter_transcription_events
+
+    _import_whisper()
+    import_seconds = time.perf_counter() - started
+
+    files = []
+    errors = []
+    run_started = time.perf_counter()
+    for event in iter_transcription_events(
+        [item["path"] for item in media], cell["device"], cell["threads"], 1, settings["language"],
+        cell["model"], cell["compute_type"], settings["temperature"], settings["beam_size"], cell["batch_size"],
+        settings["condition_on_previous_text"], False,
+        # Measured in this subprocess even when inference servers are configured
+        workers=1, prefetch=1, use_cache=False, vad=settings["vad"], remote=False,
+    ):
+        if event["event"] == "file_done":
+            files.append({
+                "name": Path(event["source"]).name,
+                "media_seconds": event["media_seconds"],
+                "audio_route": event["audio_route"],
+                "prepare_seconds": round(event["prepare_seconds"], 4),
+                "inference_seconds": round(event["inference_seconds"], 4),
+                "seconds": round(event["seconds"], 4),
+            })
+        elif event["event"] in ("file_error", "invalid"):
+            errors.append({"name": Path(str(event.get("source") or event.get("path"))).name, "error": str(event["error"])})
+    wall_seconds = time.perf_counter() - run_started
+
+    media_seconds = sum(item["duration"] for item in media)
+    model_load_seconds = get_model_cache_stats()["load_seconds_total"]
+    return {
+        **cell,
+        "key": cell_key(cell),
+        "media_seconds": media_seconds,
+        "wall_seconds": round(wall_seconds, 4),
+        # Model loading is reported separately, so the RTF reflects steady-state throughput
+        "rtf": round((wall_seconds - model_load_seconds) / media_seconds, 5) if media_seconds else None,
+        "import_seconds": round(import_seconds, 4),
+        "model_load_seconds": round(model_load_seconds, 4),
+        "prepare_seconds": round(sum(item["prepare_seconds"] for item in files), 4),
+        "inference_seconds": round(sum(item["inference_seconds"] for item in files), 4),
+        "peak_rss_mb": _megabytes(_peak_rss_bytes("self")),
+        "peak_child_rss_mb": _megabytes(_peak_rss_bytes("children")),
+        "files": files,
+        "errors": errors,
+    }
+
+
+def _run_cell_subprocess(cell, media, settings):
+    payload = json.dumps({"cell": cell, "media": media, "settings": settings})
+    process = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--run-cell"],
+        input=payload, stdout=subprocess.PIPE, text=True, cwd=APP_DIR,
+    )
+    if process.returncode != 0:
+        return {**cell, "key": cell_key(cell), "errors": [{"error": f"Benchmark process exited with {process.returncode}"}]}
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def environment_info(device):
+    from auto_tuning import detect_hardware, hardware_fingerprint
+
+    versions = {}
+    for package in ("faster_whisper", "ctranslate2", "numpy"):
+        try:
+            versions[package] = __import__(package).__version__
+        except Exception:
+            versions[package] = None
+    try:
+        ffmpeg = subprocess.run(["ffmpeg", "-version"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, check=True).stdout.splitlines()[0]
+    except (OSError, subprocess.CalledProcessError, IndexError):
+        ffmpeg = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "hardware": hardware_fingerprint(detect_hardware(device)),
+        "ffmpeg": ffmpeg,
+        **versions,
+    }
+
+
+def compare_results(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Compare two results files cell by cell; returns ``(rows, regressions)``.
+
+    A cell regresses when its RTF grew by more than ``tolerance`` (0.10 =
+    10% slower). Load time and peak RSS ratios are reported for context.
+    """
+    previous = {result["key"]: result for result in baseline.get("results", [])}
+    rows = []
+    regressions = []
+    for result in current.get("results", []):
+        before = previous.get(result["key"])
+        if before is None or not result.get("rtf") or not before.get("rtf"):
+            continue
+        row = {"key": result["key"], "rtf": result["rtf"], "baseline_rtf": before["rtf"], "rtf_ratio": round(result["rtf"] / before["rtf"], 3)}
+        for metric in ("model_load_seconds", "peak_rss_mb"):
+            if result.get(metric) and before.get(metric):
+                row[f"{metric}_ratio"] = round(result[metric] / before[metric], 3)
+        rows.append(row)
+        if row["rtf_ratio"] > 1 + tolerance:
+            regressions.append(row)
+    if current.get("environment", {}).get("hardware") != baseline.get("environment", {}).get("hardware"):
+        logging.warning("Baseline was recorded on different hardware; the comparison is only indicative.")
+    current_media = {item["name"]: item["sha256"] for item in current.get("media", [])}
+    baseline_media = {item["name"]: item["sha256"] for item in baseline.get("media", [])}
+    if any(baseline_media.get(name, digest) != digest for name, digest in current_media.items()):
+        logging.warning("Benchmark media differ from the baseline (another ffmpeg build?); the comparison is only indicative.")
+    return rows, regressions
+
+
+def _format_row(result):
+    if result.get("rtf") is None:
+        return f"{result['key']}: failed ({result['errors']})"
+    speed = 1 / result["rtf"] if result["rtf"] else float("inf")
+    return (
+        f"{result['key']}: RTF {result['rtf']:.3f} ({speed:.1f}x realtime) | "
+        f"load {result['model_load_seconds']:.2f}s | prepare {result['prepare_seconds']:.2f}s | "
+        f"inference {result['inference_seconds']:.2f}s | peak RSS {result['peak_rss_mb']} MB"
+    )
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark transcription throughput on generated media.")
+    parser.add_argument("--models", nargs="+", help="Whisper models (default: whisper_model from settings/default.yaml).")
+    parser.add_argument("--compute-types", nargs="+", help="Compute types (default: compute_type from settings).")
+    parser.add_argument("--batch-sizes", nargs="+", type=int, help="Batch sizes (default: batch_size from settings).")
+    parser.add_argument("--threads", nargs="+", type=int, help="cpu_threads values (default: cpu_threads from settings).")
+    parser.add_argument("--device", choices=("cpu", "cuda"), help="Device (default: device from settings).")
+    parser.add_argument("--language", default="en", help="Transcription language; fixed so language detection is not timed.")
+    parser.add_argument("--durations", nargs="+", type=int, default=list(DEFAULT_DURATIONS), help="Durations (seconds) of the generated media.")
+    parser.add_argument("--containers", nargs="+", choices=sorted(CONTAINERS), default=list(DEFAULT_CONTAINERS), help="Containers of the generated media.")
+    parser.add_argument("--media-dir", default=str(DEFAULT_MEDIA_DIR), help="Where generated media is kept between runs.")
+    parser.add_argument("--regenerate", action="store_true", help="Render the media again even if the files exist.")
+    parser.add_argument("--vad-threshold", type=float, default=0.0, help="VAD threshold; 0 decodes all audio, so synthetic signals are never skipped as non-speech.")
+    parser.add_argument("--output", default="benchmark_results.json", help="Results JSON file.")
+    parser.add_argument("--baseline", help="Earlier results JSON file to compare against.")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed RTF increase before a cell counts as a regression.")
+    parser.add_argument("--run-cell", action="store_true", help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', stream=sys.stderr)
+
+    media_dir = Path(args.media_dir).expanduser().resolve()
+    output_path = Path(args.output).expanduser().resolve()
+    baseline_path = Path(args.baseline).expanduser().resolve() if args.baseline else None
+    os.chdir(APP_DIR)
+
+    if args.run_cell:
+        request = json.loads(sys.stdin.read())
+        print(json.dumps(run_cell(request["cell"], request["media"], request["settings"])))
+        return 0
+
+    from config import load_default_config
+
+    defaults = load_default_config()
+    device = args.device or defaults["device"]
+    media = prepare_media(media_dir, sorted(set(args.durations)), args.containers, args.regenerate)
+    settings = {
+        "language": args.language,
+        "temperature": defaults["temperature"],
+        "beam_size": defaults["beam_size"],
+        "condition_on_previous_text": defaults["condition_on_previous_text"],
+        "vad": {"vad_mode": "pipeline", "vad_threshold": args.vad_threshold},
+    }
+    matrix = itertools.product(
+        args.models or [defaults["whisper_model"]],
+        args.compute_types or [defaults["compute_type"]],
+        args.batch_sizes or [defaults["batch_size"]],
+        args.threads or [defaults["cpu_threads"]],
+    )
+
+    results = []
+    for model, compute_type, batch_size, threads in matrix:
+        cell = {"model": model, "device": device, "compute_type": compute_type, "batch_size": batch_size, "threads": threads}
+        logging.info(f"Benchmarking {cell_key(cell)} on {len(media)} files...")
+        result = _run_cell_subprocess(cell, media, settings)
+        logging.info(_format_row(result))
+        results.append(result)
+
+    report = {
+        "version": BENCHMARK_FORMAT_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment_info(device),
+        "settings": settings,
+        "media": [{key: item[key] for key in ("name", "duration", "container", "sha256")} for item in media],
+        "results": results,
+    }
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as output_file:
+        json.dump(report, output_file, indent=2)
+    logging.info(f"Results written to {output_path}")
+
+    exit_code = 0 if all(result.get("rtf") is not None for result in results) else 1
+    if baseline_path is not None:
+        with open(baseline_path, "r", encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        rows, regressions = compare_results(report, baseline, args.tolerance)
+        for row in rows:
+            marker = "REGRESSION" if row in regressions else "ok"
+            print(f"{row['key']}: RTF {row['baseline_rtf']:.3f} -> {row['rtf']:.3f} ({row['rtf_ratio']:.2f}x) {marker}")
+        if regressions:
+            exit_code = 1
+    else:
+        for result in results:
+            print(_format_row(result))
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""Cross-file packing of short files into shared inference batches.
+
+``BatchedInferencePipeline`` decodes ``batch_size`` speech clips (of at
+most ``vad_chunk_length`` seconds) per step. A voice note of a few seconds
+holds one or two clips, so transcribing notes one call at a time runs
+nearly empty batches and pays the per-call overhead for every file. Here
+the audio of several short files is laid end to end and their speech clips
+are passed together as ``clip_timestamps``, so each batch is filled with
+clips of different files. A clip never crosses a file boundary, so every
+segment belongs to exactly one file and is shifted back to that file's
+timeline.
+"""
+import bisect
+import logging
+import threading
+
+import numpy as np
+
+from audio_processing import SAMPLE_RATE
+from config import load_default_values
+from windowed_transcription import shift_segment
+
+DEFAULT_PACK_MAX_SECONDS = 120
+DEFAULT_PACK_MAX_FILES = 16
+# Silence between packed files, so clips of neighbouring files never share a feature frame
+PACK_GAP_SECONDS = 0.5
+
+
+def get_pack_settings():
+    """Return ``(max_seconds, max_files)``; ``max_seconds`` 0 disables packing."""
+    defaults = load_default_values().get("default_values", {})
+    try:
+        max_seconds = float(defaults.get("pack_short_files_seconds", DEFAULT_PACK_MAX_SECONDS) or 0)
+        max_files = int(defaults.get("pack_max_files", DEFAULT_PACK_MAX_FILES) or 0)
+    except (TypeError, ValueError) as e:
+        logging.warning(f"Invalid packing settings ({e}). Falling back to the defaults.")
+        max_seconds, max_files = DEFAULT_PACK_MAX_SECONDS, DEFAULT_PACK_MAX_FILES
+    if max_seconds <= 0 or max_files < 2:
+        return 0.0, 1
+    return max_seconds, max_files
+
+
+class ClipPack:
+    """Several files' audio laid end to end, with their speech clips in pack time."""
+
+    def __init__(self):
+        self.offsets = []
+        self.clips = []
+        self.clip_files = []  # member index of each clip
+        self._audio = []
+        self._samples = 0
+        self._gap = np.zeros(int(PACK_GAP_SECONDS * SAMPLE_RATE), dtype=np.float32)
+
+    def add(self, audio, clips):
+        """Append one file's audio and its ``(start, end)`` speech clips (file seconds)."""
+        offset = self._samples / SAMPLE_RATE
+        self.offsets.append(offset)
+        self.clips += [(offset + start, offset + end) for start, end in clips]
+        self.clip_files += [len(self.offsets) - 1] * len(clips)
+        self._audio += [audio, self._gap]
+        self._samples += audio.size + self._gap.size
+
+    def audio(self):
+        return np.concatenate(self._audio)
+
+    def clip_timestamps(self):
+        return [{"start": start, "end": end} for start, end in self.clips]
+
+    def split(self, segments):
+        """Yield ``(member index, segment)`` with each segment moved back to its file's timeline.
+
+        A segment belongs to the file of the last clip starting at or before
+        it. Half the gap of tolerance absorbs timestamps rounded slightly
+        before their clip, and is too small to reach into the next file.
+        """
+        starts = [start for start, _end in self.clips]
+        for segment in segments:
+            clip = max(0, bisect.bisect_right(starts, segment.start + PACK_GAP_SECONDS / 2) - 1)
+            index = self.clip_files[clip]
+            yield index, shift_segment(segment, -self.offsets[index])
+
+
+class PackScheduler:
+    """Lets the inference worker of one file take over the following short files.
+
+    Every submitted job is registered with its prepare future. A worker
+    ``own``s its job before starting and skips it when another worker's
+    pack already took it. ``gather`` takes the next registered jobs that no
+    worker owns, waits for their prepare stage and keeps them while
+    ``packable(prepared)`` holds. The first one that is not (a long file,
+    a cache hit or a failed preparation) is already taken, so it is handed
+    back for the gathering worker to transcribe on its own.
+    """
+
+    def __init__(self, max_files):
+        self.max_files = max_files
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._taken = set()
+
+    def register(self, index, prepared_future, events):
+        with self._lock:
+            self._jobs[index] = (prepared_future, events)
+
+    def own(self, index):
+        """Reserve job ``index`` for its own worker; False when a pack already took it."""
+        with self._lock:
+            if index in self._taken:
+                return False
+            self._taken.add(index)
+            return True
+
+    def gather(self, index, packable, cancel_event):
+        """Take up to ``max_files - 1`` packable jobs after ``index``.
+
+        Returns ``(members, leftover)``: the ``(prepared, events)`` pairs of
+        the packable jobs, and the ``(prepared_future, events)`` of the job
+        that ended the pack, or None.
+        """
+        members = []
+        position = index
+        while len(members) < self.max_files - 1 and not cancel_event.is_set():
+            position += 1
+            with self._lock:
+                job = self._jobs.get(position)
+                if job is None:
+                    break
+                if position in self._taken:
+                    continue
+                self._taken.add(position)
+            prepared_future, events = job
+            try:
+                prepared = prepared_future.result()
+            except Exception:
+                return members, job
+            if not packable(prepared):
+                return members, job
+            members.append((prepared, events))
+        return members, None
@@ -1,5 +1,7 @@
 import os
 import logging
+import sys
+import threading
 import yaml
 
 WHISPER_MODEL_FALLBACKS = [
@@ -24,27 +26,46 @@ WHISPER_MODEL_FALLBACKS = [
     "turbo",
 ]
 
-def get_whisper_model_choices():
-    """Return faster-whisper model aliases supported by the installed package."""
-    try:
-        from faster_whisper.utils import available_models
-        return available_models()
-    except Exception as e:
-        logging.debug(f"Could not load faster-whisper model aliases: {e}")
-        return WHISPER_MODEL_FALLBACKS
+def get_whisper_model_choices(configured=None):
+    """Return the faster-whisper model aliases for the model dropdown.
+
+    Importing faster_whisper loads ctranslate2 (and possibly torch), which
+    costs seconds at startup just to fill a dropdown. So the installed
+    package is asked only once it is already imported; until then the
+    ``models`` list of ``settings/default_values.yaml`` is used.
+    """
+    if "faster_whisper" in sys.modules:
+        try:
+            from faster_whisper.utils import available_models
+            return available_models()
+        except Exception as e:
+            logging.debug(f"Could not load faster-whisper model aliases: {e}")
+    return list(configured or WHISPER_MODEL_FALLBACKS)
+
+_default_values = None
+_default_values_lock = threading.Lock()
 
 def load_default_values():
-    """Carica i valori di default da default_values.yaml."""
-    with open("settings/default_values.yaml", "r") as ymlfile:
-        default_values = yaml.safe_load(ymlfile)
-        
-    # Inject security limits dynamically into the environment variables
-    max_duration = default_values.get("default_values", {}).get("max_media_duration_seconds")
-    if max_duration is not None:
-        os.environ["WHISPER_MAX_MEDIA_DURATION_SECONDS"] = str(max_duration)
+    """Carica i valori di default da default_values.yaml.
+
+    The file is parsed once per process and the same dictionary is shared
+    by every module; treat it as read-only.
+    """
+    global _default_values
+    with _default_values_lock:
+        if _default_values is not None:
+            return _default_values
+        with open("settings/default_values.yaml", "r") as ymlfile:
+            default_values = yaml.safe_load(ymlfile)
+
+        # Inject security limits dynamically into the environment variables
+        max_duration = default_values.get("default_values", {}).get("max_media_duration_seconds")
+        if max_duration is not None:
+            os.environ["WHISPER_MAX_MEDIA_DURATION_SECONDS"] = str(max_duration)
 
-    default_values["configurations"]["models"] = get_whisper_model_choices()
-    return default_values
+        default_values["configurations"]["models"] = get_whisper_model_choices(default_values["configurations"].get("models"))
+        _default_values = default_values
+        return default_values
 
 def load_default_config():
     """Carica la configurazione di default da settings/default.yaml."""
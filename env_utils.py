@@ -0,0 +1,27 @@
+import logging
+import os
+
+
+def env_int(name, default, minimum=None, error=None):
+    """Read an integer env var.
+
+    A value that is not an integer or is below ``minimum`` logs a warning
+    and falls back to ``default``; with ``error`` (an exception class) it
+    raises that instead, for limits that must not be silently ignored.
+    """
+    value = os.getenv(name)
+    if value is None:
+        return default
+    try:
+        parsed = int(value)
+    except ValueError as exc:
+        if error is not None:
+            raise error(f"{name} must be an integer") from exc
+        logging.warning("Invalid %s=%r. Falling back to %s.", name, value, default)
+        return default
+    if minimum is not None and parsed < minimum:
+        if error is not None:
+            raise error(f"{name} must be at least {minimum}")
+        logging.warning("Invalid %s=%r. Falling back to %s.", name, value, default)
+        return default
+    return parsed
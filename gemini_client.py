@@ -0,0 +1,131 @@
+import logging
+import os
+import threading
+import time
+
+from config import get_gemini_api_key
+from env_utils import env_int
+
+SECRETS_PATH = "secrets/gemini.yaml"
+DEFAULT_MODELS_TTL_SECONDS = 3600
+
+_client_lock = threading.Lock()
+_client = None
+_client_signature = None
+
+
+def _key_signature():
+    # Cheap fingerprint of where the key comes from, so the secrets file is
+    # only re-read (and the client rebuilt) when it actually changes
+    try:
+        mtime = os.stat(SECRETS_PATH).st_mtime_ns
+    except OSError:
+        mtime = None
+    return os.getenv("GEMINI_API_KEY"), mtime
+
+
+def get_client():
+    """Return the shared ``genai.Client``, or None when no API key is configured.
+
+    The client (and its HTTP connection pool) is built once and reused by
+    every query and model listing. It is rebuilt only when ``GEMINI_API_KEY``
+    or ``secrets/gemini.yaml`` changes.
+    """
+    global _client, _client_signature
+    signature = _key_signature()
+    with _client_lock:
+        if signature != _client_signature:
+            api_key = get_gemini_api_key()
+            if api_key:
+                from google import genai
+                _client = genai.Client(api_key=api_key)
+            else:
+                _client = None
+            _client_signature = signature
+        return _client
+
+
+def reset_client():
+    """Drop the shared client so the next ``get_client`` re-reads the key."""
+    global _client, _client_signature
+    with _client_lock:
+        _client = None
+        _client_signature = None
+
+
+class CachedValue:
+    """A value produced by ``fetch`` and kept for ``ttl`` seconds.
+
+    Once a value exists, expired reads return it immediately and start a
+    single background refresh, so callers never wait on the network after
+    the first fetch. A failed refresh keeps the previous value.
+    """
+
+    def __init__(self, name, fetch, ttl, clock=time.monotonic):
+        self.name = name
+        self._fetch = fetch
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._value = None
+        self._fetched_at = None
+        self._refreshing = False
+        # Bumped by invalidate() so a refresh started before it cannot store a stale value
+        self._generation = 0
+
+    def _store(self, value, generation=None):
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._value = value
+            self._fetched_at = self._clock()
+
+    def _refresh_worker(self):
+        with self._lock:
+            generation = self._generation
+        try:
+            self._store(self._fetch(), generation)
+            logging.debug(f"Refreshed {self.name} in the background.")
+        except Exception as e:
+            logging.warning(f"Background refresh of {self.name} failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def get(self, block=True):
+        """Return the cached value, fetching synchronously only if there is none yet and ``block`` is set."""
+        with self._lock:
+            fetched_at = self._fetched_at
+            value = self._value
+            fresh = fetched_at is not None and self._clock() - fetched_at < self.ttl
+            start_refresh = fetched_at is not None and not fresh and not self._refreshing
+            if start_refresh:
+                self._refreshing = True
+        if fresh:
+            return value
+        if start_refresh:
+            threading.Thread(target=self._refresh_worker, name=f"{self.name}-refresh", daemon=True).start()
+            return value
+        if fetched_at is not None or not block:
+            return value
+        value = self._fetch()
+        self._store(value)
+        return value
+
+    def refresh_async(self):
+        """Start a background refresh unless one is already running."""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh_worker, name=f"{self.name}-refresh", daemon=True).start()
+
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+            self._fetched_at = None
+            self._generation += 1
+
+
+def get_models_ttl_seconds():
+    return max(0, env_int("GEMINI_MODELS_TTL_SECONDS", DEFAULT_MODELS_TTL_SECONDS))
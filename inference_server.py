@@ -0,0 +1,405 @@
+"""Long-lived inference worker that owns the Whisper models.
+
+Loading a model inside the Gradio/pywebview process means every UI
+restart reloads it, and inference competes with the web server for the
+GIL. This server keeps models loaded in ``model_registry`` across requests
+and runs ``iter_transcription_events`` on behalf of thin clients. When
+``inference_servers`` (or ``WHISPER_INFERENCE_SERVERS``) lists one or more
+server URLs, ``iter_transcription_events`` in the UI, the job queue and
+``transcribe_cli.py`` sends the files to the least busy healthy replica and
+relays its events as they stream back.
+
+Endpoints (localhost by default):
+    POST /transcribe  {"file_paths": [...], "params": {...}} -> one JSON event per line
+    GET  /health      liveness, pid, uptime and jobs running or waiting
+    GET  /stats       loaded models, pipeline aggregates and job counters
+    GET  /metrics     Prometheus text format (see ``pipeline_metrics``)
+
+With ``WHISPER_INFERENCE_TOKEN`` set, servers require it as a bearer
+token and clients send it. It is required to bind anywhere but loopback.
+
+Usage:
+    python inference_server.py --port 8765
+    python inference_server.py --port 8765 --replicas 2 --max-jobs 1
+    python inference_server.py --status
+"""
+import argparse
+import hmac
+import json
+import logging
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from config import load_default_values
+from security_utils import SecurityError, validate_inference_host
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+HEALTH_TIMEOUT_SECONDS = 2
+CONNECT_TIMEOUT_SECONDS = 5
+# Seconds before a crashed replica is started again
+RESTART_DELAY_SECONDS = 2
+# iter_transcription_events keyword arguments a client may pass
+TRANSCRIBE_PARAMS = (
+    "device", "cpu_threads", "num_workers", "language", "whisper_model", "compute_type", "temperature",
+    "beam_size", "batch_size", "condition_on_previous_text", "word_timestamps",
+    "workers", "prefetch", "use_cache", "vad", "profile",
+)
+
+
+def get_inference_servers():
+    """Configured server URLs; empty means transcription runs in-process."""
+    configured = os.getenv("WHISPER_INFERENCE_SERVERS")
+    if configured is None:
+        configured = load_default_values().get("default_values", {}).get("inference_servers") or []
+    if isinstance(configured, str):
+        configured = configured.split(",")
+    return [url.strip().rstrip("/") for url in configured if url and url.strip()]
+
+
+def _auth_headers():
+    token = os.getenv("WHISPER_INFERENCE_TOKEN")
+    return {"Authorization": f"Bearer {token}"} if token else {}
+
+
+def _to_json(value):
+    """Event values JSON cannot carry as they are: paths and exceptions."""
+    return str(value)
+
+
+# --- Server -----------------------------------------------------------------
+
+class InferenceService:
+    """State shared by the request handlers of one server process."""
+
+    def __init__(self, max_jobs=1):
+        self.started = time.time()
+        self.max_jobs = max_jobs
+        self._slots = threading.Semaphore(max_jobs)
+        self._lock = threading.Lock()
+        self.counters = {"running": 0, "waiting": 0, "completed": 0, "failed": 0, "files": 0}
+
+    def _count(self, **changes):
+        with self._lock:
+            for key, change in changes.items():
+                self.counters[key] += change
+
+    def health(self):
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            "status": "ok",
+            "pid": os.getpid(),
+            "uptime_seconds": time.time() - self.started,
+            "max_jobs": self.max_jobs,
+            "running": counters["running"],
+            "waiting": counters["waiting"],
+        }
+
+    def stats(self):
+        from pipeline_metrics import pipeline_metrics
+        from transcription import get_model_cache_stats
+
+        with self._lock:
+            counters = dict(self.counters)
+        return {**self.health(), "jobs": counters, "models": get_model_cache_stats(), "pipeline": pipeline_metrics.summary()}
+
+    def transcribe(self, file_paths, params):
+        """Yield the events of one request once a job slot is free."""
+        from transcription import iter_transcription_events
+
+        self._count(waiting=1)
+        with self._slots:
+            self._count(waiting=-1, running=1)
+            failed = False
+            try:
+                for event in iter_transcription_events(file_paths, **params, remote=False):
+                    if event["event"] == "file_done":
+                        self._count(files=1)
+                    yield event
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                self._count(running=-1, **{"failed" if failed else "completed": 1})
+
+
+class _InferenceHandler(BaseHTTPRequestHandler):
+    service = None
+
+    def _authorized(self):
+        token = os.getenv("WHISPER_INFERENCE_TOKEN")
+        if not token:
+            return True
+        supplied = self.headers.get("Authorization", "")
+        if hmac.compare_digest(supplied.encode("utf-8"), f"Bearer {token}".encode("utf-8")):
+            return True
+        self._send_json(401, {"error": "Missing or invalid token"})
+        return False
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, default=_to_json).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/health":
+            self._send_json(200, self.service.health())
+        elif not self._authorized():
+            return
+        elif path == "/stats":
+            self._send_json(200, self.service.stats())
+        elif path == "/metrics":
+            from pipeline_metrics import pipeline_metrics
+
+            body = pipeline_metrics.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        if self.path.split("?", 1)[0] != "/transcribe":
+            self.send_error(404)
+            return
+        if not self._authorized():
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            file_paths = [str(path) for path in request["file_paths"]]
+            params = {key: value for key, value in request.get("params", {}).items() if key in TRANSCRIBE_PARAMS}
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {"error": f"Invalid request: {e}"})
+            return
+
+        # No Content-Length: the stream ends when the connection closes (HTTP/1.0)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        events = self.service.transcribe(file_paths, params)
+        try:
+            for event in events:
+                self._write_line(event)
+            self._write_line({"event": "server_done"})
+        except (BrokenPipeError, ConnectionResetError):
+            # The client went away; closing the generator cancels the batch
+            logging.info("Client disconnected; cancelling its transcription.")
+        except Exception as e:
+            logging.error(f"Inference request failed: {e}")
+            try:
+                self._write_line({"event": "server_error", "error": str(e)})
+            except OSError:
+                pass
+        finally:
+            events.close()
+
+    def _write_line(self, event):
+        self.wfile.write(json.dumps(event, default=_to_json).encode("utf-8") + b"\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        logging.debug(f"Inference request: {format % args}")
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, max_jobs=1):
+    """Serve one replica in the foreground until interrupted."""
+    validate_inference_host(host)
+    handler = type("InferenceHandler", (_InferenceHandler,), {"service": InferenceService(max_jobs)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    logging.info(f"Inference server {os.getpid()} listening on http://{host}:{port} (up to {max_jobs} job(s) at once)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def _raise_interrupt(_signum, _frame):
+    raise KeyboardInterrupt
+
+
+def supervise_replicas(host, port, replicas, max_jobs):
+    """Run ``replicas`` server processes on consecutive ports, restarting any that crash."""
+    # Checked here too, so a refused host fails once instead of in a restart loop
+    validate_inference_host(host)
+    # Stopping the supervisor (e.g. by a service manager) also stops its replicas
+    signal.signal(signal.SIGTERM, _raise_interrupt)
+
+    def start(replica_port):
+        command = [sys.executable, os.path.abspath(__file__), "--host", host, "--port", str(replica_port), "--max-jobs", str(max_jobs)]
+        return subprocess.Popen(command, cwd=APP_DIR)
+
+    processes = {port + offset: start(port + offset) for offset in range(replicas)}
+    urls = ",".join(f"http://{host}:{replica_port}" for replica_port in processes)
+    logging.info(f"Started {replicas} replicas; set WHISPER_INFERENCE_SERVERS={urls}")
+    try:
+        while True:
+            time.sleep(1)
+            for replica_port, process in list(processes.items()):
+                if process.poll() is not None:
+                    logging.warning(f"Replica on port {replica_port} exited with code {process.returncode}; restarting.")
+                    time.sleep(RESTART_DELAY_SECONDS)
+                    processes[replica_port] = start(replica_port)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes.values():
+            if process.poll() is None:
+                process.terminate()
+        for process in processes.values():
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+# --- Client -----------------------------------------------------------------
+
+def server_health(url, timeout=HEALTH_TIMEOUT_SECONDS):
+    """The server's ``/health`` answer, or None when it is unreachable."""
+    import requests
+
+    try:
+        response = requests.get(f"{url}/health", timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+    except (requests.RequestException, ValueError) as e:
+        logging.debug(f"Inference server {url} is not healthy: {e}")
+        return None
+
+
+def server_stats(url, timeout=HEALTH_TIMEOUT_SECONDS):
+    import requests
+
+    response = requests.get(f"{url}/stats", headers=_auth_headers(), timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
+
+def rank_servers(servers):
+    """Healthy servers, least busy first (jobs running or waiting per job slot)."""
+    ranked = []
+    for order, url in enumerate(servers):
+        health = server_health(url)
+        if health is not None:
+            load = (health["running"] + health["waiting"]) / max(1, health["max_jobs"])
+            ranked.append((load, order, url))
+    return [url for _load, _order, url in sorted(ranked)]
+
+
+def _record_remote_metrics(event):
+    """Mirror a relayed file's spans and outcome into this process's ``pipeline_metrics``."""
+    from pipeline_metrics import pipeline_metrics
+
+    if event["event"] == "file_error":
+        pipeline_metrics.record_file("error")
+        return
+    for span in event.get("spans") or []:
+        pipeline_metrics.record(span["stage"], span["seconds"], span.get("audio_seconds"))
+    if event.get("cached"):
+        pipeline_metrics.record_file("cached")
+    else:
+        media_seconds = event["media_seconds"] - event.get("resumed_from", 0) if event.get("media_seconds") else None
+        pipeline_metrics.record_file("done", event["prepare_seconds"] + event["inference_seconds"], media_seconds)
+
+
+def iter_remote_events(servers, file_paths, params):
+    """Transcribe on the least busy healthy server and yield its events.
+
+    Events look like the local ones from ``iter_transcription_events``, with
+    ``source`` and ``output_path`` as ``Path`` and ``file_error`` errors as
+    strings. A server that cannot be reached is skipped in favour of the
+    next one; once events have arrived, a broken stream raises
+    ``RuntimeError`` (checkpoints let a retry resume the interrupted file).
+    """
+    import requests
+
+    ranked = rank_servers(servers)
+    if not ranked:
+        raise RuntimeError(f"No inference server is reachable ({', '.join(servers)})")
+    payload = {"file_paths": [str(path) for path in ([file_paths] if isinstance(file_paths, str) else file_paths)], "params": params}
+    for url in ranked:
+        try:
+            response = requests.post(
+                f"{url}/transcribe", json=payload, headers=_auth_headers(),
+                stream=True, timeout=(CONNECT_TIMEOUT_SECONDS, None),
+            )
+        except requests.ConnectionError as e:
+            logging.warning(f"Inference server {url} is unreachable ({e}); trying the next one.")
+            continue
+        with response:
+            if response.status_code != 200:
+                raise RuntimeError(f"Inference server {url} answered {response.status_code}: {response.text[:200]}")
+            logging.info(f"Transcribing {len(payload['file_paths'])} file(s) on {url}")
+            try:
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    event = json.loads(line)
+                    kind = event["event"]
+                    if kind == "server_done":
+                        return
+                    if kind == "server_error":
+                        raise RuntimeError(f"Inference server {url} failed: {event['error']}")
+                    for key in ("source", "output_path"):
+                        if event.get(key) is not None:
+                            event[key] = Path(event[key])
+                    if kind in ("file_done", "file_error"):
+                        _record_remote_metrics(event)
+                    yield event
+            except requests.RequestException as e:
+                raise RuntimeError(f"Lost the connection to inference server {url}: {e}") from e
+            raise RuntimeError(f"Inference server {url} closed the stream before finishing")
+    raise RuntimeError(f"No inference server is reachable ({', '.join(servers)})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve Whisper transcription to the UI and CLI from a long-lived process.")
+    parser.add_argument("--host", default=os.getenv("WHISPER_INFERENCE_HOST", DEFAULT_HOST), help="Bind address (default 127.0.0.1).")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port of the first replica.")
+    parser.add_argument("--replicas", type=int, default=1, help="Server processes to run on consecutive ports.")
+    parser.add_argument("--max-jobs", type=int, default=1, help="Requests one replica transcribes at once; the others wait.")
+    parser.add_argument("--status", action="store_true", help="Print the health and stats of the configured servers and exit.")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', stream=sys.stderr)
+
+    os.chdir(APP_DIR)
+    if args.status:
+        servers = get_inference_servers() or [f"http://{args.host}:{args.port}"]
+        report = {}
+        for url in servers:
+            try:
+                report[url] = server_stats(url)
+            except Exception as e:
+                report[url] = {"status": "unreachable", "error": str(e)}
+        print(json.dumps(report, indent=2, default=_to_json))
+        return 0 if all(entry.get("status") == "ok" for entry in report.values()) else 1
+    try:
+        if args.replicas > 1:
+            supervise_replicas(args.host, args.port, args.replicas, max(1, args.max_jobs))
+        else:
+            serve(args.host, args.port, max(1, args.max_jobs))
+    except SecurityError as e:
+        logging.error(e)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,376 @@
+"""Persistent queue of transcription jobs with per-user fairness and admission control.
+
+When the app is shared (``get_gradio_launch_kwargs`` with a non-loopback
+host and auth), every click on Transcribe used to run ``transcribe_file``
+straight away, so a few users transcribing at once loaded a model each and
+ran the host out of memory. A click now ``submit``s a job instead. Jobs are
+stored in SQLite, so queued jobs survive a restart; jobs that were running
+are queued again and pick up from their checkpoints. A dispatcher thread
+starts the next job only while fewer than ``job_queue_max_concurrent`` jobs
+run and its estimated memory fits the budget. The estimate is the model
+weights plus the decoded audio of the job's longest file, and a model that
+is shared with a running job is counted only once. Users take turns: each
+user's n-th waiting job runs in round n, so one user's long list does not
+hold everyone else back.
+"""
+import json
+import logging
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from config import load_default_values
+
+QUEUE_FORMAT_VERSION = 1
+DEFAULT_MAX_CONCURRENT = 1
+DEFAULT_MAX_PER_USER = 5
+# Share of the memory available at startup used as the budget when job_queue_memory_gb is 0
+AUTO_MEMORY_SHARE = 0.8
+# Assumed length of media that ffprobe cannot measure
+UNKNOWN_MEDIA_SECONDS = 600
+# Decoder working memory (feature batches, beams) on top of the weights and the audio
+JOB_OVERHEAD_GB = 0.5
+# 16 kHz mono float32
+AUDIO_BYTES_PER_SECOND = 16000 * 4
+# Real-time factor used for ETAs until this session has measured one
+DEFAULT_RTF = {"cpu": 0.5, "cuda": 0.1}
+# Transcripts of finished jobs kept in memory for the sessions still polling them
+FINISHED_PROGRESS_KEPT = 32
+DISPATCH_INTERVAL_SECONDS = 5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    file_paths TEXT NOT NULL,
+    params TEXT NOT NULL,
+    model_key TEXT NOT NULL,
+    model_gb REAL NOT NULL,
+    work_gb REAL NOT NULL,
+    media_seconds REAL NOT NULL,
+    outputs TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created);
+"""
+
+
+class JobRejected(Exception):
+    """A job that cannot be queued (too many waiting jobs, or too large for the memory budget)."""
+
+
+def get_queue_db_path():
+    configured = os.getenv("WHISPER_JOB_QUEUE_DB")
+    if configured:
+        return Path(configured).expanduser().resolve()
+    if sys.platform == "win32" and os.getenv("LOCALAPPDATA"):
+        base = Path(os.environ["LOCALAPPDATA"])
+    else:
+        base = Path(os.getenv("XDG_STATE_HOME") or Path.home() / ".local" / "state")
+    return (base / "whisper-utility" / "jobs.sqlite3").resolve()
+
+
+def get_queue_settings():
+    """Return ``(max_concurrent, max_per_user, memory_gb)``; 0 means unlimited / automatic."""
+    defaults = load_default_values().get("default_values", {})
+    try:
+        max_concurrent = max(1, int(defaults.get("job_queue_max_concurrent", DEFAULT_MAX_CONCURRENT) or 1))
+        max_per_user = max(0, int(defaults.get("job_queue_max_per_user", DEFAULT_MAX_PER_USER) or 0))
+        memory_gb = max(0.0, float(defaults.get("job_queue_memory_gb", 0) or 0))
+    except (TypeError, ValueError) as e:
+        logging.warning(f"Invalid job queue settings ({e}). Falling back to the defaults.")
+        return DEFAULT_MAX_CONCURRENT, DEFAULT_MAX_PER_USER, 0.0
+    return max_concurrent, max_per_user, memory_gb
+
+
+def estimate_job(file_paths, params):
+    """Return ``(media_seconds, model_key, model_gb, work_gb)`` for a job.
+
+    ``work_gb`` covers the decoded audio held at once (the longest file, or
+    one window of it, for every file in flight) plus the decoder overhead.
+    """
+    from audio_processing import probe_media
+    from auto_tuning import model_memory_gb
+
+    durations = []
+    for path in file_paths:
+        try:
+            probe = probe_media(path)
+        except (OSError, subprocess.SubprocessError, ValueError):
+            # Unreadable or corrupt media still gets queued; the pipeline reports it as a file_error
+            probe = None
+        durations.append((probe or {}).get("duration") or UNKNOWN_MEDIA_SECONDS)
+    defaults = load_default_values().get("default_values", {})
+    window = float(defaults.get("long_media_window_seconds", 0) or 0)
+    resident_seconds = min(max(durations), window) if window else max(durations)
+    in_flight = min(len(durations), int(defaults.get("transcription_workers", 1) or 1) + int(defaults.get("prefetch_files", 1) or 0))
+    work_gb = resident_seconds * AUDIO_BYTES_PER_SECOND * max(1, in_flight) / 1024 ** 3 + JOB_OVERHEAD_GB
+
+    model, compute_type, device = params["whisper_model"], str(params["compute_type"]), params["device"]
+    model_gb = model_memory_gb(model) * (2.0 if compute_type == "float32" else 1.0)
+    return sum(durations), f"{model}|{compute_type}|{device}", model_gb, work_gb
+
+
+def fair_order(queued, running_per_user, last_started):
+    """Order waiting jobs by turn.
+
+    A user's n-th waiting job comes in round n plus the number of jobs they
+    already run. Within a round, the user who started a job least recently
+    goes first, then the older job.
+    """
+    rounds = dict(running_per_user)
+    keyed = []
+    for job in sorted(queued, key=lambda job: (job["created"], job["id"])):
+        turn = rounds.get(job["user"], 0)
+        rounds[job["user"]] = turn + 1
+        keyed.append(((turn, last_started.get(job["user"], 0.0), job["created"], job["id"]), job))
+    return [job for _key, job in sorted(keyed, key=lambda item: item[0])]
+
+
+def _run_transcription(file_paths, params, on_update):
+    """Run ``transcribe_file`` for a job; returns ``(final text, output paths)``."""
+    from transcription import transcribe_file
+
+    text, outputs = "", []
+    for text, output_path, _folder in transcribe_file(file_paths, **params):
+        if output_path:
+            outputs.append(output_path)
+        on_update(text, output_path)
+    return text, outputs
+
+
+class JobQueue:
+    """SQLite-backed transcription queue shared by every session of the app."""
+
+    def __init__(self, db_path=None, run_job=None, clock=time.time):
+        self._db_path = db_path
+        self._run_job = run_job or _run_transcription
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._db = None
+        self._progress = OrderedDict()  # job id -> latest transcript text and output path
+        self._changed = {}  # job id -> Condition on self._lock, notified when that job's state may have changed
+        self._versions = {}  # job id -> count of transcript updates, so waiters can tell a new event from a timeout
+        self._queue_version = 0  # count of jobs queued, started or finished
+        self._dispatcher = None
+        self.max_concurrent, self.max_per_user, self.memory_gb = DEFAULT_MAX_CONCURRENT, DEFAULT_MAX_PER_USER, 0.0
+
+    def start(self):
+        """Open the database, queue interrupted jobs again and start dispatching. Safe to call twice."""
+        with self._lock:
+            if self._dispatcher is not None:
+                return
+            self._open()
+            self.max_concurrent, self.max_per_user, configured_gb = get_queue_settings()
+            if configured_gb:
+                self.memory_gb = configured_gb
+            else:
+                from auto_tuning import available_memory_bytes
+
+                available = available_memory_bytes()
+                self.memory_gb = available * AUTO_MEMORY_SHARE / 1024 ** 3 if available else 0.0
+            resumed = self._db.execute("UPDATE jobs SET status = 'queued', started = NULL WHERE status = 'running'").rowcount
+            waiting = self._db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            self._dispatcher = threading.Thread(target=self._dispatch_loop, name="job-queue", daemon=True)
+            self._dispatcher.start()
+        budget = f"{self.memory_gb:.1f} GB" if self.memory_gb else "unlimited"
+        logging.info(f"Job queue: {waiting} waiting ({resumed} resumed), up to {self.max_concurrent} at once, memory budget {budget}.")
+
+    def _open(self):
+        if self._db is not None:
+            return
+        path = Path(self._db_path or get_queue_db_path())
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # One connection shared under self._lock; autocommit keeps every statement durable
+        self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        if self._db.execute("PRAGMA user_version").fetchone()[0] not in (0, QUEUE_FORMAT_VERSION):
+            logging.warning(f"Job queue database {path} has an unknown format; starting a new one.")
+            self._db.execute("DROP TABLE IF EXISTS jobs")
+        self._db.executescript(SCHEMA)
+        self._db.execute(f"PRAGMA user_version = {QUEUE_FORMAT_VERSION}")
+
+    def submit(self, user, file_paths, params):
+        """Queue a transcription of ``file_paths`` with ``transcribe_file`` keyword ``params``; returns the job id."""
+        self.start()
+        media_seconds, model_key, model_gb, work_gb = estimate_job(file_paths, params)
+        if self.memory_gb and model_gb + work_gb > self.memory_gb:
+            raise JobRejected(f"needs about {model_gb + work_gb:.1f} GB, the budget is {self.memory_gb:.1f} GB")
+        with self._wakeup:
+            if self.max_per_user:
+                active = self._db.execute("SELECT COUNT(*) FROM jobs WHERE user = ? AND status IN ('queued', 'running')", (user,)).fetchone()[0]
+                if active >= self.max_per_user:
+                    raise JobRejected(f"{active} jobs already waiting or running (limit {self.max_per_user})")
+            cursor = self._db.execute(
+                "INSERT INTO jobs (user, status, created, file_paths, params, model_key, model_gb, work_gb, media_seconds) "
+                "VALUES (?, 'queued', ?, ?, ?, ?, ?, ?, ?)",
+                (user, self._clock(), json.dumps(list(file_paths)), json.dumps(params), model_key, model_gb, work_gb, media_seconds),
+            )
+            self._queue_changed()
+            self._wakeup.notify_all()
+        logging.info(f"Queued job {cursor.lastrowid} for {user}: {len(file_paths)} file(s), {media_seconds:.0f}s of media, ~{model_gb + work_gb:.1f} GB.")
+        return cursor.lastrowid
+
+    def _jobs(self, where, args=()):
+        return [dict(row) for row in self._db.execute(f"SELECT * FROM jobs WHERE {where}", args)]
+
+    def _ordered_queue(self, running):
+        running_per_user = {}
+        for job in running:
+            running_per_user[job["user"]] = running_per_user.get(job["user"], 0) + 1
+        last_started = {row["user"]: row["last"] for row in self._db.execute("SELECT user, MAX(started) AS last FROM jobs WHERE started IS NOT NULL GROUP BY user")}
+        return fair_order(self._jobs("status = 'queued'"), running_per_user, last_started)
+
+    def _admissible(self, job, running):
+        """Whether ``job`` may start next to ``running`` within the concurrency limit and memory budget."""
+        if len(running) >= self.max_concurrent:
+            return False
+        if not running or not self.memory_gb:
+            return True
+        models = {other["model_key"]: other["model_gb"] for other in running}
+        used = sum(models.values()) + sum(other["work_gb"] for other in running)
+        needed = job["work_gb"] + (0.0 if job["model_key"] in models else job["model_gb"])
+        return used + needed <= self.memory_gb
+
+    def _dispatch_loop(self):
+        while True:
+            with self._wakeup:
+                running = self._jobs("status = 'running'")
+                queued = self._ordered_queue(running)
+                # Only the head of the queue may start, so a large job is never overtaken forever
+                if queued and self._admissible(queued[0], running):
+                    job = queued[0]
+                    job["started"] = self._clock()
+                    self._db.execute("UPDATE jobs SET status = 'running', started = ? WHERE id = ?", (job["started"], job["id"]))
+                    self._progress[job["id"]] = {"text": "", "output_path": None}
+                    self._queue_changed()
+                    threading.Thread(target=self._run, args=(job,), name=f"job-{job['id']}", daemon=True).start()
+                    continue
+                self._wakeup.wait(DISPATCH_INTERVAL_SECONDS)
+
+    def _run(self, job):
+        job_id = job["id"]
+        logging.info(f"Starting job {job_id} for {job['user']}.")
+
+        def on_update(text, output_path):
+            with self._lock:
+                self._progress[job_id] = {"text": text, "output_path": output_path or self._progress[job_id]["output_path"]}
+                self._job_changed(job_id)
+
+        try:
+            text, outputs = self._run_job(json.loads(job["file_paths"]), json.loads(job["params"]), on_update)
+            status, error = ("done", None) if outputs else ("failed", text[-500:] or "No transcript was written")
+        except Exception as e:
+            logging.error(f"Job {job_id} failed: {e}")
+            outputs, status, error = [], "failed", str(e)
+        with self._wakeup:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, finished = ?, outputs = ?, error = ? WHERE id = ?",
+                (status, self._clock(), json.dumps(outputs), error, job_id),
+            )
+            finished = [key for key in self._progress if key != job_id and key not in self._running_ids()]
+            for key in finished[:max(0, len(finished) - FINISHED_PROGRESS_KEPT)]:
+                del self._progress[key]
+                self._versions.pop(key, None)
+            self._queue_changed()
+            # Its waiters are already woken and see a new version, so nobody waits on it again
+            self._changed.pop(job_id, None)
+            self._wakeup.notify_all()
+        logging.info(f"Job {job_id} {status}.")
+
+    def _job_changed(self, job_id):
+        # Caller holds self._lock
+        self._versions[job_id] = self._versions.get(job_id, 0) + 1
+        if job_id in self._changed:
+            self._changed[job_id].notify_all()
+
+    def _queue_changed(self):
+        # A job was queued, started or finished: every waiting job's status, position or ETA may move
+        self._queue_version += 1
+        for condition in self._changed.values():
+            condition.notify_all()
+
+    def _version(self, job_id):
+        return self._queue_version, self._versions.get(job_id, 0)
+
+    def wait_for_change(self, job_id, version, timeout=None):
+        """Block until job ``job_id`` changes after ``version`` (from ``status``) or ``timeout`` passes; return its new status."""
+        with self._lock:
+            condition = self._changed.setdefault(job_id, threading.Condition(self._lock))
+            condition.wait_for(lambda: self._version(job_id) != version, timeout)
+        return self.status(job_id)
+
+    def _running_ids(self):
+        return {row[0] for row in self._db.execute("SELECT id FROM jobs WHERE status = 'running'")}
+
+    def _rtf(self, device):
+        from pipeline_metrics import pipeline_metrics
+
+        return pipeline_metrics.summary()["rtf"] or DEFAULT_RTF.get(device, DEFAULT_RTF["cpu"])
+
+    def _estimate_seconds(self, job):
+        return job["media_seconds"] * self._rtf(json.loads(job["params"]).get("device", "cpu"))
+
+    def status(self, job_id):
+        """Return the job's state for the UI.
+
+        ``status`` is queued, running, done or failed. Waiting jobs also get
+        ``position`` (1-based) and ``eta_seconds`` until they start; running
+        jobs get ``eta_seconds`` until they finish and the latest ``text``.
+        ``version`` is what ``wait_for_change`` waits to move past.
+        """
+        with self._lock:
+            rows = self._jobs("id = ?", (job_id,))
+            if not rows:
+                return None
+            job = rows[0]
+            state = {
+                "id": job_id,
+                "status": job["status"],
+                "outputs": json.loads(job["outputs"] or "[]"),
+                "error": job["error"],
+                "version": self._version(job_id),
+                **self._progress.get(job_id, {"text": "", "output_path": None}),
+            }
+            if job["status"] not in ("queued", "running"):
+                return state
+            now = self._clock()
+            running = self._jobs("status = 'running'")
+            # Seconds until each slot frees up; queued jobs then take the earliest free slot in turn
+            slots = sorted(max(0.0, self._estimate_seconds(other) - (now - other["started"])) for other in running)
+            if job["status"] == "running":
+                state["eta_seconds"] = max(0.0, self._estimate_seconds(job) - (now - job["started"]))
+                return state
+            slots += [0.0] * max(0, self.max_concurrent - len(slots))
+            for position, queued in enumerate(self._ordered_queue(running), start=1):
+                slots.sort()
+                if queued["id"] == job_id:
+                    state.update(position=position, eta_seconds=slots[0])
+                    return state
+                slots[0] += self._estimate_seconds(queued)
+            return state
+
+    def recent_jobs(self, user, limit=10):
+        """The user's latest jobs, newest first, as dicts with their files and outputs decoded."""
+        with self._lock:
+            if self._db is None:
+                return []
+            rows = self._jobs("user = ? ORDER BY id DESC LIMIT ?", (user, limit))
+        for row in rows:
+            row["file_paths"] = json.loads(row["file_paths"])
+            row["outputs"] = json.loads(row["outputs"] or "[]")
+        return rows
+
+
+job_queue = JobQueue()
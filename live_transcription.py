@@ -0,0 +1,348 @@
+"""Real-time transcription of live audio (microphone chunks or ffmpeg streams).
+
+Audio is appended to a bounded buffer and re-transcribed every
+``step_seconds`` with the cached Whisper model. Segments that end more than
+``stable_margin_seconds`` before the newest audio are committed as stable
+and dropped from the buffer; the rest are reported as provisional and may
+still change. When the buffer reaches ``window_seconds`` everything but the
+last segment is committed, which bounds latency and memory.
+
+Usage:
+    python live_transcription.py rtsp://camera.local/stream
+    ffmpeg -i input.mkv -f wav - | python live_transcription.py -
+"""
+import argparse
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from urllib.parse import urljoin, urlsplit
+
+import numpy as np
+
+from audio_processing import SAMPLE_RATE
+
+DEFAULT_LIVE_SETTINGS = {
+    "window_seconds": 15.0,
+    "step_seconds": 1.0,
+    "stable_margin_seconds": 2.0,
+}
+DEFAULT_LIVE_MAX_SESSIONS = 1
+# Redirects an HTTP(S) stream may follow; every hop is validated again
+MAX_STREAM_REDIRECTS = 5
+HTTP_STREAM_TIMEOUT = (5, 30)  # (connect, read) seconds
+HTTP_RELAY_CHUNK_BYTES = 64 * 1024
+# Latency statistics cover the most recent stable segments, so a long session stays constant-cost
+LATENCY_WINDOW = 200
+
+
+def get_live_settings():
+    from config import load_default_values
+
+    configured = load_default_values().get("live_transcription") or {}
+    return {key: float(configured.get(key, default)) for key, default in DEFAULT_LIVE_SETTINGS.items()}
+
+
+def get_live_max_sessions():
+    """How many live sessions the UI transcribes at once; they run in-process, outside the job queue."""
+    from config import load_default_values
+
+    configured = load_default_values().get("live_transcription") or {}
+    return max(1, int(configured.get("max_sessions", DEFAULT_LIVE_MAX_SESSIONS)))
+
+
+def to_mono_16k(samples, sample_rate):
+    """Convert a microphone chunk (int or float, mono or multi-channel) to 16 kHz mono float32."""
+    audio = np.asarray(samples)
+    scale = np.iinfo(audio.dtype).max if np.issubdtype(audio.dtype, np.integer) else 1.0
+    audio = audio.astype(np.float32) / scale
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1)
+    if sample_rate != SAMPLE_RATE and audio.size:
+        duration = audio.size / sample_rate
+        target = np.linspace(0.0, duration, int(round(duration * SAMPLE_RATE)), endpoint=False)
+        source = np.arange(audio.size) / sample_rate
+        audio = np.interp(target, source, audio).astype(np.float32)
+    return audio
+
+
+class LiveTranscriber:
+    """Incremental transcription over a sliding window of live audio.
+
+    ``transcribe(audio, initial_prompt)`` returns the faster-whisper
+    segments for ``audio`` (timestamps relative to its start). ``feed``
+    returns the events produced by the new audio: ``stable`` segments (with
+    absolute ``start``/``end`` seconds and end-to-end ``latency``) and at
+    most one ``provisional`` event with the not yet committed text.
+    ``stable_text()`` is kept as a running string and ``latencies`` holds
+    the last ``LATENCY_WINDOW`` values, so a session of any length costs the
+    same per step.
+    """
+
+    def __init__(self, transcribe, window_seconds=15.0, step_seconds=1.0, stable_margin_seconds=2.0, clock=time.monotonic):
+        self._transcribe = transcribe
+        self.window_seconds = window_seconds
+        self.step_seconds = step_seconds
+        self.stable_margin_seconds = min(stable_margin_seconds, window_seconds / 2)
+        self._clock = clock
+        self._buffer = np.zeros(0, dtype=np.float32)
+        self._buffer_start = 0.0  # absolute stream time of the buffer's first sample
+        self._received = 0.0  # absolute stream time of the newest sample
+        self._unprocessed = 0.0
+        self._arrivals = deque()  # (stream time at chunk end, wall clock when received)
+        self._prompt = ""
+        self._stable_text = ""
+        self.stable_segments = 0
+        self.provisional = ""
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def feed(self, audio):
+        audio = np.asarray(audio, dtype=np.float32)
+        if not audio.size:
+            return []
+        self._buffer = np.concatenate([self._buffer, audio])
+        self._received += audio.size / SAMPLE_RATE
+        self._unprocessed += audio.size / SAMPLE_RATE
+        self._arrivals.append((self._received, self._clock()))
+        if self._unprocessed < self.step_seconds:
+            return []
+        return self._infer(final=False)
+
+    def flush(self):
+        """Commit everything still buffered (end of stream)."""
+        if not self._buffer.size:
+            return []
+        return self._infer(final=True)
+
+    def _arrival_time(self, stream_time):
+        for chunk_end, received_at in self._arrivals:
+            if chunk_end >= stream_time - 1e-6:
+                return received_at
+        return self._clock()
+
+    def _infer(self, final):
+        self._unprocessed = 0.0
+        segments = list(self._transcribe(self._buffer, self._prompt))
+        buffered = self._buffer.size / SAMPLE_RATE
+        if final:
+            commit = len(segments)
+        else:
+            commit = sum(1 for segment in segments if segment.end <= buffered - self.stable_margin_seconds)
+            if buffered >= self.window_seconds and commit == 0 and segments:
+                # Window full: force progress, keeping only the newest segment open
+                commit = max(1, len(segments) - 1)
+
+        events = []
+        now = self._clock()
+        for segment in segments[:commit]:
+            start = self._buffer_start + segment.start
+            end = self._buffer_start + segment.end
+            latency = now - self._arrival_time(end)
+            self.latencies.append(latency)
+            event = {"event": "stable", "text": segment.text.strip(), "start": start, "end": end, "latency": latency}
+            self.stable_segments += 1
+            if event["text"]:
+                self._stable_text += (" " if self._stable_text else "") + event["text"]
+            events.append(event)
+        if commit:
+            self._prompt = (self._prompt + " " + " ".join(event["text"] for event in events))[-200:]
+            self._trim(segments[commit - 1].end if not final else buffered)
+        elif not segments and buffered >= self.window_seconds:
+            # Only silence so far: keep just enough audio to catch a word starting now
+            self._trim(buffered - self.stable_margin_seconds)
+
+        self.provisional = "" if final else " ".join(segment.text.strip() for segment in segments[commit:])
+        if not final:
+            events.append({"event": "provisional", "text": self.provisional})
+        return events
+
+    def _trim(self, seconds):
+        samples = min(self._buffer.size, max(0, int(seconds * SAMPLE_RATE)))
+        self._buffer = self._buffer[samples:]
+        self._buffer_start += samples / SAMPLE_RATE
+        while self._arrivals and self._arrivals[0][0] < self._buffer_start:
+            self._arrivals.popleft()
+
+    def stable_text(self):
+        return self._stable_text
+
+    def latency_stats(self):
+        """Latency of the last ``LATENCY_WINDOW`` stable segments; ``segments`` counts the whole session."""
+        if not self.latencies:
+            return {"segments": 0}
+        return {
+            "segments": self.stable_segments,
+            "last": self.latencies[-1],
+            "mean": statistics.fmean(self.latencies),
+            "max": max(self.latencies),
+        }
+
+
+def create_live_transcriber(device, cpu_threads, num_workers, language, whisper_model, compute_type, beam_size, settings=None, profile=None):
+    """Build a ``LiveTranscriber`` on top of the cached Whisper model used for file transcription."""
+    from auto_tuning import resolve_profile
+    from transcription import get_batched_model
+
+    cpu_threads, num_workers, _batch_size, compute_type = resolve_profile(
+        profile, whisper_model, device, cpu_threads, num_workers, None, compute_type,
+    )
+    loaded = get_batched_model(whisper_model, compute_type, device, cpu_threads, num_workers)
+    if loaded is None:
+        raise RuntimeError("Error loading model")
+    model, _pipeline = loaded
+
+    def transcribe(audio, initial_prompt):
+        segments, _info = model.transcribe(
+            audio,
+            language=language,
+            beam_size=beam_size,
+            condition_on_previous_text=False,
+            initial_prompt=initial_prompt or None,
+            vad_filter=True,
+        )
+        return segments
+
+    return LiveTranscriber(transcribe, **(settings or get_live_settings()))
+
+
+def _pinned_https_adapter(hostname):
+    from requests.adapters import HTTPAdapter
+
+    class PinnedHostAdapter(HTTPAdapter):
+        # The URL names the validated IP; TLS still checks the certificate of the original host
+        def init_poolmanager(self, *args, **kwargs):
+            kwargs.update(server_hostname=hostname, assert_hostname=hostname)
+            super().init_poolmanager(*args, **kwargs)
+
+    return PinnedHostAdapter()
+
+
+def open_http_stream(url):
+    """GET an HTTP(S) stream over a connection to its validated address.
+
+    Redirects are followed here, not by the HTTP client, so each hop is
+    validated and pinned like the first URL. Returns the streaming response.
+    """
+    import requests
+
+    from security_utils import SecurityError, pin_stream_url
+
+    for _hop in range(MAX_STREAM_REDIRECTS + 1):
+        pinned_url, hostname = pin_stream_url(url)
+        session = requests.Session()
+        if urlsplit(pinned_url).scheme.lower() == "https":
+            session.mount("https://", _pinned_https_adapter(hostname))
+        host = f"[{hostname}]" if ":" in hostname else hostname
+        port = urlsplit(url).port
+        headers = {"Host": f"{host}:{port}" if port else host}
+        response = session.get(pinned_url, headers=headers, stream=True, allow_redirects=False, timeout=HTTP_STREAM_TIMEOUT)
+        if not response.is_redirect:
+            response.raise_for_status()
+            return response
+        response.close()
+        session.close()
+        url = urljoin(url, response.headers["Location"])
+    raise SecurityError(f"Stream URL redirects more than {MAX_STREAM_REDIRECTS} times.")
+
+
+def _relay(response, pipe):
+    try:
+        for chunk in response.iter_content(HTTP_RELAY_CHUNK_BYTES):
+            pipe.write(chunk)
+    except Exception as e:
+        # ffmpeg exiting closes the pipe; anything else just ends the stream early
+        logging.debug(f"Stream relay stopped: {e}")
+    finally:
+        response.close()
+        try:
+            pipe.close()
+        except OSError:
+            pass
+
+
+def open_stream(source):
+    """Start ffmpeg on a stream URL (or ``"-"`` for stdin) without letting it reach other hosts.
+
+    HTTP(S) streams are fetched by ``open_http_stream`` and piped to ffmpeg,
+    which may then only read that pipe, so redirects and HLS segment URLs
+    never bypass the address check. Other schemes connect to the validated
+    address with a per-scheme ``-protocol_whitelist``.
+    """
+    from audio_processing import open_pcm_stream
+    from security_utils import STREAM_PROTOCOL_WHITELIST, pin_stream_url
+
+    if source == "-":
+        return open_pcm_stream(source)
+    scheme = urlsplit(source).scheme.lower()
+    if scheme in ("http", "https"):
+        response = open_http_stream(source)
+        process = open_pcm_stream("-", input_options=["-protocol_whitelist", "pipe"], stdin=subprocess.PIPE)
+        threading.Thread(target=_relay, args=(response, process.stdin), name="stream-relay", daemon=True).start()
+        return process
+    pinned_url, _hostname = pin_stream_url(source)
+    return open_pcm_stream(pinned_url, input_options=["-protocol_whitelist", STREAM_PROTOCOL_WHITELIST[scheme]])
+
+
+def iter_stream_events(transcriber, source, stop_event=None):
+    """Decode ``source`` with ffmpeg and yield the transcriber's events until it ends or ``stop_event`` is set."""
+    process = open_stream(source)
+    read_size = int(transcriber.step_seconds * SAMPLE_RATE) * 4
+    try:
+        while stop_event is None or not stop_event.is_set():
+            data = process.stdout.read(read_size)
+            if not data:
+                break
+            # Keep whole float32 samples; a trailing partial sample is dropped
+            usable = len(data) - len(data) % 4
+            for event in transcriber.feed(np.frombuffer(data[:usable], dtype=np.float32)):
+                yield event
+        for event in transcriber.flush():
+            yield event
+    finally:
+        if process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=5)
+            except Exception:
+                process.kill()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Transcribe a live audio stream and print stable segments.")
+    parser.add_argument("source", help="Stream URL, or - to read media from stdin.")
+    parser.add_argument("--model", dest="whisper_model", help="Override whisper_model.")
+    parser.add_argument("--device", help="Override device (cpu/cuda).")
+    parser.add_argument("--language", help="Override language.")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', stream=sys.stderr)
+
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    from config import load_default_config
+    from security_utils import validate_stream_url
+
+    source = args.source if args.source == "-" else validate_stream_url(args.source)
+    settings = load_default_config()
+    for key in ("whisper_model", "device", "language"):
+        if getattr(args, key):
+            settings[key] = getattr(args, key)
+    transcriber = create_live_transcriber(
+        settings["device"], settings["cpu_threads"], settings["num_workers"], settings["language"],
+        settings["whisper_model"], settings["compute_type"], settings["beam_size"],
+        profile=settings.get("performance_profile"),
+    )
+    try:
+        for event in iter_stream_events(transcriber, source):
+            if event["event"] == "stable":
+                print(f"[{event['start']:.1f}-{event['end']:.1f}] {event['text']}  (latency {event['latency']:.2f}s)", flush=True)
+    except KeyboardInterrupt:
+        pass
+    logging.info(f"Latency: {transcriber.latency_stats()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,477 @@
+"""Asyncio LLM providers behind the AI Assistant.
+
+This is the only implementation of the provider streams and of the
+map-reduce pass over long transcripts; the blocking ``llms.query_*``
+functions drive it through ``iter_sync``.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+
+from config import get_translation as _
+from llm_chunking import CHARS_PER_TOKEN, chunk_transcript, estimate_tokens
+from llm_http import get_async_client
+from llms import (
+    LMSTUDIO_CONNECT_TIMEOUT,
+    LMSTUDIO_ENDPOINT,
+    LMSTUDIO_READ_TIMEOUT,
+    OLLAMA_ENDPOINT,
+    _build_map_prompts,
+    _build_prompts,
+    _build_reduce_prompts,
+    _chunking_config,
+    _quota_status,
+    default_values,
+    gemini_quota,
+    get_gemini_config,
+    get_transcript_token_budget,
+    initialize_client,
+    lmstudio_readiness,
+    ollama_readiness,
+)
+
+
+class ModelNotReadyError(RuntimeError):
+    """Raised when a local model could not be loaded before querying it."""
+
+
+class ProviderLimiter:
+    """Bounds the number of in-flight streams of one provider.
+
+    Request and token quotas (Gemini) are enforced separately by
+    ``llm_rate_limit.QuotaLimiter`` through ``AsyncProvider.admit``.
+    """
+
+    def __init__(self, max_concurrency):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self._semaphores = {}
+
+    @asynccontextmanager
+    async def slot(self):
+        # One semaphore per event loop: the UI's loop and the one behind iter_sync
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.setdefault(loop, asyncio.Semaphore(self.max_concurrency))
+        async with semaphore:
+            yield
+
+
+class AsyncProvider:
+    """Common interface of the asyncio LLM backends.
+
+    Subclasses implement ``_stream`` (an async generator of text deltas);
+    ``stream`` wraps it in the provider's concurrency/rate limits and, for
+    local providers, refreshes the model's readiness after every completed
+    request, map-reduce parts included. Cancelling the consuming task closes
+    the underlying HTTP stream.
+    """
+
+    name = "AI provider"
+    readiness = None
+    timeout_hint = ""
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+
+    def token_budget(self, fix_text):
+        raise NotImplementedError
+
+    async def ensure_ready(self, model):
+        """Async generator of status messages; raises ModelNotReadyError on failure."""
+        return
+        yield
+
+    async def _stream(self, model, system_prompt, user_prompt):
+        raise NotImplementedError
+        yield
+
+    async def admit(self, tokens):
+        """Async generator of ``(estimated seconds, callers ahead)`` while the request is queued by a quota.
+
+        ``stream`` runs it once per request unless the caller already did
+        (``admitted=True``), so every request is charged exactly once.
+        """
+        return
+        yield
+
+    def estimate_wait(self, requests, tokens):
+        """Seconds the quota would hold ``requests`` calls totalling ``tokens`` back."""
+        return 0.0
+
+    async def stream(self, model, system_prompt, user_prompt, admitted=False):
+        if not admitted:
+            async for _wait in self.admit(estimate_tokens(system_prompt) + estimate_tokens(user_prompt)):
+                pass
+        async with self.limiter.slot():
+            started = time.perf_counter()
+            first_token = True
+            async for delta in self._stream(model, system_prompt, user_prompt):
+                if first_token:
+                    first_token = False
+                    logging.info(f"{self.name} first token after {time.perf_counter() - started:.2f}s")
+                yield delta
+        if self.readiness is not None:
+            self.readiness.mark_ready(model)
+
+    async def complete(self, model, system_prompt, user_prompt):
+        parts = []
+        async for delta in self.stream(model, system_prompt, user_prompt):
+            parts.append(delta)
+        return "".join(parts)
+
+
+class _HttpProvider(AsyncProvider):
+    """Provider talking to a local HTTP server through the pooled client of ``llm_http``."""
+
+    endpoint = ""
+    timeout = httpx.Timeout(120.0)
+
+    def _post_stream(self, path, payload):
+        return get_async_client(self.endpoint).stream("POST", path, json=payload, timeout=self.timeout)
+
+    async def _wait_ready(self, readiness, model):
+        if readiness.is_ready(model):
+            return
+        yield _("llm_checking_model")
+        waiter = readiness.wait(model)
+        while True:
+            elapsed = await asyncio.to_thread(next, waiter, None)
+            if elapsed is None:
+                break
+            yield _("llm_model_loading").format(elapsed=elapsed)
+
+
+class OllamaAsyncProvider(_HttpProvider):
+    name = "Ollama"
+    endpoint = OLLAMA_ENDPOINT
+    readiness = ollama_readiness
+
+    def token_budget(self, fix_text):
+        return get_transcript_token_budget(_chunking_config().get("ollama_context_tokens", 4096), fix_text)
+
+    async def ensure_ready(self, model):
+        async for status in self._wait_ready(ollama_readiness, model):
+            yield status
+        if ollama_readiness.is_ready(model):
+            yield _("llm_model_ready")
+        else:
+            yield _("llm_model_sending")
+
+    async def _stream(self, model, system_prompt, user_prompt):
+        payload = {"model": model, "prompt": user_prompt, "system": system_prompt}
+        async with self._post_stream("/api/generate", payload) as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                if not line:
+                    continue
+                try:
+                    obj = json.loads(line)
+                except ValueError:
+                    yield line
+                    continue
+                # Streaming Ollama uses 'response' for incremental chunks
+                chunk = ""
+                if isinstance(obj, dict):
+                    chunk = obj.get("response") or obj.get("text") or obj.get("output") or ""
+                    if not chunk and isinstance(obj.get("results"), list):
+                        chunk = "".join(r["text"] for r in obj["results"] if isinstance(r, dict) and "text" in r)
+                if chunk:
+                    yield chunk
+
+
+class LMStudioAsyncProvider(_HttpProvider):
+    name = "LM Studio"
+    endpoint = LMSTUDIO_ENDPOINT
+    readiness = lmstudio_readiness
+    timeout = httpx.Timeout(LMSTUDIO_READ_TIMEOUT, connect=LMSTUDIO_CONNECT_TIMEOUT)
+    timeout_hint = "Increase LMSTUDIO_READ_TIMEOUT (or LMSTUDIO_TIMEOUT) and ensure the model is loaded in LM Studio."
+
+    def token_budget(self, fix_text):
+        return get_transcript_token_budget(_chunking_config().get("lmstudio_context_tokens", 4096), fix_text)
+
+    async def ensure_ready(self, model):
+        async for status in self._wait_ready(lmstudio_readiness, model):
+            yield status
+        if not lmstudio_readiness.is_ready(model):
+            raise ModelNotReadyError(_("llm_model_timeout_lmstudio"))
+        yield _("llm_model_ready")
+
+    async def _stream(self, model, system_prompt, user_prompt):
+        payload = {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            "temperature": 0.2,
+            "stream": True,
+        }
+        async with self._post_stream("/v1/chat/completions", payload) as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                if not line or line.strip() == "data: [DONE]":
+                    continue
+                if line.startswith("data: "):
+                    line = line[6:]
+                try:
+                    obj = json.loads(line)
+                except ValueError:
+                    continue
+                choices = obj.get("choices", []) if isinstance(obj, dict) else []
+                if choices and isinstance(choices[0], dict):
+                    delta = choices[0].get("delta", {})
+                    content = delta.get("content", "") if isinstance(delta, dict) else ""
+                    if content:
+                        yield content
+
+
+class GeminiAsyncProvider(AsyncProvider):
+    name = "Gemini"
+
+    def token_budget(self, fix_text):
+        gemini_config = default_values["gemini"]
+        return get_transcript_token_budget(
+            gemini_config["input_tokens"],
+            fix_text,
+            max_output_tokens=gemini_config.get("max_output_tokens"),
+        )
+
+    async def ensure_ready(self, model):
+        if not initialize_client():
+            raise ModelNotReadyError("Error: Gemini API key not found.")
+        yield _("llm_waiting_gemini")
+
+    async def admit(self, tokens):
+        async for wait, ahead in gemini_quota.acquire_async(tokens):
+            yield wait, ahead
+
+    def estimate_wait(self, requests, tokens):
+        return gemini_quota.estimate_wait(requests, tokens)
+
+    async def _stream(self, model, system_prompt, user_prompt):
+        client = initialize_client()
+        if not client:
+            raise ModelNotReadyError("Error: Gemini API key not found.")
+        response = await client.aio.models.generate_content_stream(
+            model=model,
+            contents=[user_prompt],
+            config=get_gemini_config(system_instruction=system_prompt),
+        )
+        output_chars = 0
+        try:
+            async for chunk in response:
+                if chunk.text:
+                    output_chars += len(chunk.text)
+                    yield chunk.text
+        finally:
+            gemini_quota.charge(int(output_chars / CHARS_PER_TOKEN))
+
+
+def _build_providers():
+    chunking = _chunking_config()
+    local_concurrency = chunking.get("local_parallel_requests", 2)
+    return {
+        "gemini": GeminiAsyncProvider(ProviderLimiter(chunking.get("gemini_parallel_requests", 4))),
+        "ollama": OllamaAsyncProvider(ProviderLimiter(local_concurrency)),
+        "lmstudio": LMStudioAsyncProvider(ProviderLimiter(local_concurrency)),
+    }
+
+
+PROVIDERS = _build_providers()
+
+
+def select_provider(provider, gemini_model, ollama_model=None, lmstudio_model=None):
+    """Map the UI provider choice to ``(AsyncProvider, model name)``."""
+    if provider and str(provider).lower().startswith('olla'):
+        return PROVIDERS["ollama"], ollama_model or (gemini_model if gemini_model else 'llama2')
+    if provider and str(provider).lower().startswith('lm'):
+        return PROVIDERS["lmstudio"], lmstudio_model or (gemini_model if gemini_model else "local-model")
+    return PROVIDERS["gemini"], gemini_model
+
+
+async def _gather_in_order(coroutines):
+    """Run coroutines concurrently and yield their results in order; cancel the rest on exit."""
+    tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+    try:
+        for index, task in enumerate(tasks):
+            yield index, await task
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def _map_reduce_async(backend, model, user_input, chunks, budget, fix_text, response_language):
+    """Answer a query over a transcript split into ``chunks``.
+
+    Every chunk is answered concurrently, bounded by the provider limiter,
+    and the partial answers are merged by a streamed reduce pass. Fix-text
+    mode has no reduce pass: corrected chunks are reassembled in their
+    original order as they become available.
+    """
+    total = len(chunks)
+    yield _("llm_chunking").format(count=total)
+
+    if fix_text:
+        fixed = []
+        async for _index, text in _gather_in_order(
+            backend.complete(model, *_build_prompts(user_input, chunk, True, response_language)) for chunk in chunks
+        ):
+            fixed.append(text.strip())
+            yield "\n\n".join(fixed)
+        return
+
+    partials = []
+    async for index, text in _gather_in_order(
+        backend.complete(model, *_build_map_prompts(user_input, chunk, response_language)) for chunk in chunks
+    ):
+        if text.strip():
+            partials.append(text.strip())
+        yield _("llm_chunk_progress").format(done=index + 1, total=total)
+
+    combined = "\n\n---\n\n".join(partials)
+    for _level in range(3):
+        if len(partials) <= 1 or estimate_tokens(combined) <= budget:
+            break
+        groups = chunk_transcript(combined, budget)
+        partials = []
+        async for _index, text in _gather_in_order(
+            backend.complete(model, *_build_reduce_prompts(user_input, group, response_language)) for group in groups
+        ):
+            if text.strip():
+                partials.append(text.strip())
+        combined = "\n\n---\n\n".join(partials)
+
+    yield _("llm_reducing")
+    accumulated = ""
+    async for delta in backend.stream(model, *_build_reduce_prompts(user_input, combined, response_language)):
+        accumulated += delta
+        yield accumulated
+
+
+async def query_async(user_input, transcription, gemini_model, provider="Gemini", ollama_model=None, lmstudio_model=None, fix_text=False, response_language="Italiano"):
+    """Query the selected provider and yield the progressively accumulated text.
+
+    ``provider`` is the UI choice (Gemini, Ollama or LM Studio). Transcripts
+    larger than the provider's context are answered with a map-reduce pass.
+    Cancelling the consuming task (e.g. a Gradio ``cancels=`` event) aborts
+    the in-flight stream.
+    """
+    backend, model = select_provider(provider, gemini_model, ollama_model, lmstudio_model)
+    try:
+        if backend is PROVIDERS["lmstudio"] and not lmstudio_model:
+            yield "Error querying LM Studio: no model selected."
+            return
+
+        async for status in backend.ensure_ready(model):
+            yield status
+
+        budget = backend.token_budget(fix_text)
+        chunks = chunk_transcript(transcription, budget)
+        if len(chunks) > 1:
+            # Each part is admitted by the quota when it is sent; announce the expected wait up front
+            queued = backend.estimate_wait(len(chunks), sum(estimate_tokens(chunk) for chunk in chunks))
+            if queued > 0:
+                yield _quota_status(queued, 0)
+            async for text in _map_reduce_async(backend, model, user_input, chunks, budget, fix_text, response_language):
+                yield text
+            return
+
+        sys_prompt, user_prompt = _build_prompts(user_input, transcription, fix_text, response_language)
+        async for wait, ahead in backend.admit(estimate_tokens(sys_prompt) + estimate_tokens(user_prompt)):
+            yield _quota_status(wait, ahead)
+        accumulated = ""
+        async for delta in backend.stream(model, sys_prompt, user_prompt, admitted=True):
+            accumulated += delta
+            yield accumulated
+    except asyncio.CancelledError:
+        logging.info(f"{backend.name} query cancelled.")
+        raise
+    except ModelNotReadyError as e:
+        yield str(e)
+    except httpx.ReadTimeout as e:
+        logging.error(f"{backend.name} timed out: {e}")
+        yield f"Error querying {backend.name}: request timed out while waiting for model output. {backend.timeout_hint}".rstrip()
+    except Exception as e:
+        if backend.readiness is not None:
+            backend.readiness.invalidate(model)
+        logging.error(f"Error querying {backend.name}: {e}")
+        yield f"Error querying {backend.name}: {e}"
+
+
+_session_tasks = {}
+
+
+async def query_for_session(session_key, *args, **kwargs):
+    """Run ``query_async`` so that a new query from the same session cancels the previous one.
+
+    The stream is produced by a background task; starting another query with
+    the same ``session_key`` (or closing this generator) cancels that task
+    and with it the provider request.
+    """
+    results = asyncio.Queue()
+
+    async def produce():
+        try:
+            async for text in query_async(*args, **kwargs):
+                results.put_nowait(("text", text))
+        finally:
+            results.put_nowait(("end", None))
+
+    previous = _session_tasks.get(session_key)
+    if previous is not None and not previous.done():
+        previous.cancel()
+    task = asyncio.create_task(produce())
+    _session_tasks[session_key] = task
+    try:
+        while True:
+            kind, text = await results.get()
+            if kind == "end":
+                return
+            yield text
+    finally:
+        if not task.done():
+            task.cancel()
+        if _session_tasks.get(session_key) is task:
+            del _session_tasks[session_key]
+
+
+_sync_loop = None
+_sync_loop_lock = threading.Lock()
+
+
+def _get_sync_loop():
+    global _sync_loop
+    with _sync_loop_lock:
+        if _sync_loop is None:
+            _sync_loop = asyncio.new_event_loop()
+            threading.Thread(target=_sync_loop.run_forever, name="llm-async", daemon=True).start()
+        return _sync_loop
+
+
+async def _next_item(agen):
+    try:
+        return False, await agen.__anext__()
+    except StopAsyncIteration:
+        return True, None
+
+
+def iter_sync(agen):
+    """Drive the async generator ``agen`` from blocking code.
+
+    Every call shares one background event loop, so HTTP clients and
+    provider limits are reused across calls. Closing the returned generator
+    early closes ``agen`` and with it the provider request.
+    """
+    loop = _get_sync_loop()
+    try:
+        while True:
+            done, item = asyncio.run_coroutine_threadsafe(_next_item(agen), loop).result()
+            if done:
+                return
+            yield item
+    finally:
+        asyncio.run_coroutine_threadsafe(agen.aclose(), loop).result()
@@ -0,0 +1,67 @@
+import logging
+import math
+import re
+
+# Rough average for the tokenizers we target; deliberately conservative so
+# chunks stay inside the context window without calling a real tokenizer.
+CHARS_PER_TOKEN = 3.5
+
+# Split after the first whitespace following a sentence end, so the pieces
+# still join back into the original text
+_SENTENCE_END = re.compile(r"(?<=[.!?…]\s)")
+
+
+def estimate_tokens(text):
+    """Estimate the token count of ``text``."""
+    if not text:
+        return 0
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+
+def _split_units(text, max_tokens):
+    """Split text into units no larger than ``max_tokens``.
+
+    Transcripts hold one segment per line, so lines are the preferred
+    boundary; overlong lines fall back to sentence boundaries and, as a last
+    resort, to fixed-size slices.
+    """
+    # The longest slice whose estimate still fits in ``max_tokens``
+    max_chars = max(1, math.ceil(max_tokens * CHARS_PER_TOKEN) - 1)
+    for line in text.splitlines(keepends=True):
+        if estimate_tokens(line) <= max_tokens:
+            yield line
+            continue
+        for sentence in _SENTENCE_END.split(line):
+            if estimate_tokens(sentence) <= max_tokens:
+                yield sentence
+                continue
+            for start in range(0, len(sentence), max_chars):
+                yield sentence[start:start + max_chars]
+
+
+def chunk_transcript(text, max_tokens):
+    """Pack a transcript into ordered chunks of at most ``max_tokens`` each.
+
+    Chunks always end on a segment (line) or sentence boundary unless a
+    single sentence is larger than the budget.
+    """
+    max_tokens = max(1, int(max_tokens))
+    if estimate_tokens(text) <= max_tokens:
+        return [text] if text else []
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    for unit in _split_units(text, max_tokens):
+        unit_tokens = estimate_tokens(unit)
+        if current and current_tokens + unit_tokens > max_tokens:
+            chunks.append("".join(current))
+            current = []
+            current_tokens = 0
+        current.append(unit)
+        current_tokens += unit_tokens
+    if current:
+        chunks.append("".join(current))
+    logging.info(f"Split transcript (~{estimate_tokens(text)} tokens) into {len(chunks)} chunks of <= {max_tokens} tokens.")
+    return chunks
+
@@ -0,0 +1,88 @@
+import asyncio
+import threading
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from env_utils import env_int
+
+DEFAULT_POOL_SIZE = 8
+DEFAULT_RETRIES = 2
+
+_sessions = {}
+_async_clients = {}
+_sessions_lock = threading.Lock()
+
+
+def _pool_settings():
+    return (
+        max(1, env_int("LLM_HTTP_POOL_SIZE", DEFAULT_POOL_SIZE)),
+        max(0, env_int("LLM_HTTP_RETRIES", DEFAULT_RETRIES)),
+    )
+
+
+def _build_session(pool_size, retries):
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=0.2,
+        status_forcelist=(502, 503, 504),
+        # Only idempotent calls are retried after the request was sent;
+        # generation POSTs are retried on connection errors only.
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session(endpoint):
+    """Return the shared keep-alive session for ``endpoint``.
+
+    One session (and connection pool) is kept per base URL so readiness
+    polls, model listings and streaming queries reuse open TCP connections.
+    The pool size and retry count come from ``LLM_HTTP_POOL_SIZE`` and
+    ``LLM_HTTP_RETRIES``.
+    """
+    key = endpoint.rstrip("/")
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = _build_session(*_pool_settings())
+            _sessions[key] = session
+        return session
+
+
+def get_async_client(endpoint):
+    """Return the shared ``httpx.AsyncClient`` for ``endpoint`` on the running event loop.
+
+    The streaming queries of ``llm_async`` use it with the same pool size as
+    ``get_session``. ``LLM_HTTP_RETRIES`` only retries failed connections,
+    so a generation request that reached the server is never sent twice.
+    httpx connections belong to one event loop, hence one client per loop.
+    """
+    key = (endpoint.rstrip("/"), asyncio.get_running_loop())
+    with _sessions_lock:
+        client = _async_clients.get(key)
+        if client is None:
+            pool_size, retries = _pool_settings()
+            limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+            client = httpx.AsyncClient(base_url=key[0], transport=httpx.AsyncHTTPTransport(limits=limits, retries=retries))
+            _async_clients[key] = client
+        return client
+
+
+def close_sessions():
+    """Close every pooled session (e.g. on shutdown)."""
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
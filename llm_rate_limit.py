@@ -0,0 +1,323 @@
+"""Client-side enforcement of the Gemini quotas declared in default_values.yaml.
+
+Requests per minute and tokens per minute are modelled as token buckets.
+Requests per day use a fixed daily window, like the API: a continuously
+refilled bucket that starts full could admit up to twice the quota within
+one day. Callers queue in FIFO order and are told how long they are
+expected to wait instead of receiving a 429. Bucket levels are persisted so
+the daily quota survives restarts.
+"""
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from itertools import count
+from pathlib import Path
+
+from env_utils import env_int
+
+STATE_FORMAT_VERSION = 1
+MAX_WAIT_TICK_SECONDS = 1.0
+# Gemini's daily quotas reset at midnight Pacific time
+QUOTA_DAY_TIMEZONE = "America/Los_Angeles"
+
+
+class TokenBucket:
+    """A bucket of ``capacity`` units refilled continuously at ``refill_per_second``.
+
+    Times are wall-clock (``time.time``) so a persisted bucket can be
+    refilled correctly after a restart.
+    """
+
+    def __init__(self, capacity, refill_per_second, level=None, updated=None):
+        self.capacity = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+        self.level = self.capacity if level is None else min(float(level), self.capacity)
+        self.updated = time.time() if updated is None else float(updated)
+
+    def refill(self, now):
+        if now > self.updated:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+
+    def time_until(self, amount, now):
+        """Seconds until ``amount`` units are available (0 if they already are)."""
+        self.refill(now)
+        missing = amount - self.level
+        if missing <= 0:
+            return 0.0
+        if self.refill_per_second <= 0:
+            return float("inf")
+        return missing / self.refill_per_second
+
+    def consume(self, amount, now):
+        """Take ``amount`` units; the level may go negative to record overuse."""
+        self.refill(now)
+        self.level -= amount
+
+    def to_dict(self):
+        return {"level": self.level, "updated": self.updated}
+
+
+def _quota_day_timezone():
+    try:
+        from zoneinfo import ZoneInfo
+
+        return ZoneInfo(QUOTA_DAY_TIMEZONE)
+    except Exception as e:
+        logging.debug(f"Time zone {QUOTA_DAY_TIMEZONE} unavailable ({e}); daily quotas reset at midnight UTC.")
+        return timezone.utc
+
+
+class DailyBucket(TokenBucket):
+    """``capacity`` units per quota day, restored in full at midnight of ``tz``.
+
+    Within one day it never grants more than ``capacity`` units, whatever
+    the timing of the calls.
+    """
+
+    def __init__(self, capacity, tz=None, level=None, updated=None):
+        super().__init__(capacity, 0.0, level, updated)
+        self.tz = tz or _quota_day_timezone()
+
+    def _day(self, now):
+        return datetime.fromtimestamp(now, self.tz).date()
+
+    def refill(self, now):
+        if now > self.updated:
+            if self._day(now) != self._day(self.updated):
+                self.level = self.capacity
+            self.updated = now
+
+    def time_until(self, amount, now):
+        self.refill(now)
+        if amount <= self.level:
+            return 0.0
+        midnight = datetime.combine(self._day(now) + timedelta(days=1), datetime.min.time(), self.tz)
+        return max(0.0, midnight.timestamp() - now)
+
+
+def get_state_path():
+    configured = os.getenv("GEMINI_QUOTA_STATE_FILE")
+    if configured:
+        return Path(configured).expanduser().resolve()
+    if sys.platform == "win32" and os.getenv("LOCALAPPDATA"):
+        base = Path(os.environ["LOCALAPPDATA"])
+    else:
+        base = Path(os.getenv("XDG_STATE_HOME") or Path.home() / ".local" / "state")
+    return (base / "whisper-utility" / "gemini_quota.json").resolve()
+
+
+class QuotaLimiter:
+    """FIFO admission queue in front of a set of token buckets.
+
+    ``limits`` maps a bucket name to ``(capacity, period, unit)`` where
+    ``period`` is a number of seconds (token bucket) or ``"day"`` (a
+    ``DailyBucket``) and ``unit`` is ``"requests"`` or ``"tokens"``. Every admitted call
+    consumes one unit from each request bucket and its estimated token count
+    from each token bucket.
+    """
+
+    def __init__(self, name, limits, state_path=None):
+        self.name = name
+        self.state_path = state_path
+        self._units = {}
+        self._buckets = {}
+        for bucket_name, (capacity, period, unit) in limits.items():
+            if not capacity:
+                continue
+            self._units[bucket_name] = unit
+            self._buckets[bucket_name] = DailyBucket(capacity) if period == "day" else TokenBucket(capacity, capacity / period)
+        self._condition = threading.Condition()
+        self._queue = deque()
+        self._tickets = count()
+        self._load_state()
+
+    def _load_state(self):
+        if not self.state_path:
+            return
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as state_file:
+                state = json.load(state_file)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable {self.name} quota state {self.state_path}: {e}")
+            return
+        if state.get("version") != STATE_FORMAT_VERSION:
+            return
+        for bucket_name, saved in state.get("buckets", {}).items():
+            bucket = self._buckets.get(bucket_name)
+            if bucket is not None and saved.get("capacity") == bucket.capacity:
+                bucket.level = min(float(saved["level"]), bucket.capacity)
+                bucket.updated = float(saved["updated"])
+
+    def _save_state(self):
+        if not self.state_path:
+            return
+        state = {
+            "version": STATE_FORMAT_VERSION,
+            "buckets": {
+                bucket_name: dict(bucket.to_dict(), capacity=bucket.capacity)
+                for bucket_name, bucket in self._buckets.items()
+            },
+        }
+        try:
+            directory = Path(self.state_path).parent
+            directory.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as tmp_file:
+                    json.dump(state, tmp_file)
+                os.replace(tmp_name, self.state_path)
+            except Exception:
+                Path(tmp_name).unlink(missing_ok=True)
+                raise
+        except OSError as e:
+            logging.debug(f"Could not persist {self.name} quota state: {e}")
+
+    def _demand(self, requests, token_counts):
+        """Units each bucket must hold for ``requests`` calls using ``token_counts`` tokens.
+
+        A single call larger than a token bucket counts as its full capacity;
+        it could never be admitted otherwise.
+        """
+        demand = {}
+        for bucket_name, unit in self._units.items():
+            if unit == "tokens":
+                capacity = self._buckets[bucket_name].capacity
+                demand[bucket_name] = sum(min(tokens, capacity) for tokens in token_counts)
+            else:
+                demand[bucket_name] = requests
+        return demand
+
+    def _wait_for(self, demand, now):
+        return max((self._buckets[name].time_until(amount, now) for name, amount in demand.items()), default=0.0)
+
+    def estimate_wait(self, requests=1, tokens=0):
+        """Seconds until ``requests`` calls totalling ``tokens`` could start, behind the current queue."""
+        with self._condition:
+            token_counts = [ticket_tokens for _ticket, ticket_tokens in self._queue] + [tokens]
+            return self._wait_for(self._demand(len(self._queue) + requests, token_counts), time.time())
+
+    def _poll(self, ticket, tokens):
+        """Admit ``ticket`` if it is first in line and the buckets allow it.
+
+        Returns ``(0, 0)`` once admitted, otherwise ``(estimated seconds, callers ahead)``.
+        """
+        now = time.time()
+        token_counts = []
+        for queued_ticket, ticket_tokens in self._queue:
+            if queued_ticket == ticket:
+                break
+            token_counts.append(ticket_tokens)
+        position = len(token_counts)
+        wait = self._wait_for(self._demand(position + 1, token_counts + [tokens]), now)
+        if position == 0 and wait <= 0:
+            for bucket_name, amount in self._demand(1, [tokens]).items():
+                self._buckets[bucket_name].consume(amount, now)
+            self._queue.popleft()
+            self._save_state()
+            self._condition.notify_all()
+            return 0.0, 0
+        return max(wait, 0.01), position
+
+    def _enqueue(self, tokens):
+        ticket = next(self._tickets)
+        self._queue.append((ticket, tokens))
+        return ticket
+
+    def _abandon(self, ticket):
+        for item in self._queue:
+            if item[0] == ticket:
+                self._queue.remove(item)
+                self._condition.notify_all()
+                break
+
+    def acquire(self, tokens=0):
+        """Wait for a slot, yielding ``(estimated seconds, callers ahead)`` while queued.
+
+        Returns without yielding when the call can start immediately. Closing
+        the generator early gives the place in the queue back.
+        """
+        with self._condition:
+            ticket = self._enqueue(tokens)
+        admitted = False
+        try:
+            while True:
+                with self._condition:
+                    wait, ahead = self._poll(ticket, tokens)
+                    if not wait:
+                        admitted = True
+                        return
+                yield wait, ahead
+                with self._condition:
+                    self._condition.wait(min(wait, MAX_WAIT_TICK_SECONDS))
+        finally:
+            if not admitted:
+                with self._condition:
+                    self._abandon(ticket)
+
+    def wait(self, tokens=0):
+        """Block until a slot is available."""
+        for wait, ahead in self.acquire(tokens):
+            logging.debug(f"{self.name} quota: waiting ~{wait:.1f}s ({ahead} ahead)")
+
+    async def acquire_async(self, tokens=0):
+        """Asyncio version of ``acquire``; cancelling the task leaves the queue."""
+        with self._condition:
+            ticket = self._enqueue(tokens)
+        admitted = False
+        try:
+            while True:
+                with self._condition:
+                    wait, ahead = self._poll(ticket, tokens)
+                    if not wait:
+                        admitted = True
+                        return
+                yield wait, ahead
+                await asyncio.sleep(min(wait, MAX_WAIT_TICK_SECONDS))
+        finally:
+            if not admitted:
+                with self._condition:
+                    self._abandon(ticket)
+
+    def charge(self, tokens):
+        """Debit tokens used beyond the admission estimate (e.g. the generated output)."""
+        if tokens <= 0:
+            return
+        with self._condition:
+            now = time.time()
+            for bucket_name, unit in self._units.items():
+                if unit == "tokens":
+                    self._buckets[bucket_name].consume(tokens, now)
+            self._save_state()
+
+    def stats(self):
+        with self._condition:
+            now = time.time()
+            buckets = {}
+            for bucket_name, bucket in self._buckets.items():
+                bucket.refill(now)
+                buckets[bucket_name] = {"available": int(bucket.level), "capacity": int(bucket.capacity)}
+            return {"queued": len(self._queue), "buckets": buckets}
+
+
+def build_gemini_quota(gemini_config):
+    """Build the limiter for the ``gemini`` section of default_values.yaml.
+
+    Persistence can be disabled with ``GEMINI_QUOTA_PERSIST=0``.
+    """
+    limits = {
+        "requests_per_minute": (gemini_config.get("requests_per_minute"), 60, "requests"),
+        "requests_per_day": (gemini_config.get("requests_per_day"), "day", "requests"),
+        "tokens_per_minute": (gemini_config.get("tokens_per_minute"), 60, "tokens"),
+    }
+    state_path = get_state_path() if env_int("GEMINI_QUOTA_PERSIST", 1) else None
+    return QuotaLimiter("Gemini", limits, state_path=state_path)
@@ -0,0 +1,123 @@
+import logging
+import threading
+import time
+
+DEFAULT_READY_TTL_SECONDS = 60
+DEFAULT_WARMUP_TIMEOUT_SECONDS = 60
+MIN_POLL_SECONDS = 0.25
+MAX_POLL_SECONDS = 2.0
+
+
+class ModelReadiness:
+    """Track whether models of one local LLM provider are loaded.
+
+    ``check(model)`` asks the provider whether a model is loaded and
+    ``warm(model)`` asks it to load one. Warm-ups run in a background thread
+    that polls with an adaptive backoff and wakes every waiter as soon as the
+    model is ready, so callers never sleep longer than necessary. A positive
+    result is cached for ``ttl`` seconds; during that window queries skip the
+    readiness check entirely.
+    """
+
+    def __init__(self, provider, check, warm=None, ttl=DEFAULT_READY_TTL_SECONDS, warmup_timeout=DEFAULT_WARMUP_TIMEOUT_SECONDS):
+        self.provider = provider
+        self._check = check
+        self._warm = warm
+        self.ttl = ttl
+        self.warmup_timeout = warmup_timeout
+        self._lock = threading.Lock()
+        self._states = {}
+
+    def _state(self, model_name):
+        state = self._states.get(model_name)
+        if state is None:
+            state = {"ready_at": None, "event": threading.Event(), "warming": False}
+            self._states[model_name] = state
+        return state
+
+    def is_ready(self, model_name):
+        """Whether ``model_name`` was seen loaded within the cache TTL."""
+        with self._lock:
+            ready_at = self._state(model_name)["ready_at"]
+        return ready_at is not None and time.monotonic() - ready_at < self.ttl
+
+    def mark_ready(self, model_name):
+        with self._lock:
+            state = self._state(model_name)
+            state["ready_at"] = time.monotonic()
+            state["event"].set()
+
+    def invalidate(self, model_name):
+        with self._lock:
+            state = self._state(model_name)
+            state["ready_at"] = None
+            state["event"].clear()
+
+    def warm_up(self, model_name):
+        """Start loading ``model_name`` in the background (no-op if ready or already warming)."""
+        if not model_name or self.is_ready(model_name):
+            return
+        with self._lock:
+            state = self._state(model_name)
+            if state["warming"]:
+                return
+            state["warming"] = True
+            state["event"].clear()
+        threading.Thread(
+            target=self._warm_up_worker,
+            args=(model_name,),
+            name=f"{self.provider}-warmup",
+            daemon=True,
+        ).start()
+
+    def _warm_up_worker(self, model_name):
+        try:
+            if self._check(model_name):
+                self.mark_ready(model_name)
+                return
+            if self._warm is not None:
+                logging.info(f"Warming up {self.provider} model {model_name}...")
+                self._warm(model_name)
+            deadline = time.monotonic() + self.warmup_timeout
+            delay = MIN_POLL_SECONDS
+            while time.monotonic() < deadline:
+                if self._check(model_name):
+                    logging.info(f"{self.provider} model {model_name} is ready.")
+                    self.mark_ready(model_name)
+                    return
+                time.sleep(delay)
+                delay = min(delay * 1.5, MAX_POLL_SECONDS)
+            logging.warning(f"{self.provider} model {model_name} not ready after {self.warmup_timeout}s.")
+        except Exception as e:
+            logging.debug(f"Warm-up of {self.provider} model {model_name} failed: {e}")
+        finally:
+            with self._lock:
+                self._state(model_name)["warming"] = False
+                # Release waiters even on failure; they re-check is_ready()
+                self._state(model_name)["event"].set()
+
+    def wait(self, model_name, timeout=DEFAULT_WARMUP_TIMEOUT_SECONDS, tick=1.0):
+        """Wait until ``model_name`` is ready, yielding the elapsed seconds once per ``tick``.
+
+        Returns without yielding when the model is already known to be
+        ready. Check ``is_ready`` afterwards to tell success from timeout.
+        """
+        if self.is_ready(model_name):
+            return
+        self.warm_up(model_name)
+        started = time.monotonic()
+        last_reported = None
+        while True:
+            with self._lock:
+                event = self._state(model_name)["event"]
+            elapsed = time.monotonic() - started
+            if self.is_ready(model_name) or elapsed >= timeout:
+                return
+            if int(elapsed) != last_reported:
+                last_reported = int(elapsed)
+                yield last_reported
+            if event.wait(min(tick, max(0.0, timeout - elapsed))) and not self.is_ready(model_name):
+                # A warm-up attempt finished without success: start another one
+                with self._lock:
+                    event.clear()
+                self.warm_up(model_name)
@@ -1,22 +1,11 @@
 import logging
-import requests
-import json
 import os
-import time
-from config import load_default_values, get_gemini_api_key, get_translation as _
-from google import genai
-from google.genai import types
-
-def _env_int(name, default):
-    """Read integer env var with safe fallback."""
-    value = os.getenv(name)
-    if value is None:
-        return default
-    try:
-        return int(value)
-    except ValueError:
-        logging.warning("Invalid %s=%r. Falling back to %s.", name, value, default)
-        return default
+from config import load_default_values, get_translation as _
+from env_utils import env_int
+from gemini_client import CachedValue, get_client, get_models_ttl_seconds
+from llm_http import get_session
+from llm_rate_limit import build_gemini_quota
+from llm_readiness import ModelReadiness
 
 
 OLLAMA_ENDPOINT = os.getenv("OLLAMA_ENDPOINT", "http://127.0.0.1:11434")
@@ -24,16 +13,17 @@ LMSTUDIO_ENDPOINT = os.getenv("LMSTUDIO_ENDPOINT", "http://127.0.0.1:1234")
 
 # LM Studio can be slow with larger local models. Allow separate connect/read
 # timeouts and keep backward compatibility with LMSTUDIO_TIMEOUT.
-LMSTUDIO_TIMEOUT = _env_int("LMSTUDIO_TIMEOUT", 120)
-LMSTUDIO_CONNECT_TIMEOUT = _env_int("LMSTUDIO_CONNECT_TIMEOUT", 5)
-LMSTUDIO_READ_TIMEOUT = _env_int("LMSTUDIO_READ_TIMEOUT", LMSTUDIO_TIMEOUT)
+LMSTUDIO_TIMEOUT = env_int("LMSTUDIO_TIMEOUT", 120)
+LMSTUDIO_CONNECT_TIMEOUT = env_int("LMSTUDIO_CONNECT_TIMEOUT", 5)
+LMSTUDIO_READ_TIMEOUT = env_int("LMSTUDIO_READ_TIMEOUT", LMSTUDIO_TIMEOUT)
 
 default_values = load_default_values()
+gemini_quota = build_gemini_quota(default_values['gemini'])
 
 def _is_model_loaded_ollama(model_name: str) -> bool:
     try:
         url = OLLAMA_ENDPOINT.rstrip("/") + "/api/ps"
-        resp = requests.get(url, timeout=3)
+        resp = get_session(OLLAMA_ENDPOINT).get(url, timeout=3)
         if resp.status_code == 200:
             data = resp.json()
             loaded = [m.get("name", "") for m in data.get("models", [])]
@@ -45,7 +35,7 @@ def _is_model_loaded_ollama(model_name: str) -> bool:
 def _is_model_loaded_lmstudio(model_name: str) -> bool:
     try:
         url = LMSTUDIO_ENDPOINT.rstrip("/") + "/v1/models"
-        resp = requests.get(url, timeout=3)
+        resp = get_session(LMSTUDIO_ENDPOINT).get(url, timeout=3)
         if resp.status_code == 200:
             data = resp.json()
             ids = [m.get("id", "") for m in data.get("data", [])]
@@ -58,7 +48,7 @@ def _trigger_lmstudio_load(model_name: str) -> None:
     try:
         url = LMSTUDIO_ENDPOINT.rstrip("/") + "/api/v1/models/load"
         payload = {"model": model_name}
-        resp = requests.post(url, json=payload, timeout=5)
+        resp = get_session(LMSTUDIO_ENDPOINT).post(url, json=payload, timeout=5)
         if resp.status_code == 200:
             logging.info(f"Triggered load for model {model_name} on LM Studio (/api/v1/models/load)")
             return
@@ -67,13 +57,46 @@ def _trigger_lmstudio_load(model_name: str) -> None:
     try:
         url = LMSTUDIO_ENDPOINT.rstrip("/") + "/v1/models/load"
         payload = {"model": model_name}
-        resp = requests.post(url, json=payload, timeout=5)
+        resp = get_session(LMSTUDIO_ENDPOINT).post(url, json=payload, timeout=5)
         if resp.status_code == 200:
             logging.info(f"Triggered load for model {model_name} on LM Studio (/v1/models/load)")
             return
     except Exception:
         pass
 
+def _trigger_ollama_load(model_name: str) -> None:
+    # A generate request without a prompt only loads the model into memory
+    try:
+        url = OLLAMA_ENDPOINT.rstrip("/") + "/api/generate"
+        resp = get_session(OLLAMA_ENDPOINT).post(url, json={"model": model_name, "stream": False}, timeout=(5, 120))
+        if resp.status_code == 200:
+            logging.info(f"Triggered load for model {model_name} on Ollama")
+    except Exception:
+        pass
+
+ollama_readiness = ModelReadiness(
+    "Ollama",
+    _is_model_loaded_ollama,
+    _trigger_ollama_load,
+    ttl=env_int("LLM_READY_TTL_SECONDS", 60),
+)
+lmstudio_readiness = ModelReadiness(
+    "LM Studio",
+    _is_model_loaded_lmstudio,
+    _trigger_lmstudio_load,
+    ttl=env_int("LLM_READY_TTL_SECONDS", 60),
+)
+
+def warm_up_model(provider, model_name):
+    """Start loading a local model in the background, e.g. when it is selected in the UI."""
+    if not model_name:
+        return
+    provider = str(provider or "").lower()
+    if provider.startswith("olla"):
+        ollama_readiness.warm_up(model_name)
+    elif provider.startswith("lm"):
+        lmstudio_readiness.warm_up(model_name)
+
 SYSTEM_PROMPT = (
     "Rispondi in modo chiaro e utile basandoti sulla trascrizione fornita. \n"
     "NON iniziare la risposta indicando che si tratta di una trascrizione. \n"
@@ -102,18 +125,42 @@ SYSTEM_PROMPT_FIX_TEXT_EN = (
     "Return exclusively the corrected text, with no comments, preambles, or explanations."
 )
 
+SYSTEM_PROMPT_MAP = (
+    "Ricevi una parte di una trascrizione più lunga. \n"
+    "Rispondi alla richiesta dell'utente basandoti solo su questa parte, mantenendo tutti i dettagli rilevanti "
+    "(nomi, numeri, decisioni, attività), perché le risposte parziali verranno unite in seguito. \n"
+    "Se la parte non contiene nulla di rilevante, rispondi con una stringa vuota."
+)
+
+SYSTEM_PROMPT_MAP_EN = (
+    "You receive one part of a longer transcription. \n"
+    "Answer the user's request using only this part and keep every relevant detail "
+    "(names, figures, decisions, action items), because the partial answers will be merged later. \n"
+    "If the part contains nothing relevant, reply with an empty string."
+)
+
+SYSTEM_PROMPT_REDUCE = (
+    "Ricevi, in ordine, le risposte parziali calcolate su parti consecutive di una trascrizione lunga. \n"
+    "Uniscile in un'unica risposta chiara e coerente alla richiesta dell'utente, eliminando le ripetizioni. \n"
+    "NON menzionare le parti e NON iniziare la risposta indicando che si tratta di una trascrizione."
+)
+
+SYSTEM_PROMPT_REDUCE_EN = (
+    "You receive, in order, partial answers computed on consecutive parts of a long transcription. \n"
+    "Merge them into a single clear and coherent answer to the user's request, removing repetitions. \n"
+    "DO NOT mention the parts and DO NOT start your response by stating that it is a transcription."
+)
 
 
 def initialize_client():
-    """Initialize the Gemini client."""
-    GEMINI_API_KEY = get_gemini_api_key()
-    if not GEMINI_API_KEY:
-        return None
-    return genai.Client(api_key=GEMINI_API_KEY)
+    """Return the shared Gemini client (None when no API key is configured)."""
+    return get_client()
 
 
 def get_gemini_config(system_instruction=None):
     """Get the configuration for Gemini generation."""
+    # Imported here: google.genai is slow to import and not needed at startup
+    from google.genai import types
     gemini_config = default_values['gemini']
 
     
@@ -151,86 +198,70 @@ def get_gemini_config(system_instruction=None):
     )
 
 
+def _is_english(response_language):
+    return str(response_language).strip().lower() == "english"
+
+
+def _build_prompts(user_input, transcription, fix_text=False, response_language="Italiano"):
+    """Return the ``(system prompt, user prompt)`` pair for a transcript query."""
+    is_english = _is_english(response_language)
+    if fix_text:
+        sys_prompt = SYSTEM_PROMPT_FIX_TEXT_EN if is_english else SYSTEM_PROMPT_FIX_TEXT
+    else:
+        sys_prompt = SYSTEM_PROMPT_EN if is_english else SYSTEM_PROMPT
+
+    if is_english:
+        user_prompt = f"# Transcription\n{transcription}\n\nUser prompt: \n{user_input}"
+    else:
+        user_prompt = f"# Trascrizione\n{transcription}\n\nUser prompt: \n{user_input}"
+    return sys_prompt, user_prompt
+
+
+def _build_map_prompts(user_input, chunk, response_language="Italiano"):
+    """Prompts for answering the user's request on one part of a long transcript."""
+    if _is_english(response_language):
+        return SYSTEM_PROMPT_MAP_EN, f"# Transcription\n{chunk}\n\nUser prompt: \n{user_input}"
+    return SYSTEM_PROMPT_MAP, f"# Trascrizione\n{chunk}\n\nUser prompt: \n{user_input}"
+
+
+def _build_reduce_prompts(user_input, partials, response_language="Italiano"):
+    """Prompts for merging the partial answers computed on consecutive parts."""
+    if _is_english(response_language):
+        return SYSTEM_PROMPT_REDUCE_EN, f"# Partial answers\n{partials}\n\nUser prompt: \n{user_input}"
+    return SYSTEM_PROMPT_REDUCE, f"# Risposte parziali\n{partials}\n\nUser prompt: \n{user_input}"
+
+
+def _chunking_config():
+    return default_values.get("llm_chunking", {}) or {}
+
+
+def get_transcript_token_budget(context_tokens, fix_text=False, max_output_tokens=None):
+    """Return how many transcript tokens fit in one request.
+
+    Part of the context is kept free for the system prompt, the user request
+    and the answer. In fix-text mode the answer is as long as the input, so
+    chunks are also capped by the provider's maximum output length.
+    """
+    chunking = _chunking_config()
+    if fix_text:
+        budget = int(context_tokens * chunking.get("fix_text_share", 0.4))
+        if max_output_tokens:
+            budget = min(budget, int(max_output_tokens * 0.8))
+    else:
+        budget = int(context_tokens * chunking.get("transcript_share", 0.6))
+    return max(256, budget)
+
 
 def query_ollama(user_input, transcription, ollama_model, fix_text=False, response_language="Italiano"):
     """Query a local Ollama server with streaming.
 
-    Yields the accumulated text progressively as Ollama streams NDJSON
-    lines with partial ``response`` fields.
+    Blocking wrapper over ``llm_async.query_async``: yields the accumulated
+    text progressively. Transcripts larger than the configured context
+    window are answered with a chunked map-reduce pass.
 
     response_language: "Italiano" (default) or "English".
     """
-    try:
-        yield _("llm_checking_model")
-        
-        ready = False
-        elapsed = 0
-        while elapsed < 60:
-            if _is_model_loaded_ollama(ollama_model):
-                ready = True
-                break
-            yield _("llm_model_loading").format(elapsed=elapsed)
-            time.sleep(2)
-            elapsed += 2
-            
-        if not ready:
-            yield _("llm_model_sending")
-        else:
-            yield _("llm_model_ready")
-
-        is_english = str(response_language).strip().lower() == "english"
-        if fix_text:
-            sys_prompt = SYSTEM_PROMPT_FIX_TEXT_EN if is_english else SYSTEM_PROMPT_FIX_TEXT
-        else:
-            sys_prompt = SYSTEM_PROMPT_EN if is_english else SYSTEM_PROMPT
-
-        if is_english:
-            prompt = (
-                f"# Transcription\n{transcription}\n\n"
-                f"User prompt: \n{user_input}"
-            )
-        else:
-            prompt = (
-                f"# Trascrizione\n{transcription}\n\n"
-                f"User prompt: \n{user_input}"
-            )
-        url = OLLAMA_ENDPOINT.rstrip("/") + "/api/generate"
-        payload = {
-            "model": ollama_model,
-            "prompt": prompt,
-            "system": sys_prompt,
-        }
-        resp = requests.post(url, json=payload, timeout=120, stream=True)
-        resp.raise_for_status()
-        accumulated = ""
-        for line in resp.iter_lines(decode_unicode=True):
-            if not line:
-                continue
-            try:
-                obj = json.loads(line)
-            except Exception:
-                accumulated += line
-                yield accumulated
-                continue
-            # Streaming Ollama uses 'response' for incremental chunks
-            chunk = ""
-            if isinstance(obj, dict):
-                if 'response' in obj:
-                    chunk = obj['response']
-                elif 'text' in obj:
-                    chunk = obj['text']
-                elif 'output' in obj:
-                    chunk = obj['output']
-                elif 'results' in obj and isinstance(obj['results'], list):
-                    for r in obj['results']:
-                        if isinstance(r, dict) and 'text' in r:
-                            chunk += r['text']
-            if chunk:
-                accumulated += chunk
-                yield accumulated
-    except Exception as e:
-        logging.error(f"Error querying Ollama at {OLLAMA_ENDPOINT}: {e}")
-        yield f"Error querying Ollama: {e}"
+    yield from query_gemini(user_input, transcription, None, provider="Ollama", ollama_model=ollama_model, fix_text=fix_text, response_language=response_language)
 
 
 def list_ollama_models():
@@ -243,7 +274,7 @@ def list_ollama_models():
         for path in ("/models", "/api/tags"):
             url = OLLAMA_ENDPOINT.rstrip("/") + path
             try:
-                resp = requests.get(url, timeout=5)
+                resp = get_session(OLLAMA_ENDPOINT).get(url, timeout=5)
                 resp.raise_for_status()
             except Exception:
                 continue
@@ -282,102 +313,20 @@ def list_ollama_models():
 def query_lmstudio(user_input, transcription, lmstudio_model, fix_text=False, response_language="Italiano"):
     """Query a local LM Studio server using the OpenAI-compatible streaming API.
 
-    Yields the accumulated text progressively by parsing SSE delta chunks.
+    Blocking wrapper over ``llm_async.query_async``: yields the accumulated
+    text progressively. Transcripts larger than the configured context
+    window are answered with a chunked map-reduce pass.
 
     response_language: "Italiano" (default) or "English".
     """
-    try:
-        if not lmstudio_model:
-            yield "Error querying LM Studio: no model selected."
-            return
-
-        yield _("llm_checking_model")
-        
-        _trigger_lmstudio_load(lmstudio_model)
-        
-        ready = False
-        elapsed = 0
-        while elapsed < 60:
-            if _is_model_loaded_lmstudio(lmstudio_model):
-                ready = True
-                break
-            yield _("llm_model_loading").format(elapsed=elapsed)
-            time.sleep(2)
-            elapsed += 2
-            
-        if not ready:
-            yield _("llm_model_timeout_lmstudio")
-            return
-
-        yield _("llm_model_ready")
-
-        is_english = str(response_language).strip().lower() == "english"
-        if fix_text:
-            sys_prompt = SYSTEM_PROMPT_FIX_TEXT_EN if is_english else SYSTEM_PROMPT_FIX_TEXT
-        else:
-            sys_prompt = SYSTEM_PROMPT_EN if is_english else SYSTEM_PROMPT
-
-        if is_english:
-            user_content = f"# Transcription\n{transcription}\n\nUser prompt: \n{user_input}"
-        else:
-            user_content = f"# Trascrizione\n{transcription}\n\nUser prompt: \n{user_input}"
-        url = LMSTUDIO_ENDPOINT.rstrip("/") + "/v1/chat/completions"
-        payload = {
-            "model": lmstudio_model,
-            "messages": [
-                {
-                    "role": "system",
-                    "content": sys_prompt,
-                },
-                {
-                    "role": "user",
-                    "content": user_content,
-                },
-            ],
-            "temperature": 0.2,
-            "stream": True,
-        }
-        resp = requests.post(
-            url,
-            json=payload,
-            timeout=(LMSTUDIO_CONNECT_TIMEOUT, LMSTUDIO_READ_TIMEOUT),
-            stream=True,
-        )
-        resp.raise_for_status()
-        accumulated = ""
-        for line in resp.iter_lines(decode_unicode=True):
-            if not line or line.strip() == "data: [DONE]":
-                continue
-            # SSE lines start with "data: "
-            if line.startswith("data: "):
-                line = line[6:]
-            try:
-                obj = json.loads(line)
-                choices = obj.get("choices", []) if isinstance(obj, dict) else []
-                if choices and isinstance(choices[0], dict):
-                    delta = choices[0].get("delta", {})
-                    content = delta.get("content", "") if isinstance(delta, dict) else ""
-                    if content:
-                        accumulated += content
-                        yield accumulated
-            except Exception:
-                continue
-    except requests.exceptions.ReadTimeout as e:
-        logging.error(f"LM Studio timed out at {LMSTUDIO_ENDPOINT}: {e}")
-        yield (
-            "Error querying LM Studio: request timed out while waiting for model output. "
-            "Increase LMSTUDIO_READ_TIMEOUT (or LMSTUDIO_TIMEOUT) and ensure the model is loaded in LM Studio."
-        )
-    except Exception as e:
-        logging.error(f"Error querying LM Studio at {LMSTUDIO_ENDPOINT}: {e}")
-        yield f"Error querying LM Studio: {e}"
+    yield from query_gemini(user_input, transcription, None, provider="LM Studio", lmstudio_model=lmstudio_model, fix_text=fix_text, response_language=response_language)
 
 
 def list_lmstudio_models():
     """Return a list of available LM Studio models from the local server."""
     try:
         url = LMSTUDIO_ENDPOINT.rstrip("/") + "/v1/models"
-        resp = requests.get(url, timeout=5)
+        resp = get_session(LMSTUDIO_ENDPOINT).get(url, timeout=5)
         resp.raise_for_status()
         data = resp.json()
         out = []
@@ -400,130 +349,117 @@ def list_lmstudio_models():
         return []
 
 
+def _quota_status(wait, ahead):
+    return _("llm_rate_limit_wait").format(seconds=int(wait) + 1, ahead=ahead)
+
+
 def query_gemini(user_input, transcription, gemini_model, provider="Gemini", ollama_model=None, lmstudio_model=None, fix_text=False, response_language="Italiano"):
     """Dispatch query to the selected provider and stream the response.
 
-    This is a generator: it yields the progressively accumulated text so
-    that Gradio can update the UI in real time. Signature is compatible
-    with the UI which passes inputs.
+    This is a generator: it yields the progressively accumulated text. It
+    runs ``llm_async.query_async``, which the UI calls directly, on a
+    background event loop for callers outside asyncio.
 
     response_language: "Italiano" (default) or "English" — controls the
     language the LLM is instructed to reply in.
     """
-    try:
-        if provider and str(provider).lower().startswith('olla'):
-            model_name = ollama_model or (gemini_model if gemini_model else 'llama2')
-            yield from query_ollama(user_input, transcription, model_name, fix_text=fix_text, response_language=response_language)
-            return
+    # Imported here: llm_async builds on this module
+    from llm_async import iter_sync, query_async
 
-        if provider and str(provider).lower().startswith('lm'):
-            model_name = lmstudio_model or (gemini_model if gemini_model else "local-model")
-            yield from query_lmstudio(user_input, transcription, model_name, fix_text=fix_text, response_language=response_language)
-            return
-
-        # Use Gemini
-        client = initialize_client()
-        if not client:
-            yield "Error: Gemini API key not found."
-            return
-
-        yield _("llm_waiting_gemini")
-
-        is_english = str(response_language).strip().lower() == "english"
-        if fix_text:
-            sys_prompt = SYSTEM_PROMPT_FIX_TEXT_EN if is_english else SYSTEM_PROMPT_FIX_TEXT
-        else:
-            sys_prompt = SYSTEM_PROMPT_EN if is_english else SYSTEM_PROMPT
-
-        if is_english:
-            user_prompt = f"# Transcription\n{transcription}\n\nUser prompt: \n{user_input}"
-        else:
-            user_prompt = f"# Trascrizione\n{transcription}\n\nUser prompt: \n{user_input}"
-
-        config = get_gemini_config(system_instruction=sys_prompt)
-
-        accumulated = ""
-        for chunk in client.models.generate_content_stream(
-            model=gemini_model,
-            contents=[user_prompt],
-            config=config,
-        ):
-            if chunk.text:
-                accumulated += chunk.text
-                yield accumulated
-    except Exception as e:
-        logging.error(f"Error querying AI provider: {e}")
-        yield f"Error querying AI provider: {e}"
+    yield from iter_sync(query_async(
+        user_input, transcription, gemini_model, provider=provider, ollama_model=ollama_model,
+        lmstudio_model=lmstudio_model, fix_text=fix_text, response_language=response_language,
+    ))
 
 
-def get_sorted_gemini_models(api_key: str) -> list[str]:
+def _list_sorted_gemini_models():
     """
     Recupera tutti i modelli Gemini e Gemma disponibili tramite API
     e li ordina posizionando il più recente all'inizio.
     """
-    if not api_key:
+    import re
+    client = get_client()
+    if client is None:
         return []
+    retrieved_models = []
+    
+    # 1. Recupera i modelli dall'API
+    for model in client.models.list():
+        name_lower = model.name.lower()
+        # Includi solo modelli generativi per testo/visione che siano Gemini o Gemma
+        if model.supported_actions and "generateContent" in model.supported_actions:
+            if "gemini" in name_lower or "gemma" in name_lower:
+                # Escludi esplicitamente modelli di embeddings, audio, image, tts, video, tool, robotics, computer
+                exclude_keywords = ["embed", "audio", "image", "tts", "video", "tool", "robotics", "computer"]
+                if any(kw in name_lower for kw in exclude_keywords):
+                    continue
+                clean_name = model.name.replace("models/", "")
+                retrieved_models.append(clean_name)
+                
+    if not retrieved_models:
+        return []
+
+    # 2. Algoritmo di ordinamento semantico (Latest-First)
+    def get_sort_key(name):
+        name_lower = name.lower()
         
-    try:
-        import re
-        client = genai.Client(api_key=api_key)
-        retrieved_models = []
+        # Priorità per i modelli 'latest' (0 = prima, 1 = dopo)
+        is_latest = 0 if "latest" in name_lower else 1
         
-        # 1. Recupera i modelli dall'API
-        for model in client.models.list():
-            name_lower = model.name.lower()
-            # Includi solo modelli generativi per testo/visione che siano Gemini o Gemma
-            if model.supported_actions and "generateContent" in model.supported_actions:
-                if "gemini" in name_lower or "gemma" in name_lower:
-                    # Escludi esplicitamente modelli di embeddings, audio, image, tts, video, tool, robotics, computer
-                    exclude_keywords = ["embed", "audio", "image", "tts", "video", "tool", "robotics", "computer"]
-                    if any(kw in name_lower for kw in exclude_keywords):
-                        continue
-                    clean_name = model.name.replace("models/", "")
-                    retrieved_models.append(clean_name)
-                    
-        if not retrieved_models:
-            return []
-
-        # 2. Algoritmo di ordinamento semantico (Latest-First)
-        def get_sort_key(name):
-            name_lower = name.lower()
-            
-            # Priorità per i modelli 'latest' (0 = prima, 1 = dopo)
-            is_latest = 0 if "latest" in name_lower else 1
-            
-            # Priorità del brand (Gemini prima di Gemma)
-            brand_priority = 1 if "gemini" in name_lower else 2
-            
-            # Estrazione della versione numerica principale
-            version = 1.0
-            brand_match = re.search(r'(?:gemini|gemma)-?(\d+(?:\.\d+)?)', name_lower)
-            if brand_match:
-                val_str = brand_match.group(1)
-                match_str = brand_match.group(0)
-                idx = name_lower.find(match_str) + len(match_str)
-                if idx < len(name_lower) and name_lower[idx] == 'b':
-                    version = 1.0
-                else:
-                    version = float(val_str)
-                    
-            # Priorità del tipo di modello (preferiamo 'flash' per il default, poi 'pro', poi altri)
-            flavor_priority = 3
-            if "flash" in name_lower:
-                flavor_priority = 1
-            elif "pro" in name_lower:
-                flavor_priority = 2
-                
-            # Restituiamo una tupla per ordinare:
-            # - is_latest (latest in cima)
-            # - version decrescente (-version)
-            # - brand_priority crescente (Gemini prima di Gemma)
-            # - flavor_priority crescente (Flash prima di Pro)
-            # - nome alfabetico decrescente per tie-break
-            return (is_latest, -version, brand_priority, flavor_priority, name_lower)
-
-        return sorted(retrieved_models, key=get_sort_key)
+        # Priorità del brand (Gemini prima di Gemma)
+        brand_priority = 1 if "gemini" in name_lower else 2
         
+        # Estrazione della versione numerica principale
+        version = 1.0
+        brand_match = re.search(r'(?:gemini|gemma)-?(\d+(?:\.\d+)?)', name_lower)
+        if brand_match:
+            val_str = brand_match.group(1)
+            match_str = brand_match.group(0)
+            idx = name_lower.find(match_str) + len(match_str)
+            if idx < len(name_lower) and name_lower[idx] == 'b':
+                version = 1.0
+            else:
+                version = float(val_str)
+                
+        # Priorità del tipo di modello (preferiamo 'flash' per il default, poi 'pro', poi altri)
+        flavor_priority = 3
+        if "flash" in name_lower:
+            flavor_priority = 1
+        elif "pro" in name_lower:
+            flavor_priority = 2
+            
+        # Restituiamo una tupla per ordinare:
+        # - is_latest (latest in cima)
+        # - version decrescente (-version)
+        # - brand_priority crescente (Gemini prima di Gemma)
+        # - flavor_priority crescente (Flash prima di Pro)
+        # - nome alfabetico decrescente per tie-break
+        return (is_latest, -version, brand_priority, flavor_priority, name_lower)
+
+    return sorted(retrieved_models, key=get_sort_key)
+
+
+gemini_models_cache = CachedValue("Gemini model list", _list_sorted_gemini_models, get_models_ttl_seconds())
+_models_cache_client = None
+
+
+def get_sorted_gemini_models(api_key=None, block=True) -> list[str]:
+    """Return the sorted Gemini/Gemma models from a TTL cache shared by the UI and queries.
+
+    Only the very first call (per API key) waits for the network; later
+    calls return the cached list and refresh it in the background once it
+    is older than ``GEMINI_MODELS_TTL_SECONDS``. ``api_key`` is kept for
+    backward compatibility: the key of the shared client is used.
+    """
+    global _models_cache_client
+    client = get_client()
+    if client is None:
+        return []
+    if client is not _models_cache_client:
+        gemini_models_cache.invalidate()
+        _models_cache_client = client
+    try:
+        return list(gemini_models_cache.get(block=block) or [])
     except Exception as e:
         logging.error(f"Impossibile connettersi a Gemini API o recuperare i modelli: {e}")
         return []
@@ -1,5 +1,12 @@
+from startup_timing import report
 from ui import demo, custom_css
 from security_utils import get_gradio_launch_kwargs
+from pipeline_metrics import start_metrics_server
+from job_queue import job_queue
 
 if __name__ == "__main__":
+    report()
+    start_metrics_server()
+    # Resume the jobs queued before the last shutdown
+    job_queue.start()
     demo.launch(css=custom_css, inbrowser=True, **get_gradio_launch_kwargs(debug=True))
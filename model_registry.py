@@ -0,0 +1,142 @@
+import gc
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from env_utils import env_int
+
+DEFAULT_MODEL_CACHE_SIZE = 2
+
+
+def model_cache_key(model_size, compute_type, device, cpu_threads, num_workers):
+    """Build the registry key for a set of WhisperModel load parameters."""
+    return (str(model_size), str(compute_type), str(device), int(cpu_threads), int(num_workers))
+
+
+class ModelRegistry:
+    """Process-wide LRU cache of loaded Whisper models.
+
+    Entries are keyed by the parameters passed to ``WhisperModel`` and hold
+    whatever the loader returns (the transcription module stores the model
+    together with its ``BatchedInferencePipeline``). At most ``max_models``
+    entries are kept; the least recently used one is dropped when a new model
+    has to be loaded. ``max_models=0`` disables caching entirely.
+    """
+
+    def __init__(self, max_models=None):
+        if max_models is None:
+            max_models = env_int("WHISPER_MODEL_CACHE_SIZE", DEFAULT_MODEL_CACHE_SIZE, minimum=0)
+        self.max_models = max_models
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._load_seconds = 0.0
+        self._last_load_seconds = {}
+
+    def _key_lock(self, key):
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = threading.Lock()
+                self._key_locks[key] = lock
+            return lock
+
+    def get(self, key, loader):
+        """Return the cached entry for ``key``, loading it with ``loader()`` on a miss.
+
+        Concurrent callers asking for the same key wait for a single load
+        instead of loading the weights twice. A loader returning ``None`` is
+        treated as a failed load and is not cached.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return self._entries[key]
+
+        with self._key_lock(key):
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return self._entries[key]
+                self._misses += 1
+
+            started = time.perf_counter()
+            entry = loader()
+            elapsed = time.perf_counter() - started
+            if entry is None:
+                return None
+
+            with self._lock:
+                self._load_seconds += elapsed
+                self._last_load_seconds[key] = elapsed
+                if self.max_models > 0:
+                    self._entries[key] = entry
+                    self._entries.move_to_end(key)
+                    self._evict_locked()
+            logging.info(f"Model {key[0]} loaded in {elapsed:.2f}s (cache: {self.stats_line()})")
+            return entry
+
+    def _evict_locked(self):
+        evicted = False
+        while len(self._entries) > self.max_models:
+            key, _entry = self._entries.popitem(last=False)
+            self._evictions += 1
+            evicted = True
+            logging.info(f"Evicted model from cache: {key}")
+        if evicted:
+            gc.collect()
+
+    def unload(self, key=None):
+        """Drop one cached model (or every model when ``key`` is None).
+
+        Returns the number of entries removed.
+        """
+        with self._lock:
+            if key is None:
+                removed = len(self._entries)
+                self._entries.clear()
+            else:
+                removed = 1 if self._entries.pop(key, None) is not None else 0
+        if removed:
+            gc.collect()
+            logging.info(f"Unloaded {removed} cached model(s).")
+        return removed
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries.keys())
+
+    def stats(self):
+        """Return hit/miss counters and cumulative load time."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "cached_models": len(self._entries),
+                "max_models": self.max_models,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": (self._hits / lookups) if lookups else 0.0,
+                "load_seconds_total": self._load_seconds,
+                "load_seconds_by_model": {
+                    "/".join(str(part) for part in key): seconds
+                    for key, seconds in self._last_load_seconds.items()
+                },
+            }
+
+    def stats_line(self):
+        stats = self.stats()
+        return (
+            f"{stats['cached_models']}/{stats['max_models']} cached, "
+            f"{stats['hits']} hits, {stats['misses']} misses, "
+            f"{stats['load_seconds_total']:.2f}s spent loading"
+        )
+
+
+model_registry = ModelRegistry()
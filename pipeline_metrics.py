@@ -0,0 +1,263 @@
+"""Timing spans of the transcription pipeline and their aggregates.
+
+Each stage of a file (``STAGES``) is timed with ``pipeline_metrics.span``,
+which also records how many seconds of audio the stage covered, so every
+stage has its own real-time factor. Spans are aggregated per stage for the
+whole process (count, errors, total and maximum seconds, audio seconds and
+a latency histogram) and, inside ``collect``, also appended to the span
+list of the file being processed. The aggregates back the session summary
+in the UI and a Prometheus text endpoint (``start_metrics_server``), so
+real-time-factor regressions can be alerted on.
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import load_default_values
+
+STAGES = ("validate", "probe", "convert", "vad", "model_load", "first_segment", "inference", "write")
+# Histogram bucket upper bounds, in seconds (stage durations) and in seconds per audio second (RTF)
+DURATION_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+RTF_BUCKETS = (0.01, 0.02, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 5)
+DEFAULT_METRICS_HOST = "127.0.0.1"
+
+
+def _histogram(buckets):
+    return {"buckets": [0] * len(buckets), "count": 0, "sum": 0.0}
+
+
+def _observe(histogram, bounds, value):
+    for index, bound in enumerate(bounds):
+        if value <= bound:
+            histogram["buckets"][index] += 1
+    histogram["count"] += 1
+    histogram["sum"] += value
+
+
+class PipelineMetrics:
+    """Process-wide aggregates of pipeline spans and finished files."""
+
+    def __init__(self, clock=time.perf_counter):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._started = time.time()
+            self._stages = {}
+            self._files = {"done": 0, "cached": 0, "error": 0}
+            self._media_seconds = 0.0
+            self._processing_seconds = 0.0
+            self._last_rtf = None
+            self._rtf = _histogram(RTF_BUCKETS)
+
+    @contextmanager
+    def collect(self, spans):
+        """Also append the spans recorded by this thread to ``spans`` (one file's span list)."""
+        previous = getattr(self._local, "spans", None)
+        self._local.spans = spans
+        try:
+            yield spans
+        finally:
+            self._local.spans = previous
+
+    @contextmanager
+    def span(self, stage, audio_seconds=None):
+        """Time the enclosed block as ``stage``.
+
+        Yields the span dict; the block may set its ``audio_seconds`` once
+        known (e.g. after probing). An exception is counted as an error of
+        the stage and re-raised.
+        """
+        entry = {"stage": stage, "seconds": 0.0, "audio_seconds": audio_seconds}
+        started = self._clock()
+        try:
+            yield entry
+        except BaseException:
+            entry["error"] = True
+            raise
+        finally:
+            entry["seconds"] = self._clock() - started
+            self._add(entry)
+
+    def record(self, stage, seconds, audio_seconds=None):
+        """Record a span measured elsewhere (e.g. the latency to the first segment)."""
+        entry = {"stage": stage, "seconds": seconds, "audio_seconds": audio_seconds}
+        self._add(entry)
+        return entry
+
+    def _add(self, entry):
+        spans = getattr(self._local, "spans", None)
+        if spans is not None:
+            spans.append(entry)
+        with self._lock:
+            stage = self._stages.get(entry["stage"])
+            if stage is None:
+                stage = {"count": 0, "errors": 0, "seconds": 0.0, "max_seconds": 0.0, "audio_seconds": 0.0, "audio_span_seconds": 0.0, "histogram": _histogram(DURATION_BUCKETS)}
+                self._stages[entry["stage"]] = stage
+            stage["count"] += 1
+            stage["errors"] += 1 if entry.get("error") else 0
+            stage["seconds"] += entry["seconds"]
+            stage["max_seconds"] = max(stage["max_seconds"], entry["seconds"])
+            if entry["audio_seconds"]:
+                stage["audio_seconds"] += entry["audio_seconds"]
+                # Only spans that know their audio count towards the stage RTF
+                stage["audio_span_seconds"] += entry["seconds"]
+            _observe(stage["histogram"], DURATION_BUCKETS, entry["seconds"])
+
+    def record_file(self, status, processing_seconds=0.0, media_seconds=None):
+        """Count a finished file (``done``, ``cached`` or ``error``) and its real-time factor.
+
+        ``processing_seconds`` is the prepare plus inference time of the
+        file; cached files and files of unknown length do not affect the RTF.
+        """
+        with self._lock:
+            self._files[status] = self._files.get(status, 0) + 1
+            if status != "done" or not media_seconds:
+                return
+            rtf = processing_seconds / media_seconds
+            self._media_seconds += media_seconds
+            self._processing_seconds += processing_seconds
+            self._last_rtf = rtf
+            _observe(self._rtf, RTF_BUCKETS, rtf)
+
+    def summary(self):
+        """Return the aggregates since the process started (or the last ``reset``)."""
+        with self._lock:
+            stages = {}
+            for name in sorted(self._stages, key=lambda name: STAGES.index(name) if name in STAGES else len(STAGES)):
+                stage = self._stages[name]
+                stages[name] = {
+                    "count": stage["count"],
+                    "errors": stage["errors"],
+                    "seconds": stage["seconds"],
+                    "mean_seconds": stage["seconds"] / stage["count"],
+                    "max_seconds": stage["max_seconds"],
+                    "audio_seconds": stage["audio_seconds"],
+                    "rtf": stage["audio_span_seconds"] / stage["audio_seconds"] if stage["audio_seconds"] else None,
+                }
+            return {
+                "since": self._started,
+                "files": dict(self._files),
+                "media_seconds": self._media_seconds,
+                "processing_seconds": self._processing_seconds,
+                "rtf": self._processing_seconds / self._media_seconds if self._media_seconds else None,
+                "last_rtf": self._last_rtf,
+                "stages": stages,
+            }
+
+    def render_prometheus(self):
+        """Render the aggregates in the Prometheus text exposition format."""
+        with self._lock:
+            lines = [
+                "# HELP whisper_stage_duration_seconds Wall time of one pipeline stage of one file.",
+                "# TYPE whisper_stage_duration_seconds histogram",
+            ]
+            for name, stage in self._stages.items():
+                lines += _histogram_lines("whisper_stage_duration_seconds", f'stage="{name}"', DURATION_BUCKETS, stage["histogram"])
+            lines += ["# HELP whisper_stage_audio_seconds_total Seconds of audio covered by the spans of each stage.", "# TYPE whisper_stage_audio_seconds_total counter"]
+            lines += [f'whisper_stage_audio_seconds_total{{stage="{name}"}} {stage["audio_seconds"]}' for name, stage in self._stages.items()]
+            lines += ["# HELP whisper_stage_errors_total Spans of each stage that raised.", "# TYPE whisper_stage_errors_total counter"]
+            lines += [f'whisper_stage_errors_total{{stage="{name}"}} {stage["errors"]}' for name, stage in self._stages.items()]
+            lines += ["# HELP whisper_files_total Files processed, by outcome.", "# TYPE whisper_files_total counter"]
+            lines += [f'whisper_files_total{{status="{status}"}} {count}' for status, count in self._files.items()]
+            lines += [
+                "# HELP whisper_media_seconds_total Seconds of media transcribed (cache hits excluded).",
+                "# TYPE whisper_media_seconds_total counter",
+                f"whisper_media_seconds_total {self._media_seconds}",
+                "# HELP whisper_processing_seconds_total Prepare plus inference time of the transcribed media.",
+                "# TYPE whisper_processing_seconds_total counter",
+                f"whisper_processing_seconds_total {self._processing_seconds}",
+                "# HELP whisper_file_realtime_factor Processing seconds per second of media, per file.",
+                "# TYPE whisper_file_realtime_factor histogram",
+                *_histogram_lines("whisper_file_realtime_factor", "", RTF_BUCKETS, self._rtf),
+            ]
+            if self._last_rtf is not None:
+                lines += [
+                    "# HELP whisper_last_realtime_factor Real-time factor of the most recently transcribed file.",
+                    "# TYPE whisper_last_realtime_factor gauge",
+                    f"whisper_last_realtime_factor {self._last_rtf}",
+                ]
+        return "\n".join(lines) + "\n"
+
+
+def _histogram_lines(name, labels, bounds, histogram):
+    prefix = f"{labels}," if labels else ""
+    lines = [f'{name}_bucket{{{prefix}le="{bound}"}} {count}' for bound, count in zip(bounds, histogram["buckets"])]
+    lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {histogram["count"]}')
+    suffix = f"{{{labels}}}" if labels else ""
+    lines.append(f"{name}_sum{suffix} {histogram['sum']}")
+    lines.append(f"{name}_count{suffix} {histogram['count']}")
+    return lines
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = pipeline_metrics.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug(f"Metrics request: {format % args}")
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def get_metrics_port():
+    """Port of the Prometheus endpoint from ``metrics_port``; 0 disables it."""
+    value = load_default_values().get("default_values", {}).get("metrics_port", 0)
+    try:
+        return max(0, int(value or 0))
+    except (TypeError, ValueError):
+        logging.warning(f"Invalid metrics_port={value!r}. The metrics endpoint is disabled.")
+        return 0
+
+
+def start_metrics_server(port=None, host=None):
+    """Serve ``/metrics`` in a daemon thread next to the Gradio app; returns its URL or None.
+
+    Binds to ``WHISPER_METRICS_HOST`` (default 127.0.0.1). Starting it
+    twice returns the running server's URL.
+    """
+    global _server
+    port = get_metrics_port() if port is None else port
+    if not port:
+        return None
+    host = host or os.getenv("WHISPER_METRICS_HOST", DEFAULT_METRICS_HOST)
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                logging.warning(f"Could not start the metrics endpoint on {host}:{port}: {e}")
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+            logging.info(f"Prometheus metrics available at http://{host}:{port}/metrics")
+        server_host, server_port = _server.server_address[:2]
+        return f"http://{server_host}:{server_port}/metrics"
+
+
+def get_metrics_url():
+    """URL of the running metrics endpoint, or None."""
+    with _server_lock:
+        if _server is None:
+            return None
+        server_host, server_port = _server.server_address[:2]
+        return f"http://{server_host}:{server_port}/metrics"
+
+
+pipeline_metrics = PipelineMetrics()
@@ -1,9 +1,14 @@
+import ipaddress
 import os
 import re
 import shutil
+import socket
 import subprocess
 import tempfile
 from pathlib import Path
+from urllib.parse import urlsplit
+
+from env_utils import env_int
 
 
 ALLOWED_MEDIA_EXTENSIONS = {
@@ -20,28 +25,30 @@ ALLOWED_MEDIA_EXTENSIONS = {
     ".webm",
 }
 ALLOWED_CONFIG_EXTENSIONS = {".yaml", ".yml"}
+# Network protocols accepted as live transcription sources. Local files,
+# pipes and ffmpeg meta-protocols (concat, subfile, ...) are rejected.
+ALLOWED_STREAM_SCHEMES = {"http", "https", "rtsp", "rtsps", "rtmp", "rtmps", "srt", "udp", "rtp"}
+# ffmpeg protocols each non-HTTP stream may open, so a stream cannot lead
+# ffmpeg to files or nested URLs. HTTP(S) streams are fetched by the app.
+STREAM_PROTOCOL_WHITELIST = {
+    "rtsp": "rtsp,tcp,udp,rtp",
+    "rtsps": "rtsps,rtsp,tls,tcp,udp,rtp",
+    "rtmp": "rtmp,tcp",
+    "rtmps": "rtmps,rtmp,tls,tcp",
+    "srt": "srt",
+    "udp": "udp",
+    "rtp": "rtp,udp",
+}
 
 DEFAULT_MAX_CONFIG_BYTES = 1024 * 1024
 DEFAULT_FFMPEG_TIMEOUT_SECONDS = 5 * 60
+DEFAULT_MAX_MEDIA_DURATION_SECONDS = 4 * 60 * 60
 
 
 class SecurityError(ValueError):
     """Raised when user-controlled input violates the local app security policy."""
 
 
-def _env_int(name, default):
-    value = os.getenv(name)
-    if value is None:
-        return default
-    try:
-        parsed = int(value)
-    except ValueError as exc:
-        raise SecurityError(f"{name} must be an integer") from exc
-    if parsed <= 0:
-        raise SecurityError(f"{name} must be greater than zero")
-    return parsed
-
-
 def _env_bool(name, default=False):
     value = os.getenv(name)
     if value is None:
@@ -50,11 +57,15 @@ def _env_bool(name, default=False):
 
 
 def get_max_config_bytes():
-    return _env_int("WHISPER_MAX_CONFIG_BYTES", DEFAULT_MAX_CONFIG_BYTES)
+    return env_int("WHISPER_MAX_CONFIG_BYTES", DEFAULT_MAX_CONFIG_BYTES, minimum=1, error=SecurityError)
 
 
 def get_ffmpeg_timeout_seconds():
-    return _env_int("WHISPER_FFMPEG_TIMEOUT_SECONDS", DEFAULT_FFMPEG_TIMEOUT_SECONDS)
+    return env_int("WHISPER_FFMPEG_TIMEOUT_SECONDS", DEFAULT_FFMPEG_TIMEOUT_SECONDS, minimum=1, error=SecurityError)
+
+
+def get_max_media_duration_seconds():
+    return env_int("WHISPER_MAX_MEDIA_DURATION_SECONDS", DEFAULT_MAX_MEDIA_DURATION_SECONDS, minimum=1, error=SecurityError)
 
 
 def get_app_temp_root():
@@ -123,7 +134,15 @@ def validate_extension(path, allowed_extensions):
     return suffix
 
 
-
+def validate_media_duration(duration_seconds):
+    """Reject media longer than ``max_media_duration_seconds``; unknown durations pass."""
+    if duration_seconds is None:
+        return
+    limit = get_max_media_duration_seconds()
+    if duration_seconds > limit:
+        raise SecurityError(
+            f"Media is {duration_seconds / 3600:.2f} h long; the limit is {limit / 3600:.2f} h."
+        )
 
 
 def validate_media_constraints(path):
@@ -149,6 +168,62 @@ def validate_local_media_path(path):
     return validate_media_constraints(resolved)
 
 
+def validate_stream_url(url):
+    value = str(url or "").strip()
+    if not value:
+        raise SecurityError("Stream URL is empty.")
+    if any(char in value for char in "\r\n\x00"):
+        raise SecurityError("Stream URL contains invalid characters.")
+    parts = urlsplit(value)
+    if parts.scheme.lower() not in ALLOWED_STREAM_SCHEMES:
+        allowed = ", ".join(sorted(ALLOWED_STREAM_SCHEMES))
+        raise SecurityError(f"Unsupported stream protocol. Allowed protocols: {allowed}.")
+    if not parts.hostname:
+        raise SecurityError("Stream URL has no host.")
+    if not _env_bool("WHISPER_ALLOW_PRIVATE_STREAMS", False):
+        _reject_internal_host(parts.hostname)
+    return value
+
+
+def pin_stream_url(url):
+    """Validate ``url`` and return ``(pinned_url, hostname)``.
+
+    ``pinned_url`` connects to the address the host was checked against, so
+    a DNS answer that changes after the check (rebinding) cannot move the
+    stream to an internal address. With ``WHISPER_ALLOW_PRIVATE_STREAMS``
+    the URL is returned unchanged.
+    """
+    value = validate_stream_url(url)
+    parts = urlsplit(value)
+    if _env_bool("WHISPER_ALLOW_PRIVATE_STREAMS", False):
+        return value, parts.hostname
+    ip = _reject_internal_host(parts.hostname)
+    host = f"[{ip}]" if ip.version == 6 else str(ip)
+    userinfo = parts.netloc.rpartition("@")[0]
+    netloc = (f"{userinfo}@" if userinfo else "") + host + (f":{parts.port}" if parts.port else "")
+    return parts._replace(netloc=netloc).geturl(), parts.hostname
+
+
+def _reject_internal_host(hostname):
+    """Keep ffmpeg from being pointed at this machine or the local network (SSRF); return the checked address."""
+    try:
+        addresses = [info[4][0] for info in socket.getaddrinfo(hostname, None)]
+    except (socket.gaierror, UnicodeError) as exc:
+        raise SecurityError(f"Stream host cannot be resolved: {hostname}") from exc
+    checked = []
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split("%", 1)[0])
+        if ip.is_loopback or ip.is_private or ip.is_link_local or ip.is_unspecified or ip.is_reserved:
+            raise SecurityError(
+                f"Stream host {hostname} resolves to a local or private address ({ip}). "
+                "Set WHISPER_ALLOW_PRIVATE_STREAMS=1 to allow streams from the local network."
+            )
+        checked.append(ip)
+    if not checked:
+        raise SecurityError(f"Stream host cannot be resolved: {hostname}")
+    return checked[0]
+
+
 def validate_controlled_config_path(path):
     resolved = _coerce_path(path)
     ensure_within(
@@ -221,6 +296,15 @@ def _is_loopback_host(server_name):
     return normalized in {"127.0.0.1", "localhost", "::1"}
 
 
+def validate_inference_host(host):
+    """Refuse to bind the inference server beyond loopback without ``WHISPER_INFERENCE_TOKEN``."""
+    if not _is_loopback_host(host) and not os.getenv("WHISPER_INFERENCE_TOKEN"):
+        raise SecurityError(
+            f"Binding the inference server to {host} requires WHISPER_INFERENCE_TOKEN."
+        )
+    return host
+
+
 def get_gradio_launch_kwargs(**overrides):
     server_name = os.getenv("WHISPER_GRADIO_SERVER_NAME", "127.0.0.1")
     share = _env_bool("WHISPER_GRADIO_SHARE", False)
@@ -0,0 +1,93 @@
+import logging
+
+from audio_processing import SAMPLE_RATE
+
+# "pipeline": faster-whisper's batched pipeline runs Silero VAD itself.
+# "prepass": VAD runs in the prepare stage (overlapping the previous file's
+# inference), the detected speech regions are reported and only they are
+# sent to the model; files without speech skip inference entirely.
+VAD_MODES = ("pipeline", "prepass")
+
+# Defaults match BatchedInferencePipeline's own VAD defaults.
+DEFAULT_VAD_SETTINGS = {
+    "vad_mode": "pipeline",
+    "vad_threshold": 0.5,
+    "vad_min_speech_duration_ms": 0,
+    "vad_min_silence_duration_ms": 160,
+    "vad_speech_pad_ms": 400,
+    "vad_chunk_length": 30,
+}
+
+_VAD_TYPES = {
+    "vad_mode": str,
+    "vad_threshold": float,
+    "vad_min_speech_duration_ms": int,
+    "vad_min_silence_duration_ms": int,
+    "vad_speech_pad_ms": int,
+    "vad_chunk_length": int,
+}
+
+
+def normalize_vad_settings(settings=None):
+    """Return the six ``vad_*`` settings from ``settings``, falling back to the defaults."""
+    settings = settings or {}
+    normalized = {}
+    for key, default in DEFAULT_VAD_SETTINGS.items():
+        value = settings.get(key)
+        try:
+            normalized[key] = default if value is None else _VAD_TYPES[key](value)
+        except (TypeError, ValueError):
+            logging.warning(f"Invalid {key}={value!r}. Falling back to {default}.")
+            normalized[key] = default
+    if normalized["vad_mode"] not in VAD_MODES:
+        logging.warning(f"Unknown vad_mode {normalized['vad_mode']!r}. Falling back to 'pipeline'.")
+        normalized["vad_mode"] = "pipeline"
+    # Whisper decodes at most 30 s per window
+    normalized["vad_chunk_length"] = min(max(1, normalized["vad_chunk_length"]), 30)
+    normalized["vad_threshold"] = min(max(0.0, normalized["vad_threshold"]), 1.0)
+    return normalized
+
+
+def vad_parameters(settings):
+    """Map normalized settings to faster-whisper ``VadOptions`` keyword arguments."""
+    return {
+        "threshold": settings["vad_threshold"],
+        "min_speech_duration_ms": settings["vad_min_speech_duration_ms"],
+        "min_silence_duration_ms": settings["vad_min_silence_duration_ms"],
+        "speech_pad_ms": settings["vad_speech_pad_ms"],
+    }
+
+
+def detect_speech(audio, settings, sampling_rate=SAMPLE_RATE):
+    """Run Silero VAD over ``audio`` and return the speech regions as ``(start, end)`` seconds."""
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+    options = VadOptions(max_speech_duration_s=settings["vad_chunk_length"], **vad_parameters(settings))
+    timestamps = get_speech_timestamps(audio, options, sampling_rate=sampling_rate)
+    return [(stamp["start"] / sampling_rate, stamp["end"] / sampling_rate) for stamp in timestamps]
+
+
+def merge_regions(regions, chunk_length):
+    """Pack consecutive speech regions into clips no longer than ``chunk_length`` seconds.
+
+    Each clip becomes one item of an inference batch, so fewer, fuller
+    clips mean fewer batches; short pauses between merged regions stay in.
+    """
+    clips = []
+    for start, end in regions:
+        if clips and end - clips[-1][0] <= chunk_length:
+            clips[-1] = (clips[-1][0], end)
+        else:
+            clips.append((start, end))
+    return clips
+
+
+def summarize_regions(regions, total_seconds):
+    """Report the speech regions and the speech-to-total ratio of one file."""
+    speech_seconds = sum(end - start for start, end in regions)
+    return {
+        "regions": [[round(start, 3), round(end, 3)] for start, end in regions],
+        "speech_seconds": round(speech_seconds, 3),
+        "total_seconds": round(total_seconds, 3),
+        "speech_ratio": round(speech_seconds / total_seconds, 4) if total_seconds else 0.0,
+    }
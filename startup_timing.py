@@ -0,0 +1,49 @@
+"""Per-phase timing of application startup.
+
+Entry points call ``checkpoint(name)`` after each phase (heavy imports,
+building the UI, launching the server) and ``report()`` once the app is
+ready. The report is logged as a single line and, when
+``WHISPER_STARTUP_TIMING_FILE`` is set, also written as JSON so startup
+regressions can be compared between builds. For a per-module breakdown
+run the entry point with ``python -X importtime``.
+"""
+import json
+import logging
+import os
+import time
+
+_started = time.perf_counter()
+_last = _started
+_phases = []
+
+
+def checkpoint(name):
+    """Record the time elapsed since the previous checkpoint as phase ``name``."""
+    global _last
+    now = time.perf_counter()
+    _phases.append((name, now - _last))
+    _last = now
+
+
+def phases():
+    return list(_phases)
+
+
+def report():
+    """Log the recorded phases and return them with the total."""
+    total = time.perf_counter() - _started
+    summary = " | ".join(f"{name} {seconds:.2f}s" for name, seconds in _phases)
+    logging.info(f"Startup timing: {summary} | total {total:.2f}s")
+
+    result = {
+        "phases": [{"name": name, "seconds": round(seconds, 4)} for name, seconds in _phases],
+        "total_seconds": round(total, 4),
+    }
+    output_path = os.getenv("WHISPER_STARTUP_TIMING_FILE")
+    if output_path:
+        try:
+            with open(output_path, "w", encoding="utf-8") as output_file:
+                json.dump(result, output_file, indent=2)
+        except OSError as e:
+            logging.warning(f"Could not write startup timing to {output_path}: {e}")
+    return result
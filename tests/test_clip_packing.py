@@ -0,0 +1,42 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from audio_processing import SAMPLE_RATE
+from clip_packing import PACK_GAP_SECONDS, ClipPack
+
+
+@dataclass
+class Segment:
+    start: float
+    end: float
+    text: str
+    words: list = None
+
+
+def _silence(seconds):
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+
+
+def test_split_assigns_segments_to_the_file_of_their_clip():
+    pack = ClipPack()
+    pack.add(_silence(4.0), [(0.5, 1.5), (2.0, 3.5)])
+    pack.add(_silence(3.0), [(0.2, 2.8)])
+    second = 4.0 + PACK_GAP_SECONDS
+    assert pack.offsets == [0.0, second]
+    assert pack.clip_timestamps()[2] == {"start": second + 0.2, "end": second + 2.8}
+
+    segments = [
+        Segment(0.5, 1.5, "a1"),
+        Segment(2.0, 3.5, "a2"),
+        # Rounded a little before its clip start, still the second file
+        Segment(second + 0.18, second + 1.0, "b1"),
+        Segment(second + 1.0, second + 2.8, "b2"),
+    ]
+    split = [(index, segment.text, round(segment.start, 6), round(segment.end, 6)) for index, segment in pack.split(segments)]
+    assert split == [
+        (0, "a1", 0.5, 1.5),
+        (0, "a2", 2.0, 3.5),
+        (1, "b1", 0.18, 1.0),
+        (1, "b2", 1.0, 2.8),
+    ]
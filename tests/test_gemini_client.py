@@ -0,0 +1,82 @@
+import threading
+
+from gemini_client import CachedValue
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _wait_for_refresh(name):
+    for thread in threading.enumerate():
+        if thread.name == f"{name}-refresh":
+            thread.join(5)
+
+
+def _models_cache(results):
+    calls = []
+
+    def fetch():
+        calls.append(len(calls))
+        result = results[min(len(calls), len(results)) - 1]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    clock = FakeClock()
+    return CachedValue("models", fetch, ttl=60, clock=clock), clock, calls
+
+
+def test_fresh_reads_do_not_fetch_again():
+    cache, clock, calls = _models_cache([["gemini-2.5-flash"]])
+    assert cache.get(block=False) is None
+    assert cache.get() == ["gemini-2.5-flash"]
+    clock.now = 59
+    assert cache.get() == ["gemini-2.5-flash"]
+    assert len(calls) == 1
+
+
+def test_expired_reads_return_the_old_list_and_refresh_in_the_background():
+    cache, clock, calls = _models_cache([["old"], ["new"]])
+    cache.get()
+    clock.now = 61
+    assert cache.get() == ["old"]
+    _wait_for_refresh("models")
+    assert cache.get() == ["new"]
+    assert len(calls) == 2
+
+
+def test_a_failed_refresh_keeps_the_previous_list():
+    cache, clock, calls = _models_cache([["old"], RuntimeError("offline")])
+    cache.get()
+    clock.now = 61
+    assert cache.get() == ["old"]
+    _wait_for_refresh("models")
+    assert cache.get() == ["old"]
+
+
+def test_a_refresh_started_before_invalidate_is_discarded():
+    started, release = threading.Event(), threading.Event()
+    values = iter([["old key models"], ["stale"], ["new key models"]])
+
+    def fetch():
+        value = next(values)
+        if value == ["stale"]:
+            started.set()
+            release.wait(5)
+        return value
+
+    clock = FakeClock()
+    cache = CachedValue("models", fetch, ttl=60, clock=clock)
+    cache.get()
+    clock.now = 61
+    cache.get()
+    started.wait(5)
+    cache.invalidate()
+    release.set()
+    _wait_for_refresh("models")
+    assert cache.get() == ["new key models"]
@@ -0,0 +1,60 @@
+import threading
+
+import job_queue
+from job_queue import JobQueue
+
+PARAMS = {"whisper_model": "small", "compute_type": "int8", "device": "cpu"}
+
+
+def _queue(tmp_path, monkeypatch, run_job):
+    monkeypatch.setattr(job_queue, "get_queue_settings", lambda: (1, 0, 100.0))
+    monkeypatch.setattr(job_queue, "estimate_job", lambda file_paths, params: (60.0, "small|int8|cpu", 1.0, 0.1))
+    return JobQueue(db_path=tmp_path / "jobs.sqlite3", run_job=run_job)
+
+
+def test_wait_for_change_wakes_on_each_transcript_update(tmp_path, monkeypatch):
+    step = threading.Event()
+
+    def run_job(file_paths, params, on_update):
+        for text in ("first", "second"):
+            step.wait(5)
+            step.clear()
+            on_update(text, None)
+        step.wait(5)
+        return "second", ["out.txt"]
+
+    queue = _queue(tmp_path, monkeypatch, run_job)
+    job_id = queue.submit("alice", ["a.wav"], PARAMS)
+    state = queue.status(job_id)
+    while state["status"] != "running":
+        state = queue.wait_for_change(job_id, state["version"], timeout=5)
+
+    seen = []
+    while state["status"] == "running":
+        step.set()
+        state = queue.wait_for_change(job_id, state["version"], timeout=5)
+        seen.append(state["text"])
+    assert seen[:2] == ["first", "second"]
+    assert state["status"] == "done" and state["outputs"] == ["out.txt"]
+
+
+def test_wait_for_change_times_out_without_events(tmp_path, monkeypatch):
+    release = threading.Event()
+
+    def run_job(file_paths, params, on_update):
+        release.wait(5)
+        return "", ["out.txt"]
+
+    queue = _queue(tmp_path, monkeypatch, run_job)
+    first = queue.submit("alice", ["a.wav"], PARAMS)
+    second = queue.submit("bob", ["b.wav"], PARAMS)
+    state = queue.status(second)
+    while queue.status(first)["status"] != "running":
+        state = queue.wait_for_change(second, state["version"], timeout=5)
+    state = queue.status(second)
+    assert state["status"] == "queued" and state["position"] == 1
+
+    assert queue.wait_for_change(second, state["version"], timeout=0.05)["version"] == state["version"]
+    release.set()
+    while state["status"] != "done":
+        state = queue.wait_for_change(second, state["version"], timeout=5)
@@ -0,0 +1,98 @@
+import ipaddress
+import threading
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+import security_utils
+from audio_processing import SAMPLE_RATE
+from live_transcription import LATENCY_WINDOW, LiveTranscriber, open_http_stream
+from security_utils import SecurityError
+
+
+@dataclass
+class Segment:
+    start: float
+    end: float
+    text: str
+
+
+def _one_word_per_second(audio, initial_prompt):
+    seconds = int(audio.size / SAMPLE_RATE)
+    return [Segment(float(second), second + 0.9, f" w{second}") for second in range(seconds)]
+
+
+def test_stable_text_and_latencies_stay_bounded_over_a_long_session():
+    transcriber = LiveTranscriber(_one_word_per_second, window_seconds=4.0, step_seconds=1.0, stable_margin_seconds=1.0, clock=lambda: 0.0)
+    events = []
+    for _ in range(LATENCY_WINDOW * 2):
+        events += transcriber.feed(np.zeros(SAMPLE_RATE, dtype=np.float32))
+    events += transcriber.flush()
+
+    stable = [event["text"] for event in events if event["event"] == "stable"]
+    assert transcriber.stable_text() == " ".join(text for text in stable if text)
+    assert transcriber.stable_segments == len(stable) > LATENCY_WINDOW
+    assert len(transcriber.latencies) == LATENCY_WINDOW
+    assert transcriber.latency_stats()["segments"] == len(stable)
+    assert transcriber.provisional == ""
+
+
+@pytest.fixture
+def http_server():
+    requests_seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests_seen.append((self.path, self.headers["Host"]))
+            if self.path == "/redirect-internal":
+                self.send_response(302)
+                self.send_header("Location", "http://metadata.internal/latest")
+                self.end_headers()
+                return
+            if self.path == "/redirect-public":
+                self.send_response(302)
+                self.send_header("Location", "/audio")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Length", "5")
+            self.end_headers()
+            self.wfile.write(b"audio")
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server.server_address[1], requests_seen
+    server.shutdown()
+    server.server_close()
+
+
+def _resolve(monkeypatch, addresses):
+    def resolve(hostname):
+        address = ipaddress.ip_address(addresses[hostname])
+        if address.is_private and not address.is_loopback:
+            raise SecurityError(f"Stream host {hostname} resolves to a local or private address ({address}).")
+        return address
+    monkeypatch.delenv("WHISPER_ALLOW_PRIVATE_STREAMS", raising=False)
+    monkeypatch.setattr(security_utils, "_reject_internal_host", resolve)
+
+
+def test_http_stream_connects_to_the_validated_address(monkeypatch, http_server):
+    port, requests_seen = http_server
+    # The server stands in for a public host; the client must connect to the checked address, not resolve again
+    _resolve(monkeypatch, {"radio.example.com": "127.0.0.1"})
+    response = open_http_stream(f"http://radio.example.com:{port}/redirect-public")
+    assert response.content == b"audio"
+    assert requests_seen == [("/redirect-public", f"radio.example.com:{port}"), ("/audio", f"radio.example.com:{port}")]
+
+
+def test_http_stream_redirect_to_an_internal_host_is_rejected(monkeypatch, http_server):
+    port, requests_seen = http_server
+    _resolve(monkeypatch, {"radio.example.com": "127.0.0.1", "metadata.internal": "10.0.0.1"})
+    with pytest.raises(SecurityError, match="local or private"):
+        open_http_stream(f"http://radio.example.com:{port}/redirect-internal")
+    assert [path for path, _host in requests_seen] == ["/redirect-internal"]
@@ -0,0 +1,109 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import llm_async
+import llm_http
+from llm_rate_limit import QuotaLimiter
+from llms import ollama_readiness, query_ollama
+
+
+def _collect(agen):
+    async def run():
+        return [text async for text in agen]
+    return asyncio.run(run())
+
+
+def test_map_reduce_query_marks_the_local_model_ready(monkeypatch):
+    provider = llm_async.PROVIDERS["ollama"]
+    prompts = []
+
+    async def ensure_ready(model):
+        return
+        yield
+
+    async def stream(model, system_prompt, user_prompt):
+        prompts.append(user_prompt)
+        yield "answer"
+
+    monkeypatch.setattr(provider, "ensure_ready", ensure_ready)
+    monkeypatch.setattr(provider, "_stream", stream)
+    monkeypatch.setattr(provider, "token_budget", lambda fix_text: 256)
+    ollama_readiness.invalidate("tiny")
+
+    transcript = "\n".join(f"Sentence number {index} of a long meeting." for index in range(400))
+    outputs = _collect(llm_async.query_async("Summarize", transcript, None, provider="Ollama", ollama_model="tiny"))
+
+    assert len(prompts) > 2  # every part plus the reduce pass
+    assert outputs[-1] == "answer"
+    assert ollama_readiness.is_ready("tiny")
+
+
+def test_sync_wrapper_streams_ollama_through_the_pooled_client(monkeypatch):
+    lines = [{"response": "Hello"}, {"results": [{"text": ", "}, {"text": "world"}]}, {"done": True}]
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            body = "".join(json.dumps(line) + "\n" for line in lines).encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    clients = []
+    get_async_client = llm_http.get_async_client
+    monkeypatch.setattr(llm_async, "get_async_client", lambda endpoint: clients.append(get_async_client(endpoint)) or clients[-1])
+    monkeypatch.setattr(llm_async.PROVIDERS["ollama"], "endpoint", f"http://127.0.0.1:{server.server_address[1]}")
+    ollama_readiness.mark_ready("tiny")
+    try:
+        first = list(query_ollama("Summarize", "A short transcript.", "tiny"))
+        second = list(query_ollama("Summarize", "A short transcript.", "tiny"))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert first[-1] == second[-1] == "Hello, world"
+    assert len(clients) == 2 and clients[0] is clients[1]
+
+
+def test_each_gemini_request_is_admitted_by_the_quota_once(monkeypatch):
+    provider = llm_async.PROVIDERS["gemini"]
+    quota = QuotaLimiter("Gemini", {"requests_per_minute": (100, 86400, "requests")})
+    admitted, sent = [], []
+    acquire_async = quota.acquire_async
+
+    def counting_acquire(tokens=0):
+        admitted.append(tokens)
+        return acquire_async(tokens)
+
+    async def ensure_ready(model):
+        return
+        yield
+
+    async def stream(model, system_prompt, user_prompt):
+        sent.append(user_prompt)
+        yield "answer"
+
+    monkeypatch.setattr(quota, "acquire_async", counting_acquire)
+    monkeypatch.setattr(llm_async, "gemini_quota", quota)
+    monkeypatch.setattr(provider, "ensure_ready", ensure_ready)
+    monkeypatch.setattr(provider, "_stream", stream)
+    monkeypatch.setattr(provider, "token_budget", lambda fix_text: 256)
+
+    _collect(llm_async.query_async("Summarize", "A short transcript.", "gemini-test"))
+    assert len(admitted) == len(sent) == 1
+
+    transcript = "\n".join(f"Sentence number {index} of a long meeting." for index in range(400))
+    _collect(llm_async.query_async("Summarize", transcript, "gemini-test"))
+    assert len(sent) > 3
+    assert len(admitted) == len(sent)
+    assert quota.stats()["buckets"]["requests_per_minute"]["available"] == 100 - len(sent)
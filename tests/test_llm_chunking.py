@@ -0,0 +1,35 @@
+import pytest
+
+from llm_chunking import chunk_transcript, estimate_tokens
+
+TRANSCRIPT = "".join(f"[00:{index:02d}] Speaker {index % 3} says sentence number {index}.\n" for index in range(60))
+
+
+def test_short_transcript_is_a_single_chunk():
+    assert chunk_transcript("Hello there.", 100) == ["Hello there."]
+    assert chunk_transcript("", 100) == []
+
+
+@pytest.mark.parametrize("max_tokens", [20, 50, 200])
+def test_chunks_end_on_segment_lines_within_the_budget(max_tokens):
+    chunks = chunk_transcript(TRANSCRIPT, max_tokens)
+    assert len(chunks) > 1
+    assert "".join(chunks) == TRANSCRIPT
+    assert all(chunk.endswith("\n") for chunk in chunks)
+    assert all(estimate_tokens(chunk) <= max_tokens for chunk in chunks)
+
+
+def test_overlong_lines_split_on_sentences_then_slices():
+    line = "First sentence here. Second one follows! " + "x" * 200 + " Last?\n"
+    chunks = chunk_transcript(line, 10)
+    assert "".join(chunks) == line
+    assert all(estimate_tokens(chunk) <= 10 for chunk in chunks)
+    assert chunks[0] == "First sentence here. "
+
+
+@pytest.mark.parametrize("max_tokens", [1, 2, 3, 7])
+def test_slices_never_exceed_tiny_budgets(max_tokens):
+    text = "y" * 100
+    chunks = chunk_transcript(text, max_tokens)
+    assert "".join(chunks) == text
+    assert all(estimate_tokens(chunk) <= max_tokens for chunk in chunks)
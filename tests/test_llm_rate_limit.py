@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import llm_rate_limit
+from llm_rate_limit import DailyBucket, QuotaLimiter
+
+UTC = timezone.utc
+
+
+def _at(*args):
+    return datetime(*args, tzinfo=UTC).timestamp()
+
+
+def test_daily_bucket_admits_at_most_the_quota_within_one_day():
+    bucket = DailyBucket(3, tz=UTC, updated=_at(2026, 1, 1, 0, 0))
+    now = _at(2026, 1, 1, 8, 0)
+    for _request in range(3):
+        assert bucket.time_until(1, now) == 0.0
+        bucket.consume(1, now)
+    # A token bucket refilling 3/day would have granted another call by late evening
+    late = _at(2026, 1, 1, 23, 0)
+    assert bucket.time_until(1, late) == timedelta(hours=1).total_seconds()
+    assert bucket.time_until(1, _at(2026, 1, 2, 0, 0, 1)) == 0.0
+    assert bucket.level == 3
+
+
+def test_requests_per_day_limit_uses_the_daily_window():
+    quota = QuotaLimiter("Gemini", {"requests_per_day": (2, "day", "requests")})
+    assert isinstance(quota._buckets["requests_per_day"], DailyBucket)
+    quota.wait()
+    quota.wait()
+    assert quota.estimate_wait() > 0
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = _at(2026, 1, 1, 12, 0)
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(llm_rate_limit, "time", fake)
+    return fake
+
+
+def test_request_bucket_refills_at_its_rate_and_never_beyond_capacity(clock):
+    quota = QuotaLimiter("Gemini", {"requests_per_minute": (2, 60, "requests")})
+    quota.wait()
+    quota.wait()
+    assert quota.estimate_wait() == pytest.approx(30.0)
+    assert quota.estimate_wait(requests=2) == pytest.approx(60.0)
+
+    clock.now += 30
+    assert quota.estimate_wait() == 0.0
+    clock.now += 3600
+    assert quota.stats()["buckets"]["requests_per_minute"] == {"available": 2, "capacity": 2}
+
+
+def test_token_limit_clamps_large_requests_and_charges_the_output(clock):
+    quota = QuotaLimiter("Gemini", {"tokens_per_minute": (1000, 60, "tokens")})
+    # Larger than the bucket: admitted once it is full instead of waiting forever
+    assert quota.estimate_wait(tokens=5000) == 0.0
+    quota.wait(tokens=5000)
+    assert quota.stats()["buckets"]["tokens_per_minute"]["available"] == 0
+
+    clock.now += 60
+    quota.wait(tokens=400)
+    quota.charge(800)
+    assert quota.stats()["buckets"]["tokens_per_minute"]["available"] == -200
+    assert quota.estimate_wait(tokens=100) == pytest.approx(18.0)
+
+
+def test_callers_are_admitted_in_order_and_abandoning_gives_the_place_back(clock):
+    quota = QuotaLimiter("Gemini", {"requests_per_minute": (1, 60, "requests")})
+    quota.wait()
+    first = quota.acquire()
+    second = quota.acquire()
+    assert next(first) == (pytest.approx(60.0), 0)
+    assert next(second) == (pytest.approx(120.0), 1)
+
+    first.close()
+    assert quota.stats()["queued"] == 1
+    clock.now += 60
+    assert list(second) == []
+    assert quota.stats()["queued"] == 0
+
+
+def test_bucket_levels_survive_a_restart(clock, tmp_path):
+    state_path = tmp_path / "quota.json"
+    limits = {"requests_per_minute": (5, 60, "requests"), "requests_per_day": (10, "day", "requests")}
+    quota = QuotaLimiter("Gemini", limits, state_path=state_path)
+    for _request in range(4):
+        quota.wait()
+
+    restarted = QuotaLimiter("Gemini", limits, state_path=state_path)
+    assert {name: bucket["available"] for name, bucket in restarted.stats()["buckets"].items()} == {
+        "requests_per_minute": 1, "requests_per_day": 6,
+    }
+    # A changed quota starts from a full bucket
+    resized = QuotaLimiter("Gemini", dict(limits, requests_per_day=(20, "day", "requests")), state_path=state_path)
+    assert resized.stats()["buckets"]["requests_per_day"]["available"] == 20
@@ -0,0 +1,59 @@
+import socket
+
+import pytest
+
+from security_utils import SecurityError, pin_stream_url, validate_inference_host, validate_stream_url
+
+
+def _resolve_to(address):
+    def getaddrinfo(host, port, *args, **kwargs):
+        family = socket.AF_INET6 if ":" in address else socket.AF_INET
+        return [(family, socket.SOCK_STREAM, 6, "", (address, 0))]
+    return getaddrinfo
+
+
+@pytest.mark.parametrize("address", ["127.0.0.1", "10.0.0.5", "192.168.1.20", "169.254.169.254", "::1", "fe80::1", "0.0.0.0"])
+def test_stream_url_to_internal_address_is_rejected(monkeypatch, address):
+    monkeypatch.delenv("WHISPER_ALLOW_PRIVATE_STREAMS", raising=False)
+    monkeypatch.setattr(socket, "getaddrinfo", _resolve_to(address))
+    with pytest.raises(SecurityError, match="local or private"):
+        validate_stream_url("rtsp://camera.example.com/stream")
+
+
+def test_stream_url_to_public_address_is_accepted(monkeypatch):
+    monkeypatch.delenv("WHISPER_ALLOW_PRIVATE_STREAMS", raising=False)
+    monkeypatch.setattr(socket, "getaddrinfo", _resolve_to("93.184.216.34"))
+    assert validate_stream_url(" https://radio.example.com/live ") == "https://radio.example.com/live"
+
+
+def test_private_streams_can_be_allowed_explicitly(monkeypatch):
+    monkeypatch.setenv("WHISPER_ALLOW_PRIVATE_STREAMS", "1")
+    monkeypatch.setattr(socket, "getaddrinfo", _resolve_to("192.168.1.20"))
+    assert validate_stream_url("udp://192.168.1.20:1234") == "udp://192.168.1.20:1234"
+
+
+def test_unresolvable_stream_host_is_rejected(monkeypatch):
+    monkeypatch.delenv("WHISPER_ALLOW_PRIVATE_STREAMS", raising=False)
+
+    def getaddrinfo(*args, **kwargs):
+        raise socket.gaierror("Name or service not known")
+
+    monkeypatch.setattr(socket, "getaddrinfo", getaddrinfo)
+    with pytest.raises(SecurityError, match="cannot be resolved"):
+        validate_stream_url("rtsp://nowhere.invalid/stream")
+
+
+def test_inference_server_binds_beyond_loopback_only_with_a_token(monkeypatch):
+    monkeypatch.delenv("WHISPER_INFERENCE_TOKEN", raising=False)
+    assert validate_inference_host("127.0.0.1") == "127.0.0.1"
+    with pytest.raises(SecurityError, match="WHISPER_INFERENCE_TOKEN"):
+        validate_inference_host("0.0.0.0")
+    monkeypatch.setenv("WHISPER_INFERENCE_TOKEN", "secret")
+    assert validate_inference_host("0.0.0.0") == "0.0.0.0"
+
+
+@pytest.mark.parametrize("address, pinned", [("93.184.216.34", "rtsp://user:pw@93.184.216.34:8554/live"), ("2606:2800:220:1::1", "rtsp://user:pw@[2606:2800:220:1::1]:8554/live")])
+def test_stream_url_is_pinned_to_the_checked_address(monkeypatch, address, pinned):
+    monkeypatch.delenv("WHISPER_ALLOW_PRIVATE_STREAMS", raising=False)
+    monkeypatch.setattr(socket, "getaddrinfo", _resolve_to(address))
+    assert pin_stream_url("rtsp://user:pw@camera.example.com:8554/live") == (pinned, "camera.example.com")
@@ -0,0 +1,61 @@
+import json
+from pathlib import Path
+
+import pytest
+
+import transcribe_cli
+import transcription
+
+
+@pytest.fixture
+def recordings(tmp_path, monkeypatch):
+    # main() switches to the app directory; monkeypatch restores the working directory
+    monkeypatch.chdir(tmp_path)
+    for folder in ("monday", "tuesday"):
+        (tmp_path / "calls" / folder).mkdir(parents=True)
+        (tmp_path / "calls" / folder / "standup.mp3").write_bytes(b"audio")
+    return tmp_path
+
+
+def _fake_pipeline(calls):
+    def iter_transcription_events(file_paths, *args, output_paths=None, **kwargs):
+        calls.append((list(file_paths), output_paths))
+        for index, (source, output_path) in enumerate(zip(file_paths, output_paths), 1):
+            Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+            Path(output_path).write_text(f"transcript of {source}", encoding="utf-8")
+            yield {"event": "file_done", "index": index, "output_path": output_path, "seconds": 1.0,
+                   "prepare_seconds": 0.1, "inference_seconds": 0.9, "cached": False}
+    return iter_transcription_events
+
+
+def test_glob_inputs_keep_their_sub_directories(recordings):
+    inputs = transcribe_cli.collect_inputs([str(recordings / "calls" / "**" / "*.mp3")], False, {".mp3"})
+    assert sorted(str(relative) for _source, relative in inputs) == [str(Path("monday/standup.mp3")), str(Path("tuesday/standup.mp3"))]
+
+
+def test_outputs_mirror_the_glob_tree_and_are_written_in_place(recordings, monkeypatch, capsys):
+    calls = []
+    monkeypatch.setattr(transcription, "iter_transcription_events", _fake_pipeline(calls))
+    output_dir = recordings / "out"
+
+    code = transcribe_cli.main([str(recordings / "calls" / "**" / "*.mp3"), "--output-dir", str(output_dir)])
+
+    assert code == transcribe_cli.EXIT_OK
+    assert sorted(path.relative_to(output_dir).as_posix() for path in output_dir.rglob("*.txt")) == [
+        "monday/standup_transcript.txt", "tuesday/standup_transcript.txt",
+    ]
+    # Nothing is written next to the sources first
+    assert not list((recordings / "calls").rglob("*_transcript.txt"))
+    assert json.loads(capsys.readouterr().out)["succeeded"] == 2
+
+
+def test_inputs_writing_the_same_transcript_are_refused(recordings, monkeypatch, capsys):
+    calls = []
+    monkeypatch.setattr(transcription, "iter_transcription_events", _fake_pipeline(calls))
+    monday, tuesday = (str(recordings / "calls" / folder / "standup.mp3") for folder in ("monday", "tuesday"))
+
+    code = transcribe_cli.main([monday, tuesday, "--output-dir", str(recordings / "out")])
+
+    assert code == transcribe_cli.EXIT_OUTPUT_COLLISION
+    assert calls == []
+    assert json.loads(capsys.readouterr().out)["collisions"][0]["inputs"] == [monday, tuesday]
@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+import transcript_cache
+from transcript_cache import build_cache_key, hash_media_file, load_transcript, prune, store_transcript
+
+PARAMS = {"whisper_model": "small", "compute_type": "int8", "language": "en", "beam_size": 5}
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    directory = tmp_path / "cache"
+    monkeypatch.setenv("WHISPER_TRANSCRIPT_CACHE_DIR", str(directory))
+    monkeypatch.delenv("WHISPER_TRANSCRIPT_CACHE_MAX_MB", raising=False)
+    return directory
+
+
+def test_key_depends_on_media_content_and_output_parameters(tmp_path):
+    first, copy, other = tmp_path / "a.mp3", tmp_path / "b.mp3", tmp_path / "c.mp3"
+    first.write_bytes(b"same audio")
+    copy.write_bytes(b"same audio")
+    other.write_bytes(b"other audio")
+
+    key = build_cache_key(hash_media_file(first), PARAMS)
+    assert build_cache_key(hash_media_file(copy), dict(reversed(list(PARAMS.items())))) == key
+    assert build_cache_key(hash_media_file(other), PARAMS) != key
+    assert build_cache_key(hash_media_file(first), dict(PARAMS, language="de")) != key
+
+
+def test_stored_transcript_is_loaded_back_and_corrupt_entries_are_dropped(cache_dir):
+    store_transcript("abc", ["[00:00] hello", "[00:02] world"], source_name="a.mp3", params=PARAMS)
+    assert load_transcript("abc") == ["[00:00] hello", "[00:02] world"]
+    assert load_transcript("missing") is None
+
+    (cache_dir / "abc.json").write_text('{"version": 1, "segm', encoding="utf-8")
+    assert load_transcript("abc") is None
+    assert not (cache_dir / "abc.json").exists()
+
+
+def test_prune_evicts_least_recently_used_entries_first(cache_dir):
+    for age, key in enumerate(["newest", "used", "oldest"]):
+        store_transcript(key, ["x" * 1000])
+        os.utime(cache_dir / f"{key}.json", (1_000_000 - age * 100, 1_000_000 - age * 100))
+    os.utime(cache_dir / "used.json", (900_000, 900_000))
+    load_transcript("used")  # a hit refreshes the entry
+
+    entry_bytes = (cache_dir / "newest.json").stat().st_size
+    assert prune(max_bytes=entry_bytes * 2) == 1
+    assert sorted(path.stem for path in cache_dir.glob("*.json")) == ["newest", "used"]
+
+
+def test_entries_unused_for_too_long_are_removed(cache_dir):
+    store_transcript("stale", ["old"])
+    store_transcript("recent", ["new"])
+    os.utime(cache_dir / "stale.json", (0, 0))
+    assert prune(older_than_seconds=86400) == 1
+    assert transcript_cache.cache_stats()["entries"] == 1
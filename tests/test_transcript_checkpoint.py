@@ -0,0 +1,95 @@
+import json
+import os
+
+import pytest
+
+import transcript_checkpoint
+from transcript_checkpoint import TranscriptCheckpoint, checkpoint_path, discard_checkpoint
+
+PARAMS = {"whisper_model": "small", "language": "en"}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def media(tmp_path):
+    source = tmp_path / "meeting.mp3"
+    source.write_bytes(b"audio")
+    return source
+
+
+def _checkpoint(media, clock, params=PARAMS):
+    return TranscriptCheckpoint(media, params, interval_seconds=30, clock=clock)
+
+
+def test_segments_are_saved_every_interval_and_resumed(media):
+    clock = FakeClock()
+    checkpoint = _checkpoint(media, clock)
+    checkpoint.add("[00:00] one", 4.0)
+    assert not checkpoint_path(media).exists()
+
+    clock.now = 31
+    checkpoint.add("[00:04] two", 9.5)
+    checkpoint.add("[00:09] three", 12.0)  # not yet saved when the process dies
+
+    resumed = _checkpoint(media, FakeClock())
+    assert resumed.load()
+    assert resumed.chunks == ["[00:00] one", "[00:04] two"]
+    assert resumed.end_seconds == 9.5
+
+
+def test_an_interrupted_write_keeps_the_previous_checkpoint(media, monkeypatch):
+    clock = FakeClock()
+    checkpoint = _checkpoint(media, clock)
+    checkpoint.add("[00:00] one", 4.0)
+    checkpoint.save()
+
+    def dump_half(state, file, **kwargs):
+        file.write(json.dumps(state)[:20])
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(transcript_checkpoint.json, "dump", dump_half)
+    checkpoint.add("[00:04] two", 9.5)
+    checkpoint.save()
+    monkeypatch.undo()
+
+    assert sorted(os.listdir(media.parent)) == ["meeting.mp3", checkpoint_path(media).name]
+    resumed = _checkpoint(media, FakeClock())
+    assert resumed.load()
+    assert resumed.chunks == ["[00:00] one"] and resumed.end_seconds == 4.0
+
+
+def test_a_truncated_sidecar_starts_over_and_is_replaced(media):
+    clock = FakeClock()
+    checkpoint = _checkpoint(media, clock)
+    checkpoint.add("[00:00] one", 4.0)
+    checkpoint.save()
+    sidecar = checkpoint_path(media)
+    sidecar.write_text(sidecar.read_text(encoding="utf-8")[:25], encoding="utf-8")
+
+    restarted = _checkpoint(media, clock)
+    assert not restarted.load()
+    restarted.add("[00:00] uno", 4.0)
+    restarted.save()
+    assert _checkpoint(media, clock).load()
+    assert json.loads(sidecar.read_text(encoding="utf-8"))["segments"] == ["[00:00] uno"]
+
+
+def test_checkpoints_of_other_settings_or_file_versions_are_ignored(media):
+    clock = FakeClock()
+    checkpoint = _checkpoint(media, clock)
+    checkpoint.add("[00:00] one", 4.0)
+    checkpoint.save()
+
+    assert not _checkpoint(media, clock, dict(PARAMS, language="de")).load()
+    media.write_bytes(b"longer audio")
+    assert not _checkpoint(media, clock).load()
+
+    discard_checkpoint(media)
+    assert not checkpoint_path(media).exists()
@@ -0,0 +1,97 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pytest
+
+from audio_processing import SAMPLE_RATE
+from windowed_transcription import iter_windowed_segments
+
+SEGMENT_SECONDS = 2
+
+
+@dataclass
+class Segment:
+    start: float
+    end: float
+    text: str
+    words: list = None
+
+
+def _media(seconds):
+    # Each sample holds its own index, so a fake model can tell where a window starts
+    return np.arange(int(seconds * SAMPLE_RATE), dtype=np.float32)
+
+
+def _reader(media, first_samples):
+    position = first_samples
+
+    def read(samples):
+        nonlocal position
+        chunk = media[position:position + samples]
+        position += chunk.size
+        return chunk
+    return read
+
+
+def _fake_model(speech=lambda second: True):
+    """One segment every SEGMENT_SECONDS of media time, named after its absolute start."""
+    windows = []
+
+    def transcribe(audio):
+        base = audio[0] / SAMPLE_RATE
+        end = base + audio.size / SAMPLE_RATE
+        windows.append((base, end))
+        start = int(np.ceil(base / SEGMENT_SECONDS - 1e-6)) * SEGMENT_SECONDS
+        segments = []
+        while start < end - 1e-6:
+            if speech(start):
+                segments.append(Segment(start - base, min(start + SEGMENT_SECONDS, end) - base, f"s{start}"))
+            start += SEGMENT_SECONDS
+        return segments
+    return transcribe, windows
+
+
+def _run(seconds, window_seconds, overlap_seconds, speech=lambda second: True, start_seconds=0.0):
+    media = _media(seconds)[int(start_seconds * SAMPLE_RATE):]
+    first_samples = int(window_seconds * SAMPLE_RATE)
+    transcribe, windows = _fake_model(speech)
+    segments = list(iter_windowed_segments(
+        media[:first_samples], _reader(media, first_samples), transcribe, window_seconds, overlap_seconds, start_seconds,
+    ))
+    return segments, windows
+
+
+@pytest.mark.parametrize("seconds", [35, 40, 41.5])
+def test_windows_are_stitched_without_duplicates_or_gaps(seconds):
+    segments, windows = _run(seconds, window_seconds=10, overlap_seconds=3)
+
+    assert len(windows) > 3
+    # Consecutive windows overlap, yet every segment is emitted exactly once, in order
+    assert all(later[0] < earlier[1] for earlier, later in zip(windows, windows[1:]))
+    expected = list(range(0, int(np.ceil(seconds)), SEGMENT_SECONDS))
+    assert [segment.text for segment in segments] == [f"s{start}" for start in expected]
+    assert [segment.start for segment in segments] == pytest.approx(expected)
+    assert segments[-1].end == pytest.approx(seconds)
+
+
+def test_segments_cut_by_the_window_end_are_transcribed_again_whole():
+    segments, windows = _run(23, window_seconds=9, overlap_seconds=1)
+
+    # 9 s windows end mid-segment; the open segment is redone by the next window
+    assert windows[0] == (0, 9) and windows[1][0] == 8
+    assert all(segment.end - segment.start == pytest.approx(SEGMENT_SECONDS) for segment in segments[:-1])
+    assert [segment.text for segment in segments] == [f"s{start}" for start in range(0, 23, SEGMENT_SECONDS)]
+
+
+def test_silent_windows_are_skipped_without_losing_later_speech():
+    segments, windows = _run(40, window_seconds=10, overlap_seconds=3, speech=lambda second: 24 <= second < 30)
+
+    assert [(segment.text, segment.start) for segment in segments] == [("s24", 24.0), ("s26", 26.0), ("s28", 28.0)]
+    assert windows[-1][1] == pytest.approx(40)
+
+
+def test_resumed_media_keeps_absolute_timestamps():
+    segments, windows = _run(30, window_seconds=10, overlap_seconds=3, start_seconds=12.0)
+
+    assert windows[0][0] == 12
+    assert [(segment.text, segment.start) for segment in segments] == [(f"s{start}", float(start)) for start in range(12, 30, SEGMENT_SECONDS)]
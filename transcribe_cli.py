@@ -0,0 +1,269 @@
+"""Headless batch transcription without Gradio or pywebview.
+
+Usage:
+    python transcribe_cli.py recordings/ "calls/**/*.opus" --config settings/cpu.yaml
+    python transcribe_cli.py recordings/ --recursive --output-dir transcripts/ --summary summary.json
+
+Finished transcripts are skipped on the next run, so an interrupted job can
+simply be started again; a file that was cut off midway resumes from its
+last checkpoint instead of from the start. A JSON summary with per-file timings and failures
+is printed to stdout; the exit code is 0 when every file succeeded, 1 when
+at least one failed, 2 when no input matched and 3 when two inputs would
+write the same transcript.
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+import yaml
+
+APP_DIR = Path(getattr(sys, "_MEIPASS", Path(__file__).resolve().parent))
+
+EXIT_OK = 0
+EXIT_FAILURES = 1
+EXIT_NO_INPUT = 2
+EXIT_OUTPUT_COLLISION = 3
+EXIT_INTERRUPTED = 130
+
+CONFIG_KEYS = (
+    "device",
+    "cpu_threads",
+    "num_workers",
+    "language",
+    "whisper_model",
+    "compute_type",
+    "temperature",
+    "beam_size",
+    "batch_size",
+    "condition_on_previous_text",
+    "word_timestamps",
+)
+
+
+def _is_media(path, extensions):
+    return path.is_file() and path.suffix.lower() in extensions
+
+
+def _glob_base(pattern):
+    """The directory a glob pattern starts from: its leading components without wildcards."""
+    base = []
+    for part in Path(pattern).parts[:-1]:
+        if any(char in part for char in "*?["):
+            break
+        base.append(part)
+    return Path(*base) if base else Path(".")
+
+
+def collect_inputs(patterns, recursive, extensions):
+    """Expand directories, globs and plain paths into ``(source, relative_name)`` pairs.
+
+    ``relative_name`` keeps the sub-directories below a directory input or
+    below the fixed part of a glob, so ``--output-dir`` mirrors the tree.
+    """
+    found = {}
+    for pattern in patterns:
+        candidate = Path(pattern).expanduser()
+        if candidate.is_dir():
+            walker = candidate.rglob("*") if recursive else candidate.iterdir()
+            for path in sorted(walker):
+                if _is_media(path, extensions):
+                    found.setdefault(path.resolve(), path.relative_to(candidate))
+        elif candidate.is_file():
+            found.setdefault(candidate.resolve(), Path(candidate.name))
+        else:
+            base = _glob_base(candidate)
+            for match in sorted(glob.glob(str(candidate), recursive=True)):
+                path = Path(match)
+                if _is_media(path, extensions):
+                    found.setdefault(path.resolve(), path.relative_to(base))
+    return list(found.items())
+
+
+def load_settings(config_path, overrides):
+    """Merge settings/default.yaml, an optional config file and CLI overrides."""
+    from config import load_default_config
+    from security_utils import validate_local_config_path
+
+    settings = load_default_config()
+    if config_path:
+        with open(validate_local_config_path(config_path), "r", encoding="utf-8") as config_file:
+            config = yaml.safe_load(config_file) or {}
+        if not isinstance(config, dict):
+            raise ValueError("Configuration file must contain a mapping.")
+        settings.update(config)
+    settings.update({key: value for key, value in overrides.items() if value is not None})
+    missing = [key for key in CONFIG_KEYS if key not in settings]
+    if missing:
+        raise ValueError(f"Missing configuration keys: {', '.join(missing)}")
+    return settings
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Transcribe media files from the command line.")
+    parser.add_argument("inputs", nargs="+", help="Media files, directories or glob patterns.")
+    parser.add_argument("--config", help="YAML configuration file (same schema as settings/default.yaml).")
+    parser.add_argument("--recursive", action="store_true", help="Descend into sub-directories of directory inputs.")
+    parser.add_argument("--output-dir", help="Write transcripts here instead of next to each source file.")
+    parser.add_argument("--force", action="store_true", help="Re-transcribe files whose transcript already exists.")
+    parser.add_argument("--summary", help="Also write the JSON summary to this file.")
+    parser.add_argument("--workers", type=int, help="Files transcribed concurrently.")
+    parser.add_argument("--prefetch", type=int, help="Files prepared with ffmpeg ahead of inference.")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the transcript cache.")
+    parser.add_argument("--model", dest="whisper_model", help="Override whisper_model.")
+    parser.add_argument("--device", help="Override device (cpu/cuda).")
+    parser.add_argument("--language", help="Override language.")
+    parser.add_argument("--compute-type", dest="compute_type", help="Override compute_type.")
+    parser.add_argument("--profile", dest="performance_profile", choices=("manual", "auto"), help="auto replaces cpu_threads, num_workers, batch_size and compute_type with the tuned values.")
+    parser.add_argument("--vad-mode", dest="vad_mode", choices=("pipeline", "prepass"), help="Override vad_mode; prepass reports speech regions per file.")
+    parser.add_argument("--log-level", default="INFO", help="Logging level written to stderr.")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(
+        level=getattr(logging, str(args.log_level).upper(), logging.INFO),
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        stream=sys.stderr,
+    )
+
+    # Resolve user paths before switching to the app directory, where the
+    # settings/ files are looked up.
+    patterns = [os.path.abspath(os.path.expanduser(p)) for p in args.inputs]
+    config_path = os.path.abspath(args.config) if args.config else None
+    output_dir = Path(args.output_dir).expanduser().resolve() if args.output_dir else None
+    summary_path = Path(args.summary).expanduser().resolve() if args.summary else None
+    os.chdir(APP_DIR)
+
+    from security_utils import ALLOWED_MEDIA_EXTENSIONS, build_local_output_path
+    from transcription import iter_transcription_events
+
+    settings = load_settings(config_path, {
+        "whisper_model": args.whisper_model,
+        "device": args.device,
+        "language": args.language,
+        "compute_type": args.compute_type,
+        "vad_mode": args.vad_mode,
+        "performance_profile": args.performance_profile,
+    })
+
+    inputs = collect_inputs(patterns, args.recursive, ALLOWED_MEDIA_EXTENSIONS)
+    if not inputs:
+        logging.error("No media files matched the given inputs.")
+        print(json.dumps({"total": 0, "succeeded": 0, "skipped": 0, "failed": 0, "files": []}, indent=2))
+        return EXIT_NO_INPUT
+
+    targets = {}
+    for source, relative in inputs:
+        if output_dir is not None:
+            targets[source] = output_dir / relative.parent / f"{relative.stem}_transcript.txt"
+        else:
+            targets[source] = build_local_output_path(source, "_transcript.txt")
+    # Checked up front: a later file would overwrite the first, or be skipped as done on a re-run
+    writers = {}
+    for source, target in targets.items():
+        writers.setdefault(os.path.normcase(str(target)), []).append(str(source))
+    collisions = [{"output": target, "inputs": sources} for target, sources in writers.items() if len(sources) > 1]
+    if collisions:
+        for collision in collisions:
+            logging.error(f"{' and '.join(collision['inputs'])} would all write {collision['output']}.")
+        print(json.dumps({"total": len(inputs), "succeeded": 0, "skipped": 0, "failed": 0, "collisions": collisions, "files": []}, indent=2))
+        return EXIT_OUTPUT_COLLISION
+
+    results = {}
+    pending = []
+    for source, target in targets.items():
+        results[str(source)] = {"path": str(source), "output": str(target), "status": "pending"}
+        if target.is_file() and target.stat().st_size > 0 and not args.force:
+            results[str(source)]["status"] = "skipped"
+            continue
+        pending.append((source, target))
+
+    logging.info(f"{len(inputs)} files found, {len(pending)} to transcribe, {len(inputs) - len(pending)} already done.")
+    by_index = {index: str(source) for index, (source, _target) in enumerate(pending, 1)}
+    started = time.time()
+    exit_code = EXIT_OK
+    try:
+        if pending:
+            for event in iter_transcription_events(
+                [str(source) for source, _target in pending],
+                settings["device"],
+                settings["cpu_threads"],
+                settings["num_workers"],
+                settings["language"],
+                settings["whisper_model"],
+                settings["compute_type"],
+                settings["temperature"],
+                settings["beam_size"],
+                settings["batch_size"],
+                settings["condition_on_previous_text"],
+                settings["word_timestamps"],
+                workers=args.workers,
+                prefetch=args.prefetch,
+                use_cache=False if args.no_cache else None,
+                vad=settings,
+                profile=settings.get("performance_profile"),
+                # Written straight to the final path, never next to the source first
+                output_paths=[target for _source, target in pending] if output_dir is not None else None,
+            ):
+                kind = event["event"]
+                if kind not in ("file_done", "file_error", "invalid"):
+                    continue
+                result = results[by_index[event["index"]]]
+                if kind == "file_done":
+                    target = Path(event["output_path"])
+                    result.update({
+                        "status": "ok",
+                        "seconds": round(event["seconds"], 3),
+                        "prepare_seconds": round(event["prepare_seconds"], 3),
+                        "inference_seconds": round(event["inference_seconds"], 3),
+                        "cached": event["cached"],
+                        "media_seconds": event.get("media_seconds"),
+                        "audio_route": event.get("audio_route"),
+                    })
+                    if event.get("resumed_from"):
+                        result["resumed_from_seconds"] = round(event["resumed_from"], 3)
+                    if event.get("vad"):
+                        result.update({
+                            "speech_ratio": event["vad"]["speech_ratio"],
+                            "speech_seconds": event["vad"]["speech_seconds"],
+                            "speech_regions": event["vad"]["regions"],
+                        })
+                    logging.info(f"[{event['index']}/{len(pending)}] {result['path']} -> {target} ({event['seconds']:.1f}s)")
+                else:
+                    result.update({"status": "failed", "error": str(event["error"])})
+    except KeyboardInterrupt:
+        logging.warning("Interrupted; finished transcripts are kept and will be skipped on the next run.")
+        exit_code = EXIT_INTERRUPTED
+
+    files = list(results.values())
+    for result in files:
+        if result["status"] == "pending" and exit_code != EXIT_INTERRUPTED:
+            result.update({"status": "failed", "error": "No result produced"})
+    summary = {
+        "total": len(files),
+        "succeeded": sum(1 for r in files if r["status"] == "ok"),
+        "skipped": sum(1 for r in files if r["status"] == "skipped"),
+        "failed": sum(1 for r in files if r["status"] == "failed"),
+        "interrupted": exit_code == EXIT_INTERRUPTED,
+        "elapsed_seconds": round(time.time() - started, 3),
+        "files": files,
+    }
+    rendered = json.dumps(summary, indent=2)
+    print(rendered)
+    if summary_path is not None:
+        summary_path.parent.mkdir(parents=True, exist_ok=True)
+        summary_path.write_text(rendered, encoding="utf-8")
+
+    if exit_code == EXIT_OK and summary["failed"]:
+        exit_code = EXIT_FAILURES
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
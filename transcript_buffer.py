@@ -0,0 +1,72 @@
+import time
+
+DEFAULT_UPDATE_INTERVAL_SECONDS = 0.25
+DEFAULT_UPDATE_BYTES_PER_SECOND = 2 * 1024 * 1024
+
+
+class TranscriptBuffer:
+    """Append-only transcript text backed by a list of chunks.
+
+    Appending is O(1); the joined text is only rebuilt when it is read, and
+    only the chunks added since the previous read are joined. ``take_delta``
+    returns just the text appended since the last call, for consumers that
+    can apply incremental updates.
+    """
+
+    def __init__(self, text=""):
+        self._parts = []
+        self._size = 0
+        self._joined = ""
+        self._joined_count = 0
+        self._delta_index = 0
+        if text:
+            self.append(text)
+
+    def append(self, chunk):
+        if chunk:
+            self._parts.append(chunk)
+            self._size += len(chunk)
+
+    def __len__(self):
+        return self._size
+
+    def __bool__(self):
+        return self._size > 0
+
+    def text(self):
+        if self._joined_count != len(self._parts):
+            self._joined += "".join(self._parts[self._joined_count:])
+            self._joined_count = len(self._parts)
+        return self._joined
+
+    def take_delta(self):
+        delta = "".join(self._parts[self._delta_index:])
+        self._delta_index = len(self._parts)
+        return delta
+
+
+class UpdateThrottle:
+    """Decide when a growing transcript should be pushed to the UI again.
+
+    Updates are sent at most every ``min_interval`` seconds. Since every
+    update re-sends the whole text, the interval also grows with the text
+    size so that no more than ``bytes_per_second`` are pushed per second,
+    keeping the cost flat as transcripts get long.
+    """
+
+    def __init__(self, min_interval=None, bytes_per_second=None, clock=time.monotonic):
+        self.min_interval = DEFAULT_UPDATE_INTERVAL_SECONDS if min_interval is None else float(min_interval)
+        self.bytes_per_second = DEFAULT_UPDATE_BYTES_PER_SECOND if bytes_per_second is None else int(bytes_per_second)
+        self._clock = clock
+        self._last = None
+
+    def ready(self, size):
+        if self._last is None:
+            return True
+        interval = self.min_interval
+        if self.bytes_per_second > 0:
+            interval = max(interval, size / self.bytes_per_second)
+        return self._clock() - self._last >= interval
+
+    def mark(self):
+        self._last = self._clock()
@@ -0,0 +1,244 @@
+"""Persistent, content-addressed cache of finished transcripts.
+
+Entries are keyed by the SHA-256 of the media bytes plus every inference
+parameter that changes the output, so re-running the same recording (for
+example after changing only the LLM prompt) skips conversion and inference.
+
+Usage:
+    python transcript_cache.py stats
+    python transcript_cache.py list
+    python transcript_cache.py prune [--max-mb N] [--older-than-days D]
+    python transcript_cache.py clear
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+CACHE_FORMAT_VERSION = 1
+DEFAULT_MAX_CACHE_MB = 512
+HASH_CHUNK_BYTES = 1024 * 1024
+
+# Parameters that influence the transcript text, in key order.
+CACHE_KEY_PARAMS = (
+    "whisper_model",
+    "compute_type",
+    "language",
+    "beam_size",
+    "temperature",
+    "word_timestamps",
+    "condition_on_previous_text",
+)
+
+_digest_memo = {}
+_memo_lock = threading.Lock()
+_write_lock = threading.Lock()
+
+
+def get_cache_dir():
+    configured = os.getenv("WHISPER_TRANSCRIPT_CACHE_DIR")
+    if configured:
+        return Path(configured).expanduser().resolve()
+    if sys.platform == "win32" and os.getenv("LOCALAPPDATA"):
+        base = Path(os.environ["LOCALAPPDATA"])
+    else:
+        base = Path(os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache")
+    return (base / "whisper-utility" / "transcripts").resolve()
+
+
+def get_max_cache_bytes():
+    value = os.getenv("WHISPER_TRANSCRIPT_CACHE_MAX_MB")
+    try:
+        megabytes = int(value) if value is not None else DEFAULT_MAX_CACHE_MB
+    except ValueError:
+        logging.warning("Invalid WHISPER_TRANSCRIPT_CACHE_MAX_MB=%r. Falling back to %s.", value, DEFAULT_MAX_CACHE_MB)
+        megabytes = DEFAULT_MAX_CACHE_MB
+    return max(0, megabytes) * 1024 * 1024
+
+
+def hash_media_file(path):
+    """Return the SHA-256 of a media file, memoized on (path, size, mtime)."""
+    path = Path(path)
+    stat = path.stat()
+    memo_key = (str(path), stat.st_size, stat.st_mtime_ns)
+    with _memo_lock:
+        digest = _digest_memo.get(memo_key)
+    if digest:
+        return digest
+
+    sha = hashlib.sha256()
+    with open(path, "rb") as media:
+        for block in iter(lambda: media.read(HASH_CHUNK_BYTES), b""):
+            sha.update(block)
+    digest = sha.hexdigest()
+    with _memo_lock:
+        _digest_memo[memo_key] = digest
+    return digest
+
+
+def build_cache_key(media_digest, params):
+    """Combine the media digest with the output-affecting inference parameters."""
+    payload = {"version": CACHE_FORMAT_VERSION, "media": media_digest}
+    for name in CACHE_KEY_PARAMS:
+        payload[name] = params.get(name)
+    for name in sorted(params):
+        if name not in payload:
+            payload[name] = params[name]
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _entry_path(key):
+    return get_cache_dir() / f"{key}.json"
+
+
+def load_transcript(key):
+    """Return the cached segment chunks for ``key``, or None on a miss."""
+    path = _entry_path(key)
+    try:
+        with open(path, "r", encoding="utf-8") as entry_file:
+            entry = json.load(entry_file)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logging.warning(f"Discarding unreadable transcript cache entry {path.name}: {e}")
+        path.unlink(missing_ok=True)
+        return None
+    if entry.get("version") != CACHE_FORMAT_VERSION:
+        return None
+    # Refresh the modification time so eviction is least-recently-used
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return entry.get("segments", [])
+
+
+def store_transcript(key, segments, source_name=None, params=None):
+    """Persist the segment chunks for ``key`` and enforce the size budget."""
+    cache_dir = get_cache_dir()
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    entry = {
+        "version": CACHE_FORMAT_VERSION,
+        "created": time.time(),
+        "source_name": source_name,
+        "params": params or {},
+        "segments": list(segments),
+    }
+    # Write atomically so a crash never leaves a truncated entry behind
+    fd, tmp_name = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as tmp_file:
+            json.dump(entry, tmp_file, ensure_ascii=False, default=str)
+        os.replace(tmp_name, _entry_path(key))
+    except Exception:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    prune(max_bytes=get_max_cache_bytes())
+
+
+def _entries():
+    cache_dir = get_cache_dir()
+    if not cache_dir.is_dir():
+        return []
+    entries = []
+    for path in cache_dir.glob("*.json"):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        entries.append((path, stat.st_size, stat.st_mtime))
+    return entries
+
+
+def cache_stats():
+    entries = _entries()
+    return {
+        "directory": str(get_cache_dir()),
+        "entries": len(entries),
+        "total_bytes": sum(size for _path, size, _mtime in entries),
+        "max_bytes": get_max_cache_bytes(),
+    }
+
+
+def prune(max_bytes=None, older_than_seconds=None):
+    """Evict least-recently-used entries until the cache fits ``max_bytes``.
+
+    Entries not used for ``older_than_seconds`` are removed regardless of
+    size. Returns the number of removed entries.
+    """
+    with _write_lock:
+        entries = sorted(_entries(), key=lambda item: item[2])
+        removed = 0
+        now = time.time()
+        total = sum(size for _path, size, _mtime in entries)
+        for path, size, mtime in entries:
+            expired = older_than_seconds is not None and now - mtime > older_than_seconds
+            over_budget = max_bytes is not None and total > max_bytes
+            if not (expired or over_budget):
+                continue
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        if removed:
+            logging.info(f"Pruned {removed} transcript cache entries.")
+        return removed
+
+
+def clear():
+    return prune(max_bytes=0)
+
+
+def _format_bytes(size):
+    return f"{size / (1024 * 1024):.1f} MB"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and prune the transcript cache.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("stats", help="Show cache location and size.")
+    subparsers.add_parser("list", help="List cached transcripts, most recently used first.")
+    prune_parser = subparsers.add_parser("prune", help="Evict entries by size or age.")
+    prune_parser.add_argument("--max-mb", type=int, default=None, help="Shrink the cache to at most this many MB.")
+    prune_parser.add_argument("--older-than-days", type=float, default=None, help="Remove entries unused for this many days.")
+    subparsers.add_parser("clear", help="Remove every cached transcript.")
+    args = parser.parse_args(argv)
+
+    if args.command == "stats":
+        stats = cache_stats()
+        print(f"Directory: {stats['directory']}")
+        print(f"Entries:   {stats['entries']}")
+        print(f"Size:      {_format_bytes(stats['total_bytes'])} / {_format_bytes(stats['max_bytes'])}")
+    elif args.command == "list":
+        for path, size, mtime in sorted(_entries(), key=lambda item: item[2], reverse=True):
+            try:
+                with open(path, "r", encoding="utf-8") as entry_file:
+                    entry = json.load(entry_file)
+            except (OSError, ValueError):
+                entry = {}
+            params = entry.get("params", {})
+            last_used = time.strftime("%Y-%m-%d %H:%M", time.localtime(mtime))
+            print(f"{path.stem[:12]}  {last_used}  {_format_bytes(size):>9}  {params.get('whisper_model', '?'):<16} {entry.get('source_name') or ''}")
+    elif args.command == "prune":
+        if args.max_mb is None and args.older_than_days is None:
+            max_bytes = get_max_cache_bytes()
+        else:
+            max_bytes = args.max_mb * 1024 * 1024 if args.max_mb is not None else None
+        older_than = args.older_than_days * 86400 if args.older_than_days is not None else None
+        print(f"Removed {prune(max_bytes=max_bytes, older_than_seconds=older_than)} entries.")
+    elif args.command == "clear":
+        print(f"Removed {clear()} entries.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""Checkpoints of transcriptions in progress.
+
+While a file is transcribed, the formatted segments and the end time of
+the last one are written every ``checkpoint_interval_seconds`` to a
+sidecar next to the transcript (``<stem>_transcript.checkpoint.json``).
+If the process dies, the next run on the same file with the same
+inference parameters replays the saved segments and seeks the audio to
+where they end. The sidecar is deleted once the transcript is written.
+"""
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from config import load_default_values
+from security_utils import build_local_output_path
+from transcript_cache import build_cache_key
+
+CHECKPOINT_FORMAT_VERSION = 1
+CHECKPOINT_SUFFIX = "_transcript.checkpoint.json"
+DEFAULT_CHECKPOINT_INTERVAL_SECONDS = 30
+
+
+def get_checkpoint_interval_seconds():
+    """Seconds between checkpoint writes; 0 disables checkpointing."""
+    value = load_default_values().get("default_values", {}).get("checkpoint_interval_seconds", DEFAULT_CHECKPOINT_INTERVAL_SECONDS)
+    try:
+        return max(0.0, float(value or 0))
+    except (TypeError, ValueError):
+        logging.warning(f"Invalid checkpoint_interval_seconds={value!r}. Falling back to {DEFAULT_CHECKPOINT_INTERVAL_SECONDS}.")
+        return float(DEFAULT_CHECKPOINT_INTERVAL_SECONDS)
+
+
+def checkpoint_path(source_path):
+    return build_local_output_path(source_path, CHECKPOINT_SUFFIX)
+
+
+def checkpoint_key(source_path, params):
+    """Identify one file version plus the parameters that shape its transcript.
+
+    Size and modification time stand in for the content hash, so a
+    checkpoint can be matched without reading a multi-hour file.
+    """
+    stat = Path(source_path).stat()
+    return build_cache_key(f"{stat.st_size}:{stat.st_mtime_ns}", params)
+
+
+class TranscriptCheckpoint:
+    """Segments of one file transcribed so far, saved periodically to its sidecar."""
+
+    def __init__(self, source_path, params, interval_seconds, clock=time.monotonic):
+        self.path = checkpoint_path(source_path)
+        self.key = checkpoint_key(source_path, params)
+        self.interval_seconds = interval_seconds
+        self.chunks = []
+        self.end_seconds = 0.0
+        self._clock = clock
+        self._saved_at = clock()
+        self._saved_count = 0
+        self._writable = True
+
+    def load(self):
+        """Restore a matching checkpoint; returns True when there is something to resume."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as checkpoint_file:
+                state = json.load(checkpoint_file)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable checkpoint {self.path.name}: {e}")
+            return False
+        if state.get("version") != CHECKPOINT_FORMAT_VERSION or state.get("key") != self.key:
+            logging.info(f"Checkpoint {self.path.name} was made for another file version or other settings; starting over.")
+            return False
+        self.chunks = list(state.get("segments", []))
+        self.end_seconds = float(state.get("end_seconds", 0.0))
+        self._saved_count = len(self.chunks)
+        return bool(self.chunks)
+
+    def add(self, chunk, end_seconds):
+        """Record one finished segment and save if the interval has elapsed."""
+        self.chunks.append(chunk)
+        self.end_seconds = end_seconds
+        if self.interval_seconds and self._clock() - self._saved_at >= self.interval_seconds:
+            self.save()
+
+    def save(self):
+        """Write the sidecar atomically; failures only disable checkpointing for this file."""
+        self._saved_at = self._clock()
+        if not self._writable or len(self.chunks) == self._saved_count:
+            return
+        state = {
+            "version": CHECKPOINT_FORMAT_VERSION,
+            "key": self.key,
+            "end_seconds": self.end_seconds,
+            "segments": self.chunks,
+            "updated": time.time(),
+        }
+        try:
+            fd, tmp_name = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as tmp_file:
+                    json.dump(state, tmp_file, ensure_ascii=False)
+                os.replace(tmp_name, self.path)
+            except Exception:
+                Path(tmp_name).unlink(missing_ok=True)
+                raise
+            self._saved_count = len(self.chunks)
+            logging.debug(f"Checkpoint saved: {len(self.chunks)} segments up to {self.end_seconds:.1f}s")
+        except OSError as e:
+            self._writable = False
+            logging.warning(f"Could not write checkpoint {self.path}: {e}")
+
+    def reset(self):
+        """Forget the loaded segments; the sidecar is overwritten by the next save."""
+        self.chunks = []
+        self.end_seconds = 0.0
+        self._saved_count = 0
+
+
+def discard_checkpoint(source_path):
+    """Delete the checkpoint of a file whose transcript has been written."""
+    try:
+        checkpoint_path(source_path).unlink(missing_ok=True)
+    except OSError as e:
+        logging.warning(f"Could not delete checkpoint of {source_path}: {e}")
@@ -1,7 +1,13 @@
 import os
 import sys
 import logging
+import queue
 import signal
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
 # Windows DLL directory loading helper for Python >= 3.8
 if sys.platform == "win32":
@@ -30,24 +36,71 @@ if sys.platform == "win32":
                 except Exception:
                     pass
 
-try:
-    import torch
-except ImportError:
-    pass
-
-from faster_whisper import WhisperModel, BatchedInferencePipeline
-from audio_processing import is_video_file, extract_audio_from_video, is_whatsapp_audio_file, convert_whatsapp_audio_to_mp3, is_audio_file, convert_audio_to_mp3
+from audio_processing import (
+    is_video_file,
+    extract_audio_from_video,
+    is_whatsapp_audio_file,
+    convert_whatsapp_audio_to_mp3,
+    is_audio_file,
+    convert_audio_to_mp3,
+    copy_audio_stream,
+    decode_audio_to_pcm,
+    is_pcm_decoding_enabled,
+    PcmStreamReader,
+    probe_media,
+    DIRECT_DECODE_CODECS,
+    SAMPLE_RATE,
+    STREAM_COPY_CONTAINERS,
+)
 from security_utils import (
     SecurityError,
     build_local_output_path,
     remove_controlled_tree,
     validate_local_media_path,
+    validate_media_duration,
 )
+from auto_tuning import resolve_profile
+from clip_packing import ClipPack, PackScheduler, get_pack_settings
+from inference_server import get_inference_servers, iter_remote_events
+from model_registry import model_registry, model_cache_key
+from pipeline_metrics import pipeline_metrics
+from speech_regions import detect_speech, merge_regions, normalize_vad_settings, summarize_regions, vad_parameters
+from config import load_default_values
+from transcript_buffer import TranscriptBuffer, UpdateThrottle
+from transcript_cache import build_cache_key, hash_media_file, load_transcript, store_transcript
+from transcript_checkpoint import TranscriptCheckpoint, discard_checkpoint, get_checkpoint_interval_seconds
+from windowed_transcription import get_window_settings, iter_windowed_segments, shift_segment
+
+default_values = load_default_values()
+
+_whisper_import_lock = threading.Lock()
+_whisper_classes = None
+
+def _import_whisper():
+    """Import faster-whisper (and torch, when available) on first use.
+
+    Both take seconds to import, and neither is needed to render the UI or
+    to serve cached transcripts. torch is imported first so its bundled
+    CUDA/cuDNN libraries are loaded before ctranslate2's.
+    """
+    global _whisper_classes
+    with _whisper_import_lock:
+        if _whisper_classes is None:
+            started = time.perf_counter()
+            try:
+                import torch  # noqa: F401
+            except ImportError:
+                pass
+            from faster_whisper import WhisperModel, BatchedInferencePipeline
+            _whisper_classes = (WhisperModel, BatchedInferencePipeline)
+            logging.info(f"Imported faster-whisper in {time.perf_counter() - started:.2f}s")
+        return _whisper_classes
 
 def load_model(model_size, compute_type, device, cpu_threads, num_workers):
     """Load the Whisper model with the specified parameters."""
     try:
         logging.info(f"Loading model: {model_size} | Compute type: {compute_type} | Device: {device} | CPU Threads: {cpu_threads} | Number of Workers: {num_workers}...")
+        WhisperModel, _pipeline_class = _import_whisper()
         model = WhisperModel(model_size, device=device, compute_type=compute_type, cpu_threads=cpu_threads, num_workers=num_workers)
         logging.info("Model loaded successfully.")
         return model
@@ -55,115 +108,830 @@ def load_model(model_size, compute_type, device, cpu_threads, num_workers):
         logging.error(f"Error loading model: {e}")
         return None
 
-def transcribe_file(file_paths, device, cpu_threads, num_workers, language, whisper_model, compute_type, temperature, beam_size, batch_size, condition_on_previous_text, word_timestamps):
+def get_batched_model(model_size, compute_type, device, cpu_threads, num_workers):
+    """Return a cached ``(WhisperModel, BatchedInferencePipeline)`` pair, loading it on first use."""
+    def _load():
+        with pipeline_metrics.span("model_load"):
+            model = load_model(model_size, compute_type, device, cpu_threads, num_workers)
+        if model is None:
+            return None
+        _model_class, BatchedInferencePipeline = _import_whisper()
+        return model, BatchedInferencePipeline(model=model)
+
+    key = model_cache_key(model_size, compute_type, device, cpu_threads, num_workers)
+    return model_registry.get(key, _load)
+
+def unload_models():
+    """Release every cached Whisper model."""
+    return model_registry.unload()
+
+def get_model_cache_stats():
+    """Return hit/miss/load-time statistics of the model cache."""
+    return model_registry.stats()
+
+def is_supported_media_file(file_path):
+    """Whether the file is a video, WhatsApp voice note or audio file we can transcribe."""
+    return (
+        str(file_path).lower().endswith(".mp3")
+        or is_video_file(file_path)
+        or is_whatsapp_audio_file(file_path)
+        or is_audio_file(file_path)
+    )
+
+def choose_audio_route(source_path, probe=None, pcm=None):
+    """Pick the cheapest way to hand a file to faster-whisper.
+
+      - ``direct``: MP3 input, or (without PCM decoding) an audio-only file in
+        a codec faster-whisper decodes itself; the file is used as is.
+      - ``pcm``: decode straight to a PCM array (the default for everything else).
+      - ``copy``: without PCM decoding, a video whose audio codec faster-whisper
+        decodes; the stream is remuxed (``-c:a copy``) into a matching container.
+      - ``transcode``: re-encode to MP3, the last resort.
+
+    ``pcm`` defaults to the ``pcm_decoding`` setting. Without a probe the
+    codec is unknown, so only ``direct`` (MP3), ``pcm`` and ``transcode`` apply.
     """
-    Transcribe the provided files:
-      - Convert the file (video/WhatsApp/audio) to MP3 if necessary.
-      - Use the Whisper model to transcribe the content.
-      - Save the transcript to a file and return the transcription, output file path, and folder.
+    if source_path.suffix.lower() == ".mp3":
+        return "direct"
+    if pcm is None:
+        pcm = is_pcm_decoding_enabled()
+    if pcm:
+        return "pcm"
+    codec = probe["audio"][0]["codec"] if probe and probe["audio"] else None
+    if codec in DIRECT_DECODE_CODECS and not probe["video"]:
+        return "direct"
+    if codec in STREAM_COPY_CONTAINERS:
+        return "copy"
+    return "transcode"
+
+def prepare_audio(source_path, probe=None):
+    """Prepare a validated media file for faster-whisper.
+
+    Returns ``(audio, route)`` where ``audio`` is either a 16 kHz float32
+    NumPy array (PCM decode path) or a file path, and ``route`` is the path
+    taken (see ``choose_audio_route``). A failed PCM decode or stream copy
+    falls through to the next cheapest route.
+    """
+    current_file_path = str(source_path)
+    route = choose_audio_route(source_path, probe)
+    codec = probe["audio"][0]["codec"] if probe and probe["audio"] else "unknown codec"
+    logging.info(f"Audio preparation for {source_path.name}: {route} ({codec})")
+    if route == "direct":
+        return current_file_path, route
+
+    if route == "pcm":
+        try:
+            return decode_audio_to_pcm(current_file_path), route
+        except Exception as e:
+            route = choose_audio_route(source_path, probe, pcm=False)
+            logging.warning(f"PCM decoding failed for {source_path.name}, falling back to {route}: {e}")
+            if route == "direct":
+                return current_file_path, route
+
+    if route == "copy":
+        audio_file = str(build_local_output_path(current_file_path, f"_audio{STREAM_COPY_CONTAINERS[codec]}"))
+        try:
+            copy_audio_stream(current_file_path, audio_file)
+            return audio_file, route
+        except Exception as e:
+            logging.warning(f"Audio stream copy failed for {source_path.name}, transcoding instead: {e}")
+            route = "transcode"
+
+    audio_file = str(build_local_output_path(current_file_path, ".mp3"))
+    if is_video_file(current_file_path):
+        extract_audio_from_video(current_file_path, audio_file)
+    elif is_whatsapp_audio_file(current_file_path):
+        convert_whatsapp_audio_to_mp3(current_file_path, audio_file)
+    else:
+        convert_audio_to_mp3(current_file_path, audio_file)
+    return audio_file, "transcode"
+
+def get_batch_settings(cpu_threads, num_workers, workers=None, prefetch=None):
+    """Resolve the batch-mode worker layout.
+
+    Returns ``(workers, prefetch, cpu_threads, num_workers)`` where the model
+    is loaded with one CTranslate2 worker per concurrent transcription and
+    the requested ``cpu_threads`` are split evenly between them.
+    """
+    batch_defaults = default_values.get("default_values", {})
+    if workers is None:
+        workers = batch_defaults.get("transcription_workers", 1)
+    if prefetch is None:
+        prefetch = batch_defaults.get("prefetch_files", 1)
+    workers = max(1, int(workers))
+    prefetch = max(1, int(prefetch))
+    cpu_threads = int(cpu_threads)
+    threads_per_worker = max(1, cpu_threads // workers) if cpu_threads > 0 else 0
+    return workers, prefetch, threads_per_worker, max(int(num_workers), workers)
+
+def format_segment(segment, word_timestamps):
+    """Render one faster-whisper segment as transcript text."""
+    if word_timestamps:
+        return "\n".join(f"{word.start:.2f} -> {word.end:.2f} {word.word}" for word in segment.words) + "\n"
+    return segment.text + "\n"
+
+def _detect_speech_regions(prepared, vad_settings):
+    """VAD pre-pass: find the speech regions of the prepared audio and pack them into clips."""
+    audio = prepared["audio"]
+    if isinstance(audio, str):
+        audio = decode_audio_to_pcm(audio)
+        prepared["audio"] = audio
+    regions = detect_speech(audio, vad_settings, sampling_rate=SAMPLE_RATE)
+    prepared["vad"] = summarize_regions(regions, len(audio) / SAMPLE_RATE)
+    prepared["clips"] = merge_regions(regions, vad_settings["vad_chunk_length"])
+    logging.info(
+        f"VAD pre-pass for {prepared['source_name']}: {len(regions)} speech regions, "
+        f"{prepared['vad']['speech_seconds']:.1f}s of {prepared['vad']['total_seconds']:.1f}s "
+        f"({prepared['vad']['speech_ratio']:.0%}) in {len(prepared['clips'])} clips"
+    )
+    logging.debug(f"Speech regions of {prepared['source_name']}: {prepared['vad']['regions']}")
+
+def _open_windowed_audio(prepared, source_path, window_seconds, start_seconds):
+    """Decode the first window of the file through a PCM stream.
+
+    Files that fit in one window become a plain array; longer ones keep the
+    reader in ``prepared["reader"]`` for the inference stage. Returns False
+    when the stream cannot be opened, so the caller falls back to
+    ``prepare_audio``.
     """
     try:
-        if not file_paths:
-            logging.warning("No file paths provided for transcription.")
-            yield "Please select a file", None, None
+        reader = PcmStreamReader(source_path, start_seconds=start_seconds)
+    except OSError as e:
+        logging.warning(f"Could not stream {source_path.name}, decoding it in one piece: {e}")
+        return False
+    try:
+        prepared["audio"] = reader.read(int(window_seconds * SAMPLE_RATE))
+    except Exception:
+        reader.close()
+        raise
+    if reader.exhausted:
+        reader.close()
+        prepared["audio_route"] = "pcm"
+    else:
+        prepared["reader"] = reader
+        prepared["audio_route"] = "pcm-stream"
+        logging.info(f"{source_path.name} is longer than {window_seconds:.0f}s; transcribing it in windows.")
+    return True
+
+def _close_prepared(prepared_future):
+    """Stop the ffmpeg stream of a prepared long file that will not be transcribed."""
+    if prepared_future.cancelled() or prepared_future.exception() is not None:
+        return
+    reader = prepared_future.result().get("reader")
+    if reader is not None:
+        reader.close()
+
+def preflight_media(source_path):
+    """Probe a file before any conversion and reject it if it cannot be transcribed.
+
+    Files without an audio stream and files longer than
+    ``max_media_duration_seconds`` fail here in milliseconds instead of
+    after minutes of ffmpeg work. Returns the probe (see
+    ``audio_processing.probe_media``), or None when ffprobe is unavailable
+    or times out, in which case the file is processed without the checks.
+    """
+    try:
+        probe = probe_media(source_path)
+    except subprocess.TimeoutExpired:
+        logging.warning(f"Probing {source_path.name} timed out; continuing without preflight checks.")
+        return None
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Unreadable media file: {source_path.name}") from e
+    if probe is None:
+        return None
+    if not probe["audio"]:
+        raise RuntimeError(f"{'Video' if probe['video'] else 'File'} has no audio track, skipping: {source_path.name}")
+    validate_media_duration(probe["duration"])
+    return probe
+
+def _load_checkpoint(prepared, source_path, job_params, checkpoint_interval):
+    """Attach the file's checkpoint to ``prepared`` and return the media time to resume from."""
+    try:
+        checkpoint = TranscriptCheckpoint(source_path, job_params, checkpoint_interval)
+        resumed = checkpoint.load()
+    except (OSError, SecurityError) as e:
+        logging.warning(f"Checkpointing disabled for {source_path.name}: {e}")
+        return 0.0
+    prepared["checkpoint"] = checkpoint
+    if not resumed:
+        return 0.0
+    logging.info(f"Resuming {source_path.name} from its checkpoint at {checkpoint.end_seconds:.1f}s ({len(checkpoint.chunks)} segments).")
+    return checkpoint.end_seconds
+
+def _prepare_job(source_path, cache_params, job_params, vad_settings, window_settings, checkpoint_interval):
+    """Prepare stage: look the file up in the transcript cache, else decode its audio.
+
+    In ``prepass`` VAD mode the speech regions are detected here as well, so
+    VAD overlaps with the inference of the previous file. With windowing
+    enabled only the first window of a long file is decoded here; in that
+    case VAD runs per window in the inference stage. A file with a matching
+    checkpoint is decoded from where the checkpoint ends. Everything starts
+    with the ``preflight_media`` probe, whose duration also decides whether
+    the file needs windowing at all.
+    """
+    started = time.perf_counter()
+    prepared = {
+        "source_name": source_path.name, "cache_key": None, "cached": None, "audio": None,
+        "vad": None, "clips": None, "reader": None, "checkpoint": None, "start_seconds": 0.0,
+        "probe": None, "audio_route": None, "spans": [],
+    }
+    with pipeline_metrics.collect(prepared["spans"]):
+        _prepare_audio_stages(prepared, source_path, cache_params, job_params, vad_settings, window_settings, checkpoint_interval)
+    prepared["prepare_seconds"] = time.perf_counter() - started
+    return prepared
+
+def _prepare_audio_stages(prepared, source_path, cache_params, job_params, vad_settings, window_settings, checkpoint_interval):
+    """Body of ``_prepare_job``: probe, cache lookup, conversion and VAD, each timed as a span."""
+    with pipeline_metrics.span("probe") as span:
+        prepared["probe"] = preflight_media(source_path)
+        span["audio_seconds"] = prepared["probe"]["duration"] if prepared["probe"] else None
+    if cache_params is not None:
+        try:
+            prepared["cache_key"] = build_cache_key(hash_media_file(source_path), cache_params)
+            prepared["cached"] = load_transcript(prepared["cache_key"])
+        except Exception as e:
+            logging.warning(f"Transcript cache lookup failed for {source_path.name}: {e}")
+        if prepared["cached"] is not None:
+            logging.info(f"Transcript cache hit for {source_path.name}.")
+            prepared["audio_route"] = "cached"
+            return
+    start_seconds = _load_checkpoint(prepared, source_path, job_params, checkpoint_interval) if checkpoint_interval else 0.0
+    window_seconds, _overlap_seconds = window_settings
+    duration = prepared["probe"]["duration"] if prepared["probe"] else None
+    if duration is not None and duration - start_seconds <= window_seconds:
+        # Known to fit in one window: decode it in one piece, under the ffmpeg timeout
+        window_seconds = 0
+    with pipeline_metrics.span("convert") as span:
+        if not (window_seconds and is_pcm_decoding_enabled() and _open_windowed_audio(prepared, source_path, window_seconds, start_seconds)):
+            prepared["audio"], prepared["audio_route"] = prepare_audio(source_path, prepared["probe"])
+            if start_seconds and isinstance(prepared["audio"], str):
+                # A file path cannot be seeked before faster-whisper decodes it
+                logging.info(f"Cannot seek {source_path.name} without PCM decoding; transcribing it from the start.")
+                prepared["checkpoint"].reset()
+                start_seconds = 0.0
+            elif start_seconds:
+                prepared["audio"] = prepared["audio"][int(start_seconds * SAMPLE_RATE):]
+        if isinstance(prepared["audio"], str):
+            span["audio_seconds"] = duration
+        else:
+            span["audio_seconds"] = prepared["audio"].size / SAMPLE_RATE
+    prepared["start_seconds"] = start_seconds
+    if not isinstance(prepared["audio"], str) and prepared["audio"].size == 0:
+        # The checkpoint already covers the whole file
+        prepared["clips"] = []
+    elif vad_settings["vad_mode"] == "prepass" and prepared["reader"] is None:
+        with pipeline_metrics.span("vad") as span:
+            _detect_speech_regions(prepared, vad_settings)
+            span["audio_seconds"] = prepared["vad"]["total_seconds"]
+
+def _transcribe_window(pipeline, options, vad_settings):
+    """Return a ``transcribe(audio)`` callable for one window of a long file."""
+    def transcribe(audio):
+        window_options = options
+        if vad_settings["vad_mode"] == "prepass":
+            clips = merge_regions(detect_speech(audio, vad_settings, sampling_rate=SAMPLE_RATE), vad_settings["vad_chunk_length"])
+            if not clips:
+                return []
+            window_options = dict(options, vad_filter=False, clip_timestamps=[{"start": start, "end": end} for start, end in clips])
+        segments, _info = pipeline.transcribe(audio, **window_options)
+        return segments
+    return transcribe
+
+def _run_inference(pipeline, prepared, options, word_timestamps, vad_settings, window_settings, chunks, events, cancel_event):
+    """Transcribe the prepared audio, pushing each formatted segment to ``events``.
+
+    Records the latency to the first segment and returns the seconds of
+    audio transcribed (None when unknown).
+    """
+    reader = prepared["reader"]
+    audio = prepared["audio"]
+    start_seconds = prepared["start_seconds"]
+    checkpoint = prepared["checkpoint"]
+    started = time.perf_counter()
+    if reader is not None:
+        window_seconds, overlap_seconds = window_settings
+        first_window, prepared["audio"] = audio, None
+        segments = iter_windowed_segments(
+            first_window, reader.read, _transcribe_window(pipeline, options, vad_settings),
+            window_seconds, overlap_seconds, start_seconds=start_seconds,
+        )
+    else:
+        segments, _info = pipeline.transcribe(audio, **options)
+        segments = (shift_segment(segment, start_seconds) for segment in segments)
+    first = True
+    for segment in segments:
+        if cancel_event.is_set():
+            return None
+        if first:
+            pipeline_metrics.record("first_segment", time.perf_counter() - started)
+            first = False
+        chunk = format_segment(segment, word_timestamps)
+        chunks.append(chunk)
+        if checkpoint is not None:
+            checkpoint.add(chunk, segment.end)
+        events.put(("segment", chunk))
+
+    if reader is not None:
+        return reader.samples_read / SAMPLE_RATE
+    if isinstance(audio, str):
+        duration = prepared["probe"]["duration"] if prepared["probe"] else None
+        return duration - start_seconds if duration else None
+    return audio.size / SAMPLE_RATE
+
+def _job_timings(prepared):
+    return {
+        "prepare_seconds": prepared["prepare_seconds"], "inference_seconds": 0.0, "cached": False, "vad": prepared["vad"],
+        "media_seconds": prepared["probe"]["duration"] if prepared["probe"] else None,
+        "audio_route": prepared["audio_route"], "spans": prepared["spans"], "packed_files": 1,
+    }
+
+def _is_packable(prepared, max_seconds):
+    """Whether a prepared file is short, decoded to PCM and still needs inference."""
+    audio = prepared["audio"]
+    return (
+        prepared["cached"] is None
+        and prepared["reader"] is None
+        and not prepared["start_seconds"]
+        and prepared["clips"] != []
+        and not isinstance(audio, str)
+        and 0 < audio.size <= max_seconds * SAMPLE_RATE
+    )
+
+def _store_in_cache(prepared, chunks, cache_params):
+    if prepared["cache_key"] is not None:
+        try:
+            store_transcript(prepared["cache_key"], chunks, prepared["source_name"], cache_params)
+        except Exception as e:
+            logging.warning(f"Could not store transcript in cache: {e}")
+
+def _transcribe_pack(get_pipeline, members, transcribe_options, word_timestamps, cache_params, vad_settings, cancel_event):
+    """Transcribe several short prepared files in shared batches (see ``clip_packing``).
+
+    ``members`` are ``(prepared, events)`` pairs; each file's segments,
+    timings and errors go to its own ``events`` queue. Speech clips come
+    from the prepass VAD, or are detected per file here, so that no clip
+    spans two files.
+    """
+    pack = ClipPack()
+    chunks = [[] for _member in members]
+    done = [False] * len(members)
+    try:
+        for prepared, events in members:
+            if prepared["clips"] is None:
+                prepared["clips"] = merge_regions(detect_speech(prepared["audio"], vad_settings), vad_settings["vad_chunk_length"])
+            pack.add(prepared["audio"], prepared["clips"])
+            events.put(("status", f"Transcribing together with {len(members) - 1} other short files..."))
+        options = dict(transcribe_options, vad_filter=False, clip_timestamps=pack.clip_timestamps())
+        audio = pack.audio()
+        audio_seconds = sum(prepared["audio"].size for prepared, _events in members) / SAMPLE_RATE
+        logging.info(f"Transcribing {len(members)} short files together: {len(pack.clips)} clips, {audio_seconds:.1f}s of audio")
+
+        with pipeline_metrics.collect(members[0][0]["spans"]):
+            pipeline = get_pipeline()
+        with pipeline_metrics.span("inference", audio_seconds) as span:
+            started = time.perf_counter()
+            segments, _info = pipeline.transcribe(audio, **options)
+            first = True
+            for index, segment in pack.split(segments):
+                if cancel_event.is_set():
+                    return
+                if first:
+                    pipeline_metrics.record("first_segment", time.perf_counter() - started)
+                    first = False
+                prepared, events = members[index]
+                chunk = format_segment(segment, word_timestamps)
+                chunks[index].append(chunk)
+                if prepared["checkpoint"] is not None:
+                    prepared["checkpoint"].add(chunk, segment.end)
+                events.put(("segment", chunk))
+
+        for index, (prepared, events) in enumerate(members):
+            _store_in_cache(prepared, chunks[index], cache_params)
+            # The pack's inference time is shared out by audio length
+            member_seconds = prepared["audio"].size / SAMPLE_RATE
+            share = span["seconds"] * member_seconds / audio_seconds if audio_seconds else 0.0
+            prepared["spans"].append({"stage": "inference", "seconds": share, "audio_seconds": member_seconds, "packed_files": len(members)})
+            timings = _job_timings(prepared)
+            timings.update(inference_seconds=share, resumed_from=0.0, packed_files=len(members))
+            done[index] = True
+            events.put(("done", timings))
+    except Exception as e:
+        for index, (_prepared, events) in enumerate(members):
+            if not done[index]:
+                events.put(("error", e))
+    finally:
+        for index, (prepared, _events) in enumerate(members):
+            if prepared["checkpoint"] is not None and not done[index]:
+                prepared["checkpoint"].save()
+
+def _transcribe_job(get_pipeline, prepared_future, transcribe_options, word_timestamps, cache_params, vad_settings, window_settings, events, cancel_event, index=None, packer=None, pack_max_seconds=0):
+    """Worker body: wait for the prepared audio, run inference and push events to ``events``.
+
+    With a ``packer``, a short file is transcribed together with the short
+    files that follow it (see ``clip_packing``), and a file already taken
+    by such a pack is skipped.
+    """
+    if packer is None:
+        _transcribe_single(get_pipeline, prepared_future, transcribe_options, word_timestamps, cache_params, vad_settings, window_settings, events, cancel_event)
+        return
+    if not packer.own(index):
+        return
+    members, leftover = [], None
+    try:
+        prepared = prepared_future.result()
+    except Exception:
+        prepared = None
+    if prepared is not None and not cancel_event.is_set() and _is_packable(prepared, pack_max_seconds):
+        members, leftover = packer.gather(index, lambda candidate: _is_packable(candidate, pack_max_seconds), cancel_event)
+    if members:
+        _transcribe_pack(get_pipeline, [(prepared, events)] + members, transcribe_options, word_timestamps, cache_params, vad_settings, cancel_event)
+    else:
+        _transcribe_single(get_pipeline, prepared_future, transcribe_options, word_timestamps, cache_params, vad_settings, window_settings, events, cancel_event)
+    if leftover is not None:
+        leftover_future, leftover_events = leftover
+        _transcribe_single(get_pipeline, leftover_future, transcribe_options, word_timestamps, cache_params, vad_settings, window_settings, leftover_events, cancel_event)
+
+def _transcribe_single(get_pipeline, prepared_future, transcribe_options, word_timestamps, cache_params, vad_settings, window_settings, events, cancel_event):
+    """Transcribe one prepared file on its own.
+
+    Finished segments are recorded in the file's checkpoint, which is saved
+    periodically and whenever the job stops before completing.
+    """
+    prepared = None
+    completed = False
+    try:
+        prepared = prepared_future.result()
+        if cancel_event.is_set():
             return
+        timings = _job_timings(prepared)
+        if prepared["cached"] is not None:
+            timings["cached"] = True
+            for chunk in prepared["cached"]:
+                events.put(("segment", chunk))
+            events.put(("done", timings))
+            return
+
+        checkpoint = prepared["checkpoint"]
+        start_seconds = prepared["start_seconds"]
+        timings["resumed_from"] = start_seconds
+        chunks = list(checkpoint.chunks) if checkpoint is not None else []
+        for chunk in chunks:
+            events.put(("segment", chunk))
+        vad = prepared["vad"]
+        if prepared["clips"] == []:
+            # Nothing but silence (or nothing left after the checkpoint): skip the model entirely
+            if vad is not None:
+                events.put(("status", f"No speech detected in {vad['total_seconds']:.0f}s of audio."))
+        else:
+            options = dict(transcribe_options)
+            reader = prepared["reader"]
+            if reader is not None:
+                window_seconds, _overlap_seconds = window_settings
+                events.put(("status", f"Transcribing in {window_seconds / 60:.0f}-minute windows..."))
+            elif prepared["clips"] is not None:
+                events.put(("status", f"Transcribing {len(vad['regions'])} speech regions ({vad['speech_ratio']:.0%} of {vad['total_seconds']:.0f}s)..."))
+                options["vad_filter"] = False
+                options["clip_timestamps"] = [{"start": start, "end": end} for start, end in prepared["clips"]]
+            else:
+                events.put(("status", "Transcribing..."))
+            if start_seconds:
+                events.put(("status", f"Resuming from checkpoint at {start_seconds / 60:.1f} min..."))
+            with pipeline_metrics.collect(prepared["spans"]):
+                pipeline = get_pipeline()
+                with pipeline_metrics.span("inference") as span:
+                    span["audio_seconds"] = _run_inference(pipeline, prepared, options, word_timestamps, vad_settings, window_settings, chunks, events, cancel_event)
+            if cancel_event.is_set():
+                return
+            timings["inference_seconds"] = span["seconds"]
 
+        _store_in_cache(prepared, chunks, cache_params)
+        completed = True
+        events.put(("done", timings))
+    except Exception as e:
+        events.put(("error", e))
+    finally:
+        if prepared is not None and prepared["reader"] is not None:
+            prepared["reader"].close()
+        if prepared is not None and prepared["checkpoint"] is not None and not completed:
+            prepared["checkpoint"].save()
+
+def iter_transcription_events(file_paths, device, cpu_threads, num_workers, language, whisper_model, compute_type, temperature, beam_size, batch_size, condition_on_previous_text, word_timestamps, workers=None, prefetch=None, use_cache=None, vad=None, profile=None, remote=None, output_paths=None):
+    """
+    Transcribe the provided files and yield structured progress events.
+
+    Every event is a dict with an ``event`` key:
+      - ``invalid``: the path was rejected by the security checks (``error``).
+      - ``file_start``: processing of ``source`` (file ``index`` of ``total``) begins.
+      - ``status``: a progress ``message`` for the current file.
+      - ``segment``: newly transcribed ``text`` appended to the current file.
+      - ``file_done``: the transcript was written to ``output_path``; includes
+        ``prepare_seconds``, ``inference_seconds``, ``seconds``, ``cached``,
+        ``media_seconds`` (probed duration, None when unknown),
+        ``audio_route`` (how the audio was prepared: ``cached``, ``pcm``,
+        ``pcm-stream``, ``direct``, ``copy`` or ``transcode``), ``spans``
+        (the file's timed stages, see ``pipeline_metrics``), ``packed_files``
+        (how many files shared its inference call, 1 when transcribed alone),
+        ``resumed_from`` (media seconds covered by a checkpoint, 0 when
+        transcribed from the start) and ``vad`` (speech regions and speech
+        ratio in ``prepass`` VAD mode, else None).
+      - ``file_error``: the file was skipped because of ``error`` (including
+        preflight rejections: no audio stream, or longer than
+        ``max_media_duration_seconds``).
+
+    Audio for upcoming files is prepared by ``prefetch`` ffmpeg threads while
+    up to ``workers`` files are transcribed concurrently; events are still
+    emitted file by file, in input order. Files already in the transcript
+    cache (same content and inference parameters) are returned without
+    loading the model or running inference.
+
+    ``vad`` holds the ``vad_*`` settings (see ``speech_regions``); missing
+    keys use the defaults. With ``profile="auto"`` the given ``cpu_threads``,
+    ``num_workers``, ``batch_size`` and ``compute_type`` are replaced by the
+    tuned values for the model and device (see ``auto_tuning``).
+
+    Files up to ``pack_short_files_seconds`` long are transcribed together,
+    up to ``pack_max_files`` at a time, so their speech clips fill shared
+    inference batches (see ``clip_packing``); this needs a fixed ``language``.
+
+    Files longer than ``long_media_window_seconds`` are decoded and
+    transcribed in overlapping windows (see ``windowed_transcription``), so
+    memory use does not grow with the length of the media. Progress is
+    checkpointed every ``checkpoint_interval_seconds`` (see
+    ``transcript_checkpoint``), so an interrupted file resumes where it
+    stopped; finished files of a re-run batch are served from the transcript
+    cache.
+
+    When ``inference_servers`` are configured the batch is sent to an
+    ``inference_server`` replica, which owns the models, and its events are
+    relayed; ``remote=False`` always transcribes in this process.
+
+    ``output_paths`` (one per file) writes each transcript there instead of
+    ``<stem>_transcript.txt`` next to its source. The servers write next to
+    the media, so output paths are always transcribed in this process.
+    """
+    servers = get_inference_servers() if remote is None and output_paths is None else []
+    if servers:
+        yield from iter_remote_events(servers, file_paths, {
+            "device": device, "cpu_threads": cpu_threads, "num_workers": num_workers, "language": language,
+            "whisper_model": whisper_model, "compute_type": compute_type, "temperature": temperature,
+            "beam_size": beam_size, "batch_size": batch_size, "condition_on_previous_text": condition_on_previous_text,
+            "word_timestamps": word_timestamps, "workers": workers, "prefetch": prefetch, "use_cache": use_cache,
+            "vad": vad, "profile": profile,
+        })
+        return
+    cancel_event = threading.Event()
+    prepare_pool = None
+    inference_pool = None
+    jobs = []
+    try:
         if isinstance(file_paths, str):
             file_paths = [file_paths]
 
-        logging.info(f"Using device: {device}")
-        model = load_model(whisper_model, compute_type, device, cpu_threads, num_workers)
-        if model is None:
-            yield "Error loading model", None, None
-            return
+        cpu_threads, num_workers, batch_size, compute_type = resolve_profile(
+            profile, whisper_model, device, cpu_threads, num_workers, batch_size, compute_type,
+        )
+        workers, prefetch, worker_threads, model_workers = get_batch_settings(cpu_threads, num_workers, workers, prefetch)
+        logging.info(f"Using device: {device} | Batch workers: {workers} | Prefetch: {prefetch}")
+        model_lock = threading.Lock()
+        loaded = None
+
+        def get_pipeline():
+            # Loaded on first cache miss, so fully cached batches never touch the weights
+            nonlocal loaded
+            with model_lock:
+                if loaded is None:
+                    loaded = get_batched_model(whisper_model, compute_type, device, worker_threads, model_workers)
+                    if loaded is None:
+                        raise RuntimeError("Error loading model")
+            model, batched_model = loaded
+            # The pipeline keeps per-call state, so concurrent workers
+            # each get their own wrapper around the shared model.
+            if workers == 1:
+                return batched_model
+            _model_class, BatchedInferencePipeline = _import_whisper()
+            return BatchedInferencePipeline(model=model)
+
+        vad_settings = normalize_vad_settings(vad)
+        window_settings = get_window_settings()
+        checkpoint_interval = get_checkpoint_interval_seconds()
+        pack_max_seconds, pack_max_files = get_pack_settings()
+        if not language:
+            # A pack shares one language, so files needing detection are transcribed one by one
+            pack_max_seconds, pack_max_files = 0.0, 1
+        packer = PackScheduler(pack_max_files) if pack_max_seconds else None
+        if use_cache is None:
+            use_cache = default_values.get("default_values", {}).get("transcript_cache", True)
+        # Everything that changes the transcript text; keys both the cache and checkpoints
+        job_params = {
+            "whisper_model": whisper_model,
+            "compute_type": compute_type,
+            "language": language,
+            "beam_size": beam_size,
+            "temperature": temperature,
+            "word_timestamps": word_timestamps,
+            "condition_on_previous_text": condition_on_previous_text,
+            **vad_settings,
+        }
+        cache_params = job_params if use_cache else None
 
-        batched_model = BatchedInferencePipeline(model=model)
-        
-        session_transcription = ""
+        transcribe_options = {
+            "batch_size": batch_size,
+            "language": language,
+            "beam_size": beam_size,
+            "condition_on_previous_text": condition_on_previous_text,
+            "word_timestamps": word_timestamps,
+            "temperature": temperature,
+            "vad_filter": True,
+            "vad_parameters": vad_parameters(vad_settings),
+            "chunk_length": vad_settings["vad_chunk_length"],
+        }
+
+        # --- validate paths (security check) and queue the transcribable files ---
         total_files = len(file_paths)
         for index, file_path_str in enumerate(file_paths, 1):
-            # --- validate path (security check) ---
+            job = {"index": index, "path": file_path_str, "source": None, "error": None, "events": None, "prepared": None, "spans": []}
             try:
-                source_path = validate_local_media_path(file_path_str)
+                with pipeline_metrics.collect(job["spans"]), pipeline_metrics.span("validate"):
+                    job["source"] = validate_local_media_path(file_path_str)
             except SecurityError as e:
-                logging.warning("Rejected transcription input: %s", e)
-                yield f"Invalid file: {e}", None, None
+                job["error"] = e
+            jobs.append(job)
+
+        prepare_pool = ThreadPoolExecutor(max_workers=prefetch, thread_name_prefix="whisper-prepare")
+        inference_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="whisper-inference")
+        # Only keep a bounded window of files in flight so decoded audio of
+        # the whole batch is never held in memory at once. With packing, the
+        # files a pack may take over are prepared ahead as well.
+        window = workers + prefetch + pack_max_files - 1
+        submitted = 0
+
+        def submit_upto(limit):
+            nonlocal submitted
+            while submitted < min(limit, len(jobs)):
+                job = jobs[submitted]
+                submitted += 1
+                if job["source"] is None or not is_supported_media_file(job["source"]):
+                    continue
+                job["events"] = queue.Queue()
+                prepared = prepare_pool.submit(
+                    _prepare_job, job["source"], cache_params, job_params, vad_settings, window_settings, checkpoint_interval,
+                )
+                job["prepared"] = prepared
+                if packer is not None:
+                    packer.register(job["index"], prepared, job["events"])
+                inference_pool.submit(
+                    _transcribe_job, get_pipeline, prepared, transcribe_options,
+                    word_timestamps, cache_params, vad_settings, window_settings, job["events"], cancel_event,
+                    job["index"], packer, pack_max_seconds,
+                )
+
+        for position, job in enumerate(jobs):
+            submit_upto(position + window)
+            index = job["index"]
+
+            if job["error"] is not None:
+                logging.warning("Rejected transcription input: %s", job["error"])
+                yield {"event": "invalid", "index": index, "total": total_files, "path": job["path"], "error": job["error"]}
                 continue
 
+            source_path = job["source"]
             file_name = source_path.name
-            folder_path = str(source_path.parent)
-            header = f"### File {index}/{total_files}: {file_name}\n\n"
             logging.info(f"Processing file {index}/{total_files}: {file_name}")
+            yield {"event": "file_start", "index": index, "total": total_files, "source": source_path}
 
             # --- per-file processing: any failure is caught and logged,
             #     then the loop continues with the next file ---
+            started = time.perf_counter()
             try:
-                current_file_path = str(source_path)
-                yield session_transcription + header + "Converting/Preparing audio...", None, folder_path
-
-                # Prepare the audio file in MP3
-                audio_file = build_local_output_path(current_file_path, ".mp3")
-                file_ext = source_path.suffix.lower()
-                if file_ext != ".mp3":
-                    if is_video_file(current_file_path):
-                        extract_audio_from_video(current_file_path, str(audio_file))
-                        current_file_path = str(audio_file)
-                    elif is_whatsapp_audio_file(current_file_path):
-                        convert_whatsapp_audio_to_mp3(current_file_path, str(audio_file))
-                        current_file_path = str(audio_file)
-                    elif is_audio_file(current_file_path):
-                        convert_audio_to_mp3(current_file_path, str(audio_file))
-                        current_file_path = str(audio_file)
-                    else:
-                        error_msg = "Invalid file type"
-                        yield session_transcription + header + error_msg, None, folder_path
-                        session_transcription += header + error_msg + "\n\n---\n\n"
-                        continue
-
-                logging.info(f"Transcribing {current_file_path}...")
-                yield session_transcription + header + "Transcribing...", None, folder_path
-
-                segments, info = batched_model.transcribe(
-                    current_file_path,
-                    batch_size=batch_size,
-                    language=language,
-                    beam_size=beam_size,
-                    condition_on_previous_text=condition_on_previous_text,
-                    word_timestamps=word_timestamps,
-                    temperature=temperature
-                )
-
-                logging.info("File transcribed successfully, generating transcript...")
-                accumulated_transcription = ""
+                if job["events"] is None:
+                    yield {"event": "file_error", "index": index, "source": source_path, "error": "Invalid file type", "unsupported": True}
+                    continue
 
-                # Iterate over segments and yield progressively
-                for segment in segments:
-                    if word_timestamps:
-                        chunk = "\n".join(f"{word.start:.2f} -> {word.end:.2f} {word.word}" for word in segment.words) + "\n"
+                accumulated_transcription = TranscriptBuffer()
+                while True:
+                    kind, payload = job["events"].get()
+                    if kind == "status":
+                        logging.info(f"Transcribing {file_name}...")
+                        yield {"event": "status", "index": index, "message": payload}
+                    elif kind == "segment":
+                        accumulated_transcription.append(payload)
+                        yield {"event": "segment", "index": index, "text": payload}
+                    elif kind == "error":
+                        raise payload
                     else:
-                        chunk = segment.text + "\n"
+                        timings = payload
+                        break
 
-                    accumulated_transcription += chunk
-                    # Yield partial result. Output path is None until transcription is complete.
-                    yield session_transcription + header + accumulated_transcription, None, folder_path
-
-                logging.info(f"Transcript generated. Saving transcript to folder: {folder_path}...")
-                output_path = build_local_output_path(source_path, "_transcript.txt")
-                with open(output_path, "w", encoding="utf-8") as f:
-                    f.write(accumulated_transcription)
+                logging.info(f"Transcript generated. Saving transcript to folder: {source_path.parent}...")
+                spans = job["spans"] + timings.pop("spans")
+                with pipeline_metrics.collect(spans), pipeline_metrics.span("write", timings["media_seconds"]):
+                    if output_paths is not None:
+                        output_path = Path(output_paths[index - 1])
+                        output_path.parent.mkdir(parents=True, exist_ok=True)
+                    else:
+                        output_path = build_local_output_path(source_path, "_transcript.txt")
+                    with open(output_path, "w", encoding="utf-8") as f:
+                        f.write(accumulated_transcription.text())
                 logging.info(f"Transcription saved to: {output_path}")
+                if timings["cached"]:
+                    pipeline_metrics.record_file("cached")
+                else:
+                    # Resumed files only processed the audio after their checkpoint
+                    media_seconds = timings["media_seconds"] - timings["resumed_from"] if timings["media_seconds"] else None
+                    pipeline_metrics.record_file("done", timings["prepare_seconds"] + timings["inference_seconds"], media_seconds)
+                if checkpoint_interval:
+                    discard_checkpoint(source_path)
 
-                # Final yield with output path for the current file
-                yield session_transcription + header + accumulated_transcription, str(output_path), folder_path
-
-                session_transcription += header + accumulated_transcription + "\n\n---\n\n"
+                yield {
+                    "event": "file_done",
+                    "index": index,
+                    "source": source_path,
+                    "output_path": output_path,
+                    "seconds": time.perf_counter() - started,
+                    **timings,
+                    "spans": spans,
+                }
 
             except Exception as file_error:
-                error_msg = f"Skipped (error): {file_error}"
                 logging.error("Error processing file %s: %s", file_name, file_error)
-                yield session_transcription + header + error_msg, None, folder_path
-                session_transcription += header + error_msg + "\n\n---\n\n"
-            
+                pipeline_metrics.record_file("error")
+                yield {"event": "file_error", "index": index, "source": source_path, "error": file_error}
+
+    finally:
+        # Stop background work if the consumer went away mid-batch
+        cancel_event.set()
+        for pool in (prepare_pool, inference_pool):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        # Long files prepared for jobs that never ran still have ffmpeg streaming into a pipe
+        for job in jobs:
+            if job["prepared"] is not None:
+                job["prepared"].add_done_callback(_close_prepared)
+
+def transcribe_file(file_paths, device, cpu_threads, num_workers, language, whisper_model, compute_type, temperature, beam_size, batch_size, condition_on_previous_text, word_timestamps, workers=None, prefetch=None, use_cache=None, vad=None, profile=None):
+    """
+    Transcribe the provided files:
+      - Decode the file (video/WhatsApp/audio) to 16 kHz PCM; without PCM decoding, use it
+        as is, stream-copy its audio or, as a last resort, convert it to MP3.
+      - Use the Whisper model to transcribe the content.
+      - Save the transcript to a file and return the transcription, output file path, and folder.
+
+    Yields ``(session text, output path, folder)`` tuples for the UI; see
+    ``iter_transcription_events`` for the underlying per-file events.
+    """
+    try:
+        if not file_paths:
+            logging.warning("No file paths provided for transcription.")
+            yield "Please select a file", None, None
+            return
+
+        session_transcription = TranscriptBuffer()
+        ui_defaults = default_values.get("default_values", {})
+        throttle = UpdateThrottle(
+            ui_defaults.get("ui_update_interval_seconds"),
+            ui_defaults.get("ui_update_bytes_per_second"),
+        )
+        header = ""
+        folder_path = None
+        accumulated_transcription = TranscriptBuffer()
+
+        for event in iter_transcription_events(
+            file_paths, device, cpu_threads, num_workers, language,
+            whisper_model, compute_type, temperature, beam_size, batch_size,
+            condition_on_previous_text, word_timestamps,
+            workers=workers, prefetch=prefetch, use_cache=use_cache, vad=vad, profile=profile,
+        ):
+            kind = event["event"]
+            if kind == "invalid":
+                yield f"Invalid file: {event['error']}", None, None
+            elif kind == "file_start":
+                source_path = event["source"]
+                folder_path = str(source_path.parent)
+                header = f"### File {event['index']}/{event['total']}: {source_path.name}\n\n"
+                accumulated_transcription = TranscriptBuffer()
+                yield session_transcription.text() + header + "Converting/Preparing audio...", None, folder_path
+            elif kind == "status":
+                yield session_transcription.text() + header + event["message"], None, folder_path
+            elif kind == "segment":
+                accumulated_transcription.append(event["text"])
+                # Yield partial result, throttled so the whole session text is not
+                # rebuilt and re-sent for every segment. Output path is None until
+                # transcription is complete.
+                if throttle.ready(len(session_transcription) + len(accumulated_transcription)):
+                    throttle.mark()
+                    yield session_transcription.text() + header + accumulated_transcription.text(), None, folder_path
+            elif kind == "file_done":
+                # Final yield with output path for the current file
+                yield session_transcription.text() + header + accumulated_transcription.text(), str(event["output_path"]), folder_path
+                session_transcription.append(header)
+                session_transcription.append(accumulated_transcription.text())
+                session_transcription.append("\n\n---\n\n")
+            elif kind == "file_error":
+                error = event["error"]
+                error_msg = error if event.get("unsupported") else f"Skipped (error): {error}"
+                yield session_transcription.text() + header + error_msg, None, folder_path
+                session_transcription.append(header + error_msg + "\n\n---\n\n")
+
     except Exception as e:
         logging.error(f"Error transcribing file: {e}")
         yield f"Error during transcription: {e}", None, None
@@ -1,6 +1,7 @@
 import logging
 import os
 import signal
+import time
 import yaml
 from security_utils import (
     SecurityError,
@@ -9,18 +10,32 @@ from security_utils import (
     validate_controlled_transcript_path,
     validate_local_config_path,
     validate_local_media_path,
+    validate_stream_url,
 )
 
+from startup_timing import checkpoint
+
 configure_gradio_temp_dir()
 import gradio as gr  # noqa: E402
-from transcription import transcribe_file  # noqa: E402
-from config import load_default_values, load_default_config, get_gemini_api_key, get_translation as _  # noqa: E402
-from llms import query_gemini, list_ollama_models, list_lmstudio_models, get_sorted_gemini_models  # noqa: E402
+checkpoint("import gradio")
+from config import load_default_values, load_default_config, get_translation as _  # noqa: E402
+from llm_async import query_for_session  # noqa: E402
+from speech_regions import DEFAULT_VAD_SETTINGS, VAD_MODES  # noqa: E402
+from auto_tuning import PROFILES  # noqa: E402
+from pipeline_metrics import get_metrics_url, pipeline_metrics  # noqa: E402
+from job_queue import JobRejected, job_queue  # noqa: E402
+from inference_server import get_inference_servers, server_health  # noqa: E402
+from live_transcription import create_live_transcriber, get_live_max_sessions, iter_stream_events, to_mono_16k  # noqa: E402
+from llms import list_ollama_models, list_lmstudio_models, get_sorted_gemini_models, warm_up_model  # noqa: E402
 from config import setup_logging  # noqa: E402
+checkpoint("import app modules")
 
 default_values = load_default_values()
 NO_MODELS_FOUND = "No models found"
-default_config_values = load_default_config()
+# The queue wakes the UI on every job event; this only refreshes a waiting job's ETA in between
+QUEUE_REFRESH_SECONDS = 5.0
+# Configurations saved before the VAD and profile settings existed fall back to their defaults
+default_config_values = {**DEFAULT_VAD_SETTINGS, "performance_profile": "manual", **load_default_config()}
 
 
 def _default_config_tuple():
@@ -37,9 +52,15 @@ def _default_config_tuple():
         default_config_values["condition_on_previous_text"],
         default_config_values["word_timestamps"],
         default_config_values["gemini_model"],
+        *_default_vad_tuple(),
+        default_config_values["performance_profile"],
     )
 
 
+def _default_vad_tuple():
+    return tuple(default_config_values[key] for key in DEFAULT_VAD_SETTINGS)
+
+
 def load_config_file(file_path):
     try:
         if not file_path:
@@ -66,6 +87,8 @@ def load_config_file(file_path):
             ),
             config.get("word_timestamps", default_config_values["word_timestamps"]),
             config.get("gemini_model", default_config_values["gemini_model"]),
+            *(config.get(key, default_config_values[key]) for key in DEFAULT_VAD_SETTINGS),
+            config.get("performance_profile", default_config_values["performance_profile"]),
         )
     except SecurityError as e:
         logging.warning("Rejected configuration path: %s", e)
@@ -87,6 +110,13 @@ def save_config(
         condition_on_previous_text,
         word_timestamps,
         gemini_model,
+        vad_mode,
+        vad_threshold,
+        vad_min_speech_duration_ms,
+        vad_min_silence_duration_ms,
+        vad_speech_pad_ms,
+        vad_chunk_length,
+        performance_profile="manual",
     ):
     try:
         config = {
@@ -102,6 +132,13 @@ def save_config(
             "condition_on_previous_text": condition_on_previous_text,
             "word_timestamps": word_timestamps,
             "gemini_model": gemini_model,
+            "vad_mode": vad_mode,
+            "vad_threshold": vad_threshold,
+            "vad_min_speech_duration_ms": vad_min_speech_duration_ms,
+            "vad_min_silence_duration_ms": vad_min_silence_duration_ms,
+            "vad_speech_pad_ms": vad_speech_pad_ms,
+            "vad_chunk_length": vad_chunk_length,
+            "performance_profile": performance_profile,
         }
         with open("settings/default.yaml", "w") as file:
             yaml.dump(config, file)
@@ -131,6 +168,8 @@ def reset_fields():
         _("response_placeholder"),
         gr.update(visible=False), # save_transcript_button
         gr.update(visible=False), # submit_query_button
+        *_default_vad_tuple(),
+        default_config_values["performance_profile"],
     )
 
 
@@ -146,6 +185,23 @@ def preset_query_fix():
     return _("preset_fix_val")
 
 
+async def query_llm(user_input, transcription, gemini_model, provider, ollama_model, lmstudio_model, fix_text, response_language, request: gr.Request):
+    """Stream the AI response; a new query from the same browser session cancels the previous one."""
+    session_key = request.session_hash if request is not None else None
+    async for text in query_for_session(
+        session_key,
+        user_input,
+        transcription,
+        gemini_model,
+        provider=provider,
+        ollama_model=ollama_model,
+        lmstudio_model=lmstudio_model,
+        fix_text=fix_text,
+        response_language=response_language,
+    ):
+        yield text
+
+
 def notify_copy():
     gr.Info(_("text_copied"))
 
@@ -200,6 +256,115 @@ def browse_local_config_file():
         return gr.update()
 
 
+def _render_live(transcriber):
+    text = transcriber.stable_text()
+    if transcriber.provisional:
+        text += f" _{transcriber.provisional}_"
+    stats = transcriber.latency_stats()
+    if stats["segments"]:
+        text += "\n\n" + _("live_latency").format(last=stats["last"], mean=stats["mean"], max=stats["max"])
+    return text or _("live_listening")
+
+
+def live_microphone_step(chunk, transcriber, device, cpu_threads, num_workers, language, whisper_model, compute_type, beam_size, performance_profile):
+    """Feed one streamed microphone chunk to the session's live transcriber."""
+    if chunk is None:
+        return gr.update(), transcriber
+    try:
+        if transcriber is None:
+            transcriber = create_live_transcriber(device, cpu_threads, num_workers, language, whisper_model, compute_type, beam_size, profile=performance_profile)
+        sample_rate, samples = chunk
+        transcriber.feed(to_mono_16k(samples, sample_rate))
+        return _render_live(transcriber), transcriber
+    except Exception as e:
+        logging.error(f"Live transcription error: {e}")
+        return _("live_error").format(e), transcriber
+
+
+def live_microphone_stop(transcriber):
+    if transcriber is None:
+        return gr.update(), None
+    transcriber.flush()
+    return _render_live(transcriber), None
+
+
+def live_stream_transcription(url, device, cpu_threads, num_workers, language, whisper_model, compute_type, beam_size, performance_profile):
+    """Transcribe a network stream until it ends or the Stop button cancels the event."""
+    try:
+        source = validate_stream_url(url)
+    except SecurityError as e:
+        logging.warning("Rejected stream URL: %s", e)
+        yield _("live_error").format(e)
+        return
+    yield _("live_listening")
+    try:
+        transcriber = create_live_transcriber(device, cpu_threads, num_workers, language, whisper_model, compute_type, beam_size, profile=performance_profile)
+        for _event in iter_stream_events(transcriber, source):
+            yield _render_live(transcriber)
+    except Exception as e:
+        logging.error(f"Live transcription error: {e}")
+        yield _("live_error").format(e)
+
+
+def _queue_user(request):
+    """Queue owner of a request: the login name with auth, else the browser session."""
+    return getattr(request, "username", None) or getattr(request, "session_hash", None) or "local"
+
+
+def _format_eta(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}m {seconds:02d}s" if minutes else f"{seconds}s"
+
+
+def render_job_list(request: gr.Request):
+    """The session user's latest queue jobs as a Markdown table."""
+    jobs = job_queue.recent_jobs(_queue_user(request))
+    if not jobs:
+        return _("queue_empty")
+    lines = [_("queue_table_header"), "|---:|---|---|---|---|"]
+    for job in jobs:
+        created = time.strftime("%Y-%m-%d %H:%M", time.localtime(job["created"]))
+        files = ", ".join(os.path.basename(path) for path in job["file_paths"])
+        if job["outputs"]:
+            result = ", ".join(os.path.basename(path) for path in job["outputs"])
+        elif job["error"] and job["error"].strip():
+            result = job["error"].strip().splitlines()[-1].replace("|", "/")
+        else:
+            result = "-"
+        lines.append(f"| {job['id']} | {created} | {job['status']} | {files} | {result} |")
+    return "\n".join(lines)
+
+
+def render_metrics_summary():
+    """Session summary of the pipeline spans as a Markdown table."""
+    summary = pipeline_metrics.summary()
+    if not summary["stages"]:
+        return _("metrics_empty")
+    files = summary["files"]
+    lines = [
+        _("metrics_files").format(done=files.get("done", 0), cached=files.get("cached", 0), errors=files.get("error", 0), media=summary["media_seconds"] / 60),
+    ]
+    if summary["rtf"] is not None:
+        lines.append(_("metrics_rtf").format(rtf=summary["rtf"], last=summary["last_rtf"]))
+    lines += ["", _("metrics_table_header"), "|---|---:|---:|---:|---:|---:|---:|"]
+    for stage, stats in summary["stages"].items():
+        rtf = f"{stats['rtf']:.3f}" if stats["rtf"] is not None else "-"
+        lines.append(
+            f"| {stage} | {stats['count']} | {stats['seconds']:.2f} | {stats['mean_seconds']:.3f} | "
+            f"{stats['max_seconds']:.3f} | {stats['audio_seconds']:.0f} | {rtf} |"
+        )
+    url = get_metrics_url()
+    if url:
+        lines += ["", _("metrics_endpoint").format(url)]
+    for server in get_inference_servers():
+        health = server_health(server)
+        if health is None:
+            lines += ["", _("metrics_server_down").format(server)]
+        else:
+            lines += ["", _("metrics_server").format(url=server, running=health["running"], waiting=health["waiting"], uptime=health["uptime_seconds"] / 60)]
+    return "\n".join(lines)
+
+
 def quit_app():
     try:
         logging.info(_("quitting_app"))
@@ -252,22 +417,34 @@ with gr.Blocks(title="Whisper Utility") as demo:
             lines=1,
         )
     browse_config_button = gr.Button(_("browse"), variant="secondary")
+    manual_tuning = default_config_values["performance_profile"] != "auto"
     with gr.Row():
+        performance_profile = gr.Radio(choices=list(PROFILES), value=default_config_values["performance_profile"], label=_("performance_profile_label"), info=_("performance_profile_info"))
         device = gr.Dropdown(choices=default_values['configurations']['devices'], value=default_config_values["device"], label=_("device_label"))
-        cpu_threads = gr.Slider(minimum=default_values['configurations']['cpu_threads']['min'], value=default_config_values["cpu_threads"], step=1, label=_("cpu_threads_label"))
-        num_workers = gr.Slider(minimum=default_values['configurations']['num_workers']['min'], value=default_config_values["num_workers"], step=1, label=_("num_workers_label"))
+        cpu_threads = gr.Slider(minimum=default_values['configurations']['cpu_threads']['min'], value=default_config_values["cpu_threads"], step=1, label=_("cpu_threads_label"), interactive=manual_tuning)
+        num_workers = gr.Slider(minimum=default_values['configurations']['num_workers']['min'], value=default_config_values["num_workers"], step=1, label=_("num_workers_label"), interactive=manual_tuning)
     with gr.Row():
         language = gr.Dropdown(choices=default_values['configurations']['languages'], value=default_config_values["language"], label=_("language_label"))
         whisper_model = gr.Dropdown(choices=default_values['configurations']['models'], value=default_config_values["whisper_model"], label=_("whisper_model_label"))
-        compute_type = gr.Dropdown(choices=default_values['configurations']['compute_types'], value=default_config_values["compute_type"], label=_("compute_type_label"))
+        compute_type = gr.Dropdown(choices=default_values['configurations']['compute_types'], value=default_config_values["compute_type"], label=_("compute_type_label"), interactive=manual_tuning)
     with gr.Row():
         temperature = gr.Slider(minimum=default_values['configurations']['temperature']['min'], value=default_config_values["temperature"], step=0.1, label=_("temperature_label"))
         beam_size = gr.Slider(minimum=default_values['configurations']['beam_size']['min'], value=default_config_values["beam_size"], step=1, label=_("beam_size_label"))
-        batch_size = gr.Slider(minimum=default_values['configurations']['batch_size']['min'], value=default_config_values["batch_size"], step=1, label=_("batch_size_label"))
+        batch_size = gr.Slider(minimum=default_values['configurations']['batch_size']['min'], value=default_config_values["batch_size"], step=1, label=_("batch_size_label"), interactive=manual_tuning)
     with gr.Row():
         condition_on_previous_text = gr.Checkbox(value=default_config_values["condition_on_previous_text"], label=_("condition_on_previous_text_label"))
         word_timestamps = gr.Checkbox(value=default_config_values["word_timestamps"], label=_("word_timestamps_label"))
         save_configurations = gr.Button(_("save_configurations"), variant="secondary")
+    with gr.Accordion(_("vad_accordion"), open=False):
+        with gr.Row():
+            vad_mode = gr.Radio(choices=list(VAD_MODES), value=default_config_values["vad_mode"], label=_("vad_mode_label"), info=_("vad_mode_info"))
+            vad_threshold = gr.Slider(minimum=0.05, maximum=0.95, value=default_config_values["vad_threshold"], step=0.05, label=_("vad_threshold_label"))
+            vad_chunk_length = gr.Slider(minimum=5, maximum=30, value=default_config_values["vad_chunk_length"], step=1, label=_("vad_chunk_length_label"))
+        with gr.Row():
+            vad_min_speech_duration_ms = gr.Slider(minimum=0, maximum=2000, value=default_config_values["vad_min_speech_duration_ms"], step=50, label=_("vad_min_speech_label"))
+            vad_min_silence_duration_ms = gr.Slider(minimum=0, maximum=5000, value=default_config_values["vad_min_silence_duration_ms"], step=20, label=_("vad_min_silence_label"))
+            vad_speech_pad_ms = gr.Slider(minimum=0, maximum=2000, value=default_config_values["vad_speech_pad_ms"], step=50, label=_("vad_speech_pad_label"))
+    vad_inputs = [vad_mode, vad_threshold, vad_min_speech_duration_ms, vad_min_silence_duration_ms, vad_speech_pad_ms, vad_chunk_length]
     
     with gr.Row():
         gr.Markdown(_("transcription_title"))
@@ -279,13 +456,32 @@ with gr.Blocks(title="Whisper Utility") as demo:
     save_transcript_button = gr.Button(_("save_transcript_as"), variant="primary", visible=False)
     transcribe_button = gr.Button(_("transcribe_btn"), variant="secondary")
 
+    with gr.Accordion(_("queue_accordion"), open=False):
+        queue_refresh_button = gr.Button(_("queue_refresh_btn"), variant="secondary", size="sm")
+        queue_output = gr.Markdown(_("queue_empty"))
+
+    with gr.Accordion(_("metrics_accordion"), open=False):
+        metrics_refresh_button = gr.Button(_("metrics_refresh_btn"), variant="secondary", size="sm")
+        metrics_output = gr.Markdown(_("metrics_empty"))
+
+    with gr.Accordion(_("live_accordion"), open=False):
+        live_microphone = gr.Audio(sources=["microphone"], streaming=True, type="numpy", label=_("live_microphone_label"))
+        with gr.Row():
+            live_stream_url = gr.Textbox(label=_("live_stream_url_label"), placeholder="rtsp://host/stream", lines=1)
+            live_start_button = gr.Button(_("live_start_btn"), variant="primary")
+            live_stop_button = gr.Button(_("live_stop_btn"), variant="stop")
+        live_output = gr.Markdown(container=True, line_breaks=True, elem_classes="scrollable-markdown")
+        live_state = gr.State(None)
+
     # Ensure UI elements exist for AI querying
     gemini_model = None
     user_query = None
     gemini_response = None
 
-    gemini_api_key = get_gemini_api_key()
-    gemini_models = get_sorted_gemini_models(gemini_api_key)
+    checkpoint("build ui")
+    # First listing per process; later reads come from the shared TTL cache
+    gemini_models = get_sorted_gemini_models()
+    checkpoint("list Gemini models")
     has_gemini = len(gemini_models) > 0
 
     with gr.Accordion(_("ai_provider_accordion"), open=True):
@@ -371,7 +567,9 @@ with gr.Blocks(title="Whisper Utility") as demo:
         fix_text_mode = gr.State(False)
         user_query = gr.Textbox(label=_("enter_query_label"))
 
-        submit_query_button = gr.Button(_("submit_query_btn"), variant="primary", visible=False)
+        with gr.Row():
+            submit_query_button = gr.Button(_("submit_query_btn"), variant="primary", visible=False)
+            stop_query_button = gr.Button(_("stop_query_btn"), variant="stop")
 
     preset_summary_button.click(
         fn=preset_query_summary,
@@ -439,8 +637,17 @@ with gr.Blocks(title="Whisper Utility") as demo:
 
     provider.change(fn=_provider_change, inputs=[provider], outputs=[google_brand_radio, gemini_model, ollama_model, lmstudio_model])
 
+    # Start loading local models as soon as they are selected, so the first
+    # query does not have to wait for them
+    ollama_model.change(fn=lambda m: warm_up_model("Ollama", m), inputs=[ollama_model], outputs=[])
+    lmstudio_model.change(fn=lambda m: warm_up_model("LM Studio", m), inputs=[lmstudio_model], outputs=[])
+    if _initial_ollama_value:
+        warm_up_model("Ollama", _initial_ollama_value)
+
     def _update_google_models(brand):
-        filtered = [m for m in gemini_models if brand.lower() in m.lower()]
+        # Never blocks: a stale list is returned while it refreshes in the background
+        models = get_sorted_gemini_models(block=False) or gemini_models
+        filtered = [m for m in models if brand.lower() in m.lower()]
         val = None
         if brand.lower() == "gemini":
             for m in filtered:
@@ -457,12 +664,16 @@ with gr.Blocks(title="Whisper Utility") as demo:
         outputs=[gemini_model],
     )
 
-    submit_query_button.click(
-        fn=query_gemini,
+    query_event = submit_query_button.click(
+        fn=query_llm,
         inputs=[user_query, output_text, gemini_model, provider, ollama_model, lmstudio_model, fix_text_mode, response_language],
         outputs=[gemini_response],
         stream_every=0.05,  # flush UI at most every 50 ms
+        # Queries are async and bounded per provider in llm_async, so they
+        # must not wait behind each other (or behind transcriptions) here
+        concurrency_limit=None,
     )
+    stop_query_button.click(fn=None, inputs=None, outputs=None, cancels=[query_event])
     with gr.Row():
         reset_button = gr.Button(_("reset_fields"), variant="secondary")
         quit_button = gr.Button(_("quit"), variant="stop")
@@ -483,6 +694,8 @@ with gr.Blocks(title="Whisper Utility") as demo:
             condition_on_previous_text,
             word_timestamps,
             gemini_model,
+            *vad_inputs,
+            performance_profile,
         ]
     )
 
@@ -501,6 +714,8 @@ with gr.Blocks(title="Whisper Utility") as demo:
             condition_on_previous_text,
             word_timestamps,
             gemini_model,
+            *vad_inputs,
+            performance_profile,
         ],
         outputs=[]
     )
@@ -508,16 +723,21 @@ with gr.Blocks(title="Whisper Utility") as demo:
     reset_button.click(
         fn=reset_fields,
         inputs=[],
-        outputs=[file_path_input, config_path_input, device, cpu_threads, num_workers, language, whisper_model, compute_type, temperature, beam_size, batch_size, condition_on_previous_text, output_text, transcript_file_path, word_timestamps, gemini_model, user_query, gemini_response, save_transcript_button, submit_query_button]
+        outputs=[file_path_input, config_path_input, device, cpu_threads, num_workers, language, whisper_model, compute_type, temperature, beam_size, batch_size, condition_on_previous_text, output_text, transcript_file_path, word_timestamps, gemini_model, user_query, gemini_response, save_transcript_button, submit_query_button, *vad_inputs, performance_profile]
     ).then(fn=lambda: False, inputs=[], outputs=[fix_text_mode])
 
-    def transcribe_wrapper(file_paths_text, device, cpu_threads, num_workers, language, whisper_model, compute_type, temperature, beam_size, batch_size, condition_on_previous_text, word_timestamps):
+    # The auto profile owns these four settings; keep them read-only while it is selected
+    performance_profile.change(
+        fn=lambda profile: [gr.update(interactive=profile != "auto")] * 4,
+        inputs=[performance_profile],
+        outputs=[cpu_threads, num_workers, compute_type, batch_size],
+    )
+
+    def transcribe_wrapper(file_paths_text, device, cpu_threads, num_workers, language, whisper_model, compute_type, temperature, beam_size, batch_size, condition_on_previous_text, word_timestamps, performance_profile, vad_mode, vad_threshold, vad_min_speech_duration_ms, vad_min_silence_duration_ms, vad_speech_pad_ms, vad_chunk_length, request: gr.Request):
         if not file_paths_text or not file_paths_text.strip():
             yield _("invalid_file").format("No file selected"), None, gr.update(visible=False), gr.update(visible=False)
             return
 
-        yield _("transcription_in_progress"), None, gr.update(visible=False), gr.update(visible=False)
-
         raw_paths = [p.strip() for p in file_paths_text.strip().split('\n') if p.strip()]
         
         valid_paths = []
@@ -529,22 +749,68 @@ with gr.Blocks(title="Whisper Utility") as demo:
                 yield _("invalid_file").format(f"{path}: {e}"), None, gr.update(visible=False), gr.update(visible=False)
                 return
 
-        for transcription, output_path, _folder_path in transcribe_file(
-            valid_paths, device, cpu_threads, num_workers, language,
-            whisper_model, compute_type, temperature, beam_size,
-            batch_size, condition_on_previous_text, word_timestamps
-        ):
-            if output_path:
-                 yield transcription, output_path, gr.update(visible=True), gr.update(visible=True)
+        vad_values = (vad_mode, vad_threshold, vad_min_speech_duration_ms, vad_min_silence_duration_ms, vad_speech_pad_ms, vad_chunk_length)
+        params = {
+            "device": device, "cpu_threads": cpu_threads, "num_workers": num_workers, "language": language,
+            "whisper_model": whisper_model, "compute_type": compute_type, "temperature": temperature,
+            "beam_size": beam_size, "batch_size": batch_size, "condition_on_previous_text": condition_on_previous_text,
+            "word_timestamps": word_timestamps, "vad": dict(zip(DEFAULT_VAD_SETTINGS, vad_values)), "profile": performance_profile,
+        }
+        try:
+            job_id = job_queue.submit(_queue_user(request), valid_paths, params)
+        except JobRejected as e:
+            yield _("queue_rejected").format(e), None, gr.update(visible=False), gr.update(visible=False)
+            return
+
+        # The job runs in the queue's worker; this generator only reports on it
+        last_message = None
+        state = job_queue.status(job_id)
+        while True:
+            if state["status"] == "queued":
+                message = _("queue_waiting").format(position=state["position"], eta=_format_eta(state["eta_seconds"]))
+            elif state["status"] == "running":
+                message = state["text"] or _("transcription_in_progress")
             else:
-                 yield transcription, output_path, gr.update(visible=False), gr.update(visible=False)
+                output_path = state["output_path"] or (state["outputs"][-1] if state["outputs"] else None)
+                text = state["text"] or (_("queue_done").format(output_path) if output_path else state["error"])
+                visible = gr.update(visible=bool(output_path))
+                yield text, output_path, visible, visible
+                return
+            if message != last_message:
+                last_message = message
+                yield message, None, gr.update(visible=False), gr.update(visible=False)
+            state = job_queue.wait_for_change(job_id, state["version"], timeout=QUEUE_REFRESH_SECONDS)
 
     transcribe_button.click( # Updated outputs to use transcript_file_path and button visibility
         fn=transcribe_wrapper,
-        inputs=[file_path_input, device, cpu_threads, num_workers, language, whisper_model, compute_type, temperature, beam_size, batch_size, condition_on_previous_text, word_timestamps],
+        inputs=[file_path_input, device, cpu_threads, num_workers, language, whisper_model, compute_type, temperature, beam_size, batch_size, condition_on_previous_text, word_timestamps, performance_profile, *vad_inputs],
         outputs=[output_text, transcript_file_path, save_transcript_button, submit_query_button],
-        stream_every=0.1
+        stream_every=0.1,
+        # Admission is up to the job queue; every session just waits on its own job
+        concurrency_limit=None,
+    ).then(fn=render_metrics_summary, inputs=[], outputs=[metrics_output]).then(fn=render_job_list, inputs=[], outputs=[queue_output])
+    metrics_refresh_button.click(fn=render_metrics_summary, inputs=[], outputs=[metrics_output])
+    queue_refresh_button.click(fn=render_job_list, inputs=[], outputs=[queue_output])
+
+    live_settings = [device, cpu_threads, num_workers, language, whisper_model, compute_type, beam_size, performance_profile]
+    # Live mode loads its model in this process, outside the job queue's admission, so it gets its own bound
+    live_max_sessions = get_live_max_sessions()
+    live_microphone.start_recording(fn=lambda: None, inputs=[], outputs=[live_state])
+    live_microphone.stream(
+        fn=live_microphone_step,
+        inputs=[live_microphone, live_state, *live_settings],
+        outputs=[live_output, live_state],
+        stream_every=0.5,
+        concurrency_limit=live_max_sessions,
     )
+    live_microphone.stop_recording(fn=live_microphone_stop, inputs=[live_state], outputs=[live_output, live_state])
+    live_stream_event = live_start_button.click(
+        fn=live_stream_transcription,
+        inputs=[live_stream_url, *live_settings],
+        outputs=[live_output],
+        concurrency_limit=live_max_sessions,
+    )
+    live_stop_button.click(fn=None, inputs=None, outputs=None, cancels=[live_stream_event])
 
     quit_button.click(
         fn=quit_app,
@@ -624,3 +890,5 @@ with gr.Blocks(title="Whisper Utility") as demo:
         inputs=[gemini_response],
         js=js_copy_text
     )
+
+checkpoint("build ui (AI panel)")
@@ -0,0 +1,91 @@
+"""Memory-bounded transcription of long media.
+
+ffmpeg decodes the file into a pipe and at most ``window_seconds`` of audio
+are held in memory. Each window is transcribed and the segments that end at
+least ``overlap_seconds`` before its end are kept. The next window then
+starts exactly where the last kept segment ended, so the audio after it is
+transcribed again with full context. Because the cut always falls on a
+segment boundary, no words are emitted twice and none are dropped. Peak
+memory depends on the window length, not on the length of the media.
+"""
+import logging
+from dataclasses import replace
+
+import numpy as np
+
+from audio_processing import SAMPLE_RATE
+from config import load_default_values
+
+DEFAULT_WINDOW_SECONDS = 600
+DEFAULT_OVERLAP_SECONDS = 15
+# Whisper segments never exceed its 30 s decoding window, so this much audio
+# beyond the overlap guarantees every window keeps at least one segment
+MIN_KEPT_SECONDS = 60
+
+
+def get_window_settings():
+    """Return ``(window_seconds, overlap_seconds)``; a window of 0 disables windowing."""
+    defaults = load_default_values().get("default_values", {})
+    try:
+        window_seconds = float(defaults.get("long_media_window_seconds", DEFAULT_WINDOW_SECONDS) or 0)
+        overlap_seconds = float(defaults.get("long_media_overlap_seconds", DEFAULT_OVERLAP_SECONDS) or 0)
+    except (TypeError, ValueError) as e:
+        logging.warning(f"Invalid long media window settings ({e}). Falling back to the defaults.")
+        window_seconds, overlap_seconds = DEFAULT_WINDOW_SECONDS, DEFAULT_OVERLAP_SECONDS
+    if window_seconds <= 0:
+        return 0.0, 0.0
+    overlap_seconds = max(0.0, overlap_seconds)
+    return max(window_seconds, overlap_seconds + MIN_KEPT_SECONDS), overlap_seconds
+
+
+def shift_segment(segment, offset):
+    """Move a faster-whisper segment (and its words) ``offset`` seconds later."""
+    if not offset:
+        return segment
+    words = segment.words
+    if words:
+        words = [replace(word, start=word.start + offset, end=word.end + offset) for word in words]
+    return replace(segment, start=segment.start + offset, end=segment.end + offset, words=words)
+
+
+def iter_windowed_segments(first_audio, read, transcribe, window_seconds, overlap_seconds, start_seconds=0.0):
+    """Yield the segments of a long recording, transcribed window by window.
+
+    ``first_audio`` is the first window (already decoded by the prepare
+    stage), ``read(samples)`` returns up to ``samples`` further samples (fewer
+    at the end of the media), and ``transcribe(audio)`` returns the segments
+    of one window with timestamps relative to its start. ``start_seconds``
+    is the media time of ``first_audio``'s first sample. Yielded segments
+    carry absolute media timestamps.
+    """
+    window_samples = int(window_seconds * SAMPLE_RATE)
+    buffer = np.asarray(first_audio, dtype=np.float32)
+    final = buffer.size < window_samples
+    offset = start_seconds
+    windows = 0
+    while buffer.size:
+        windows += 1
+        buffered = buffer.size / SAMPLE_RATE
+        cut = buffered if final else buffered - overlap_seconds
+        resume = None
+        first_open_start = None
+        for segment in transcribe(buffer):
+            if segment.end > cut + 1e-3:
+                # Everything from here on is transcribed again in the next window
+                first_open_start = segment.start
+                break
+            yield shift_segment(segment, offset)
+            resume = segment.end
+        if final:
+            break
+
+        if resume is None:
+            # Nothing kept: skip the leading silence, or the whole window if it has no speech
+            resume = first_open_start if first_open_start else cut
+        samples = min(buffer.size, max(1, int(resume * SAMPLE_RATE)))
+        logging.debug(f"Window {windows} ({offset:.1f}s - {offset + buffered:.1f}s) kept up to {offset + samples / SAMPLE_RATE:.1f}s")
+        offset += samples / SAMPLE_RATE
+        more = read(window_samples - (buffer.size - samples))
+        final = more.size < window_samples - (buffer.size - samples)
+        buffer = np.concatenate([buffer[samples:], more])
+    logging.info(f"Transcribed {offset - start_seconds + buffer.size / SAMPLE_RATE:.1f}s of audio in {windows} windows")